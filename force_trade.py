@@ -31,5 +31,9 @@ async def force_trade():
     print("\n✅ Execution Result:")
     print(result)
 
+    # Trade row and alert are written in the background; wait for both before exiting
+    await executor.db.aclose()
+    await executor.notify.aclose()
+
 if __name__ == "__main__":
     asyncio.run(force_trade())
@@ -2,14 +2,21 @@ from ..config import config
 from ..state import TradingState
 from ..mcp.alpaca_client import AlpacaMCPClient
 from ..mcp.database_client import SupabaseMCPClient
-from ..mcp.notification_client import NotificationMCPClient, AlertLevel
+from ..mcp.notification_client import notification_client, AlertLevel
+from ..utils.circuit_breaker import adverse_slippage, circuit_breaker
+from datetime import datetime
 import asyncio
+import time
+
+# Alpaca order statuses after which filled_qty can no longer change (orders are day orders)
+FINAL_ORDER_STATUSES = {"filled", "canceled", "expired", "rejected", "replaced", "done_for_day"}
 
 class Executor:
     def __init__(self):
         self.alpaca = AlpacaMCPClient()
         self.db = SupabaseMCPClient()
-        self.notify = NotificationMCPClient()
+        self.notify = notification_client  # Shared dispatcher: alerts are queued, never awaited on the trade path
+        self.fill_trackers = set()         # Background order pollers (kept referenced until done)
 
     async def run(self, state: TradingState) -> dict: # Async
         if not state.get("risk_approved", False):
@@ -50,21 +57,28 @@ class Executor:
             expected_price = state["current_price"]
             
             if filled_price is not None:
-                slippage = (filled_price - expected_price) / expected_price if expected_price else 0.0
+                slippage = adverse_slippage(action, filled_price, expected_price)
             else:
                 slippage = 0.0 # Pending order
 
-            # 3. Log to Database via MCP
+            # 3. Log to Database via MCP (write-behind: buffered, no DB round-trip here)
+            # trades.price is NOT NULL: a still-pending order is logged at its limit price
             trade_log = {
                 "symbol": ticker,
                 "side": action.lower(),
                 "quantity": qty,
-                "price": filled_price,
+                "price": filled_price if filled_price is not None else limit_price,
                 "order_id": order_id
             }
             await self.db.log_trade(trade_log)
 
-            # 4. Notify via MCP
+            # 4. Feed the circuit breaker as the order fills (limit orders rarely fill on submit)
+            if order_id:
+                task = asyncio.ensure_future(self.track_fills(order_data, ticker, action.lower(), expected_price))
+                self.fill_trackers.add(task)
+                task.add_done_callback(self.fill_trackers.discard)
+
+            # 5. Notify via MCP (enqueued; delivery happens in the background)
             await self.notify.send_trade_alert(
                 symbol=ticker, 
                 action=action, 
@@ -88,4 +102,54 @@ class Executor:
                 "error": str(e)
             }
 
+    async def track_fills(self, order: dict, ticker: str, side: str, expected_price: float) -> None:
+        """
+        Poll an order until it is done, booking each new (partial) fill with the circuit breaker.
+        The increment's price is recovered from the change in filled_qty * filled_avg_price.
+        """
+        trading = config.trading
+        booked_qty, booked_value = 0.0, 0.0
+        interval = trading.FILL_POLL_INTERVAL
+        deadline = time.monotonic() + trading.FILL_POLL_TIMEOUT
+        while True:
+            filled_qty, avg_price = order.get("filled_qty") or 0.0, order.get("filled_avg_price")
+            if filled_qty > booked_qty and avg_price is not None:
+                value = filled_qty * avg_price
+                qty, price = filled_qty - booked_qty, (value - booked_value) / (filled_qty - booked_qty)
+                booked_qty, booked_value = filled_qty, value
+                slippage = adverse_slippage(side, price, expected_price)
+                await self.book_fill(ticker, side, qty, price, slippage)
+
+            if order.get("status") in FINAL_ORDER_STATUSES or time.monotonic() >= deadline:
+                return
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, trading.FILL_POLL_MAX_INTERVAL)
+            try:
+                order = await self.alpaca.get_order(order["id"])
+            except Exception as e:
+                print(f"Fill Poll Error ({ticker}): {e}")
+
+    async def book_fill(self, ticker: str, side: str, qty: float, price: float, slippage: float) -> None:
+        was_tripped = circuit_breaker.is_tripped
+        try:
+            await circuit_breaker.record_fill(ticker, side, qty, price, slippage)
+        except Exception as e:
+            print(f"Circuit Breaker Fill Error ({ticker}): {e}")
+            return
+        if circuit_breaker.is_tripped and not was_tripped:
+            await self.notify.send_circuit_breaker_alert(circuit_breaker.trip_reason, datetime.now().isoformat())
+
+    async def snapshot_portfolio(self) -> None:
+        """Queue a portfolio snapshot (account value, cash, day P&L) for the database"""
+        account, positions = await asyncio.gather(self.alpaca.get_account(), self.alpaca.get_positions())
+        daily_pnl = account["equity"] - account["last_equity"]
+        await self.db.save_portfolio_snapshot({
+            "total_value": account["portfolio_value"],
+            "cash": account["cash"],
+            "positions_value": sum(p["market_value"] for p in positions),
+            "daily_pnl": round(daily_pnl, 2),
+            "daily_pnl_pct": round(daily_pnl / account["last_equity"], 4) if account["last_equity"] else 0.0,
+            "positions": positions
+        })
+
 executor = Executor()
@@ -1,19 +1,29 @@
 from typing import Dict, Any
-from langchain_community.tools import DuckDuckGoSearchRun
+import time
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from ..utils.llm_client import llm_client
+from ..utils.llm_client import LLMPriority, llm_client
+from ..utils.news_ingestion import news_ingestion
+from ..utils.cache import TTLCache
+from ..utils.decision_cache import fingerprint, normalize_text
+from ..config import config
 from ..state import TradingState
 
 class NewsResearcherAgent:
     """
     Active Research Agent.
-    Uses DuckDuckGo to answer specific market questions.
+    Synthesizes the shared DuckDuckGo ingestion's "reason for price move" search into a research report.
     """
     
     def __init__(self):
-        self.search = DuckDuckGoSearchRun()
-        self.llm = llm_client.get_model(provider="gemini", temperature=0) # Smart model for synthesis
+        # LLM is built on first use so importing the graph stays fast
+        self._llm = None
+        self.news = news_ingestion
+
+        # (ticker, hash of normalized search results) -> report; unchanged results skip the LLM
+        trading = config.trading
+        self.report_cache = TTLCache(maxsize=trading.RESEARCH_CACHE_SIZE, ttl=trading.RESEARCH_CACHE_TTL)
+        self.next_eviction = time.monotonic() + trading.RESEARCH_CACHE_EVICT_INTERVAL
         
         self.prompt = PromptTemplate(
             template="""You are a deep-dive financial researcher.
@@ -31,18 +41,56 @@ class NewsResearcherAgent:
             input_variables=["ticker", "search_results"]
         )
 
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = llm_client.get_model(provider="gemini", temperature=0) # Smart model for synthesis
+        return self._llm
+
+    @staticmethod
+    def results_digest(results) -> str:
+        """Hash of the search results, insensitive to case, whitespace and result order"""
+        if isinstance(results, str):
+            parts = results.splitlines()
+        else:
+            parts = [str(r) for r in results]
+        return fingerprint(sorted({normalize_text(p) for p in parts if p.strip()}))
+
+    def evict_stale(self) -> None:
+        """Drop expired reports every RESEARCH_CACHE_EVICT_INTERVAL seconds"""
+        now = time.monotonic()
+        if now >= self.next_eviction:
+            removed = self.report_cache.evict_expired()
+            self.next_eviction = now + config.trading.RESEARCH_CACHE_EVICT_INTERVAL
+            if removed:
+                print(f"🧹 NewsResearcher: evicted {removed} stale reports")
+
     async def run(self, state: TradingState) -> Dict[str, Any]:
         ticker = state.get("ticker", "SPY")
-        print(f"🕵️‍♂️ NewsResearcher: Searching for info on {ticker}...")
+        print(f"🕵️‍♂️ NewsResearcher: Reading news for {ticker}...")
         
         try:
-            # 1. Search Query
-            query = f"{ticker} stock news reason for price move today"
-            results = self.search.invoke(query)
+            # 1. This cycle's deduped "reason for the price move" results (fetched with SentimentAnalyst's headlines)
+            articles = await self.news.get(ticker, kind="research")
+            results = [f"- {a.title} ({a.source}): {a.snippet} [{a.url}]" for a in articles]
+
+            # Same result set as an earlier run: reuse its report
+            self.evict_stale()
+            key = (ticker, self.results_digest(results))
+            cached = self.report_cache.get(key)
+            if cached is not None:
+                print(f"🕵️‍♂️ NewsResearcher: {ticker} results unchanged, reusing report")
+                return {
+                    "research_report": cached
+                }
             
-            # 2. Synthesize with LLM
-            chain = self.prompt | self.llm | StrOutputParser()
-            report = await chain.ainvoke({"ticker": ticker, "search_results": results})
+            # 2. Synthesize with LLM (queued behind trade decisions when rate limited)
+            _, report = await llm_client.ainvoke(
+                lambda model: self.prompt | model | StrOutputParser(),
+                {"ticker": ticker, "search_results": "\n".join(results) or "No results."},
+                provider="gemini", priority=LLMPriority.RESEARCH, model=self.llm
+            )
+            self.report_cache.set(key, report)
             
             return {
                 "research_report": report
@@ -1,20 +1,187 @@
 # Quant Researcher Agent
 # Optimizes strategy parameters using VectorBT backtesting
+import asyncio
 import json
+import multiprocessing
 import os
-from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from itertools import product
 import pandas as pd
 import numpy as np
 import vectorbt as vbt
 from typing import Dict, Any, List
 from ..mcp.alpaca_client import AlpacaMCPClient
 from ..config import config
+from ..utils.walk_forward import WalkForwardOptimizer
+from ..utils.bar_archive import bar_archive
+from ..utils.bar_store import to_ns
+
+DEFAULT_RSI = {"window": 14, "buy_threshold": 30, "sell_threshold": 70}
+DEFAULT_SMA = {"fast_window": 20, "slow_window": 50}
+
+def build_close_frame(closes_by_ticker: Dict[str, np.ndarray], lookback: int) -> pd.DataFrame:
+    """
+    Stack closes into one (lookback x tickers) frame, aligned on the most recent bar.
+    Shorter histories are NaN-padded at the start; the sweeps trim that padding again (span_groups).
+    """
+    data = np.full((lookback, len(closes_by_ticker)), np.nan)
+    for j, closes in enumerate(closes_by_ticker.values()):
+        closes = closes[-lookback:]
+        if len(closes):
+            data[-len(closes):, j] = closes
+    return pd.DataFrame(data, columns=pd.Index(list(closes_by_ticker.keys()), name="symbol"))
+
+def span_groups(close: pd.DataFrame) -> List[pd.DataFrame]:
+    """
+    Columns grouped by history length, each group trimmed to its own span. Padded rows would
+    count as flat bars in the Portfolio stats (diluting Sharpe), so every ticker is scored on
+    exactly its own history, as if backtested alone.
+    """
+    lengths = close.notna().sum()
+    return [
+        close.loc[:, lengths.index[lengths == n]].iloc[len(close) - n:].reset_index(drop=True)
+        for n in sorted(lengths.unique(), reverse=True) if n > 0
+    ]
+
+def _sweep(close: pd.DataFrame, combos: List[tuple], names: List[str], signals_fn, metric: str, chunk_columns: int, **pf_kwargs) -> pd.Series:
+    """
+    Evaluate every parameter combo on every ticker with chunked Portfolio.from_signals calls.
+    signals_fn(combo_chunk) -> (entries, exits) as (T, len(chunk) * n_tickers) arrays, combo-major.
+    """
+    n_tickers = close.shape[1]
+    combos_per_chunk = max(1, chunk_columns // max(1, n_tickers))
+    close_values = close.values
+
+    scores = []
+    for start in range(0, len(combos), combos_per_chunk):
+        chunk = combos[start:start + combos_per_chunk]
+        entries, exits = signals_fn(chunk)
+
+        columns = pd.MultiIndex.from_tuples(
+            [(*combo, symbol) for combo in chunk for symbol in close.columns],
+            names=names + ["symbol"]
+        )
+        wide_close = pd.DataFrame(np.tile(close_values, (1, len(chunk))), columns=columns)
+        portfolio = vbt.Portfolio.from_signals(
+            wide_close,
+            pd.DataFrame(entries, columns=columns),
+            pd.DataFrame(exits, columns=columns),
+            init_cash=10000, freq='D', **pf_kwargs
+        )
+        scores.append(getattr(portfolio, metric)())
+
+    return pd.concat(scores)
+
+def sweep_rsi(close: pd.DataFrame, windows, buys, sells, chunk_columns: int) -> pd.Series:
+    """Sharpe ratio for the full (window x buy x sell) RSI grid on every ticker"""
+    return pd.concat([_sweep_rsi(group, windows, buys, sells, chunk_columns) for group in span_groups(close)])
+
+def _sweep_rsi(close: pd.DataFrame, windows, buys, sells, chunk_columns: int) -> pd.Series:
+    windows, buys, sells = list(windows), np.asarray(buys, dtype=float), np.asarray(sells, dtype=float)
+    rsi = vbt.RSI.run(close, window=windows).rsi.values.reshape(len(close), len(windows), close.shape[1])
+    combos = [(w, b, s) for w, b, s in product(range(len(windows)), range(len(buys)), range(len(sells))) if buys[b] < sells[s]]
+
+    def signals(chunk):
+        w_idx, b_idx, s_idx = (np.array(x) for x in zip(*chunk))
+        values = rsi[:, w_idx, :]                             # (T, k, N)
+        entries = values < buys[b_idx][None, :, None]
+        exits = values > sells[s_idx][None, :, None]
+        return entries.reshape(len(close), -1), exits.reshape(len(close), -1)
+
+    scores = _sweep(close, combos, ["rsi_window", "buy", "sell"], signals, "sharpe_ratio", chunk_columns, fees=0.001)
+    # Re-label positional combo indices with the actual parameter values
+    scores.index = pd.MultiIndex.from_arrays([
+        np.asarray(windows)[scores.index.get_level_values(0)],
+        buys[scores.index.get_level_values(1)].astype(int),
+        sells[scores.index.get_level_values(2)].astype(int),
+        scores.index.get_level_values("symbol")
+    ], names=["rsi_window", "buy", "sell", "symbol"])
+    return scores
+
+def sweep_sma(close: pd.DataFrame, fast_windows, slow_windows, chunk_columns: int) -> pd.Series:
+    """Total return for every fast/slow SMA crossover pair (fast < slow) on every ticker"""
+    return pd.concat([_sweep_sma(group, fast_windows, slow_windows, chunk_columns) for group in span_groups(close)])
+
+def _sweep_sma(close: pd.DataFrame, fast_windows, slow_windows, chunk_columns: int) -> pd.Series:
+    windows = sorted(set(fast_windows) | set(slow_windows))
+    ma = vbt.MA.run(close, window=windows).ma.values.reshape(len(close), len(windows), close.shape[1])
+    pos = {w: i for i, w in enumerate(windows)}
+    combos = [(f, s) for f, s in product(fast_windows, slow_windows) if f < s]
+
+    def signals(chunk):
+        fast = ma[:, [pos[f] for f, _ in chunk], :]
+        slow = ma[:, [pos[s] for _, s in chunk], :]
+        above = fast > slow
+        below = fast < slow
+        prev_above = np.zeros_like(above)
+        prev_below = np.zeros_like(below)
+        prev_above[1:] = above[:-1]
+        prev_below[1:] = below[:-1]
+        entries = above & prev_below   # Fast crossed above slow
+        exits = below & prev_above     # Fast crossed below slow
+        return entries.reshape(len(close), -1), exits.reshape(len(close), -1)
+
+    return _sweep(close, combos, ["fast_window", "slow_window"], signals, "total_return", chunk_columns)
+
+def best_params(scores: pd.Series, names: List[str], defaults: Dict) -> Dict[str, Dict]:
+    """Highest finite score per ticker -> {ticker: {param: value}} (defaults when nothing is finite)"""
+    best = {}
+    finite = scores.replace([np.inf, -np.inf], np.nan).dropna()
+    for symbol, group in finite.groupby(level="symbol"):
+        idx = group.idxmax()
+        best[symbol] = {name: int(value) for name, value in zip(names, idx[:-1])}
+    return {s: best.get(s, dict(defaults)) for s in scores.index.get_level_values("symbol").unique()}
+
+def optimize_close_frame(close: pd.DataFrame) -> Dict[str, Dict]:
+    """Run the full RSI and SMA grids for every column of `close` -> strategy config per ticker"""
+    trading = config.trading
+    rsi_scores = sweep_rsi(close, trading.OPT_RSI_WINDOWS, trading.OPT_RSI_BUY_LEVELS, trading.OPT_RSI_SELL_LEVELS, trading.OPT_CHUNK_COLUMNS)
+    sma_scores = sweep_sma(close, trading.OPT_SMA_FAST_WINDOWS, trading.OPT_SMA_SLOW_WINDOWS, trading.OPT_CHUNK_COLUMNS)
+
+    best_rsi = best_params(rsi_scores, ["window", "buy_threshold", "sell_threshold"], DEFAULT_RSI)
+    best_sma = best_params(sma_scores, ["fast_window", "slow_window"], DEFAULT_SMA)
+
+    now = datetime.now().isoformat()
+    return {
+        ticker: {
+            "rsi": best_rsi.get(ticker, dict(DEFAULT_RSI)),
+            "sma": best_sma.get(ticker, dict(DEFAULT_SMA)),
+            "last_optimized": now
+        }
+        for ticker in close.columns
+    }
+
+async def optimize_parallel(close: pd.DataFrame, workers: int) -> Dict[str, Dict]:
+    """
+    Spread ticker columns across a process pool, reporting progress as chunks finish.
+    Each column is scored independently, so results are identical for any worker count.
+    """
+    tickers = list(close.columns)
+    n_chunks = min(len(tickers), workers * 4)  # Extra chunks smooth out uneven workers
+    chunk_size = -(-len(tickers) // n_chunks)
+    chunks = [close[tickers[i:i + chunk_size]] for i in range(0, len(tickers), chunk_size)]
+
+    loop = asyncio.get_running_loop()
+    results = {}
+    done_tickers = 0
+    # 'spawn' keeps workers clear of the parent's I/O threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [loop.run_in_executor(pool, optimize_close_frame, chunk) for chunk in chunks]
+        for i, finished in enumerate(asyncio.as_completed(futures), start=1):
+            chunk_result = await finished
+            results.update(chunk_result)
+            done_tickers += len(chunk_result)
+            print(f"    ⏳ Optimization progress: {i}/{len(chunks)} chunks ({done_tickers}/{len(tickers)} tickers)")
+
+    # Deterministic order regardless of completion order
+    return {t: results[t] for t in tickers}
 
 class QuantResearcher:
     def __init__(self):
         self.alpaca = AlpacaMCPClient()
         self.config_path = "trading_system/strategy_config.json"
-        
+
     async def load_config(self) -> Dict:
         if os.path.exists(self.config_path):
             with open(self.config_path, "r") as f:
@@ -23,108 +190,122 @@ class QuantResearcher:
 
     async def save_config(self, new_config: Dict):
         new_config["updated_at"] = datetime.now().isoformat()
-        with open(self.config_path, "w") as f:
+        # Write to a temp file and swap it in so readers never see a partial config
+        tmp_path = f"{self.config_path}.tmp"
+        with open(tmp_path, "w") as f:
             json.dump(new_config, f, indent=4)
+        os.replace(tmp_path, self.config_path)
+
+    async def load_closes(self, tickers: List[str], lookback: int, timeframe: str = "1Day") -> Dict[str, np.ndarray]:
+        """
+        Daily closes from the local bar archive; with BAR_ARCHIVE_OFFLINE the archive is used as-is.
+        Short archives are backfilled with one batched request for the whole window; stale ones only
+        fetch the bars from their archived tail on (one batched request) and stay append-only.
+        """
+        trading = config.trading
+        stale_before = to_ns(datetime.now(timezone.utc) - timedelta(hours=trading.BAR_ARCHIVE_REFRESH_HOURS))
+        short, stale = [], {}
+        for t in ([] if trading.BAR_ARCHIVE_OFFLINE else tickers):
+            if bar_archive.size(t, timeframe) < lookback:
+                short.append(t)
+            elif bar_archive.last_timestamp(t, timeframe) < stale_before:
+                stale[t] = bar_archive.last_timestamp(t, timeframe)
+
+        if short:
+            fetched = await self.alpaca.get_bars_batch(short, timeframe=timeframe, limit=lookback)
+            for ticker, bars in fetched.items():
+                bar_archive.merge(ticker, timeframe, bars)
+        if stale:
+            # From the oldest tail, inclusive: the tail bar may have been archived while still forming
+            start = pd.Timestamp(min(stale.values()), tz="UTC").to_pydatetime()
+            fetched = await self.alpaca.get_bars_since(list(stale), timeframe, start)
+            for ticker, bars in fetched.items():
+                bar_archive.append(ticker, timeframe, bars)
+
+        closes = {}
+        for ticker in tickers:
+            window = bar_archive.last(ticker, timeframe, lookback)
+            if len(window):
+                closes[ticker] = window.c
+        return closes
+
+    async def run_optimization(self, tickers: List[str], workers: int = None):
+        if config.trading.OPT_MODE == "walk_forward":
+            return await self.run_walk_forward(tickers)
+
+        workers = workers or config.trading.OPT_WORKERS
+        print(f"🧪 QuantResearcher: Optimizing parameters for {len(tickers)} tickers ({workers} worker(s))...")
+
+        lookback = 365
 
-    async def run_optimization(self, tickers: List[str]):
-        print(f"🧪 QuantResearcher: Optimizing parameters for {len(tickers)} tickers...")
-        
-        current_config = await self.load_config()
-        
-        # 1. Fetch Data (90 Days, Hourly for granularity or Daily)
-        # Using daily for stability in this MVP
         try:
-            # We need a proper Dataframe for VectorBT
-            # Fetching one by one or bulk? AlpacaMCPClient does one by one currently.
-            # For efficiency in "best" system, we'd batch, but let's iterate.
-            
+            # 1. Load Data: local archive, topped up with one batched request only where stale
+            closes_by_ticker = await self.load_closes(tickers, lookback)
+            if not closes_by_ticker:
+                return {"status": "no_data", "updated_tickers": []}
+
+            # 2. One vectorized sweep over the whole grid for all tickers at once
+            close = build_close_frame(closes_by_ticker, lookback)
+            if workers > 1 and close.shape[1] > 1:
+                results = await optimize_parallel(close, workers)
+            else:
+                results = optimize_close_frame(close)
+
+            # 3. Merge into the latest config on disk and swap it in atomically
+            current_config = await self.load_config()
+            current_config.setdefault("tickers", {})
+            for ticker, params in results.items():
+                rsi, sma = params["rsi"], params["sma"]
+                print(f"    ✅ Best {ticker}: RSI Window={rsi['window']} ({rsi['buy_threshold']}/{rsi['sell_threshold']}) | SMA Fast={sma['fast_window']}, Slow={sma['slow_window']}")
+                current_config["tickers"][ticker] = params
+
+            await self.save_config(current_config)
+            return {"status": "optimized", "updated_tickers": list(results.keys())}
+
+        except Exception as e:
+            print(f"QuantResearcher Error: {e}")
+            return {"error": str(e)}
+
+
+    async def run_walk_forward(self, tickers: List[str]):
+        """Pick parameters by out-of-sample performance over rolling train/test windows"""
+        trading = config.trading
+        print(f"🧪 QuantResearcher: Walk-forward optimization for {len(tickers)} tickers...")
+
+        try:
+            closes_by_ticker = await self.load_closes(tickers, trading.WF_LOOKBACK_BARS)
+            optimizer = WalkForwardOptimizer()
+
+            results = {}
             for ticker in tickers:
-                print(f"    Running backtests for {ticker}...")
-                
-                # Fetch 200 days history
-                bars = await self.alpaca.get_bars(ticker, timeframe="1Day", limit=365)
-                if not bars:
+                close = pd.Series(closes_by_ticker.get(ticker, []), dtype=float, name=ticker)
+                if len(close) < trading.WF_TRAIN_BARS + trading.WF_TEST_BARS:
+                    print(f"    ⚠️ {ticker}: only {len(close)} bars, skipping walk-forward")
                     continue
-                    
-                df = pd.DataFrame(bars)
-                # vbt expects index to be datetime (if not already?)
-                # Alpaca 't' is datetime
-                # vbt usually wants 'Close'
-                close_price = df['c']
-                
-                # --- RSI Optimization ---
-                # Test Windows: 10 to 30, Step 2
-                windows = np.arange(10, 31, 2)
-                # Ensure freq is passed if index has no freq
-                rsi = vbt.RSI.run(close_price, window=windows, short_name='rsi') 
-                # Note: vbt functions often don't strictly need freq unless computing returns/stats that depend on time
-                # The error likely comes from Portfolio.from_signals calculating stats
-                
-                # Test Strategy: Buy < 30, Sell > 70
-                entries = rsi.rsi_below(30)
-                exits = rsi.rsi_above(70)
-                
-                portfolio = vbt.Portfolio.from_signals(close_price, entries, exits, init_cash=10000, fees=0.001, freq='D')
-                
-                # Find best performing window (Sharpe Ratio)
-                sharpe = portfolio.sharpe_ratio()
-                best_idx = sharpe.idxmax()
-                if pd.isna(best_idx):
-                    best_window = 14
-                else:
-                    best_window = int(best_idx)
-                
-                # --- SMA Optimization ---
-                # --- SMA Optimization (Manual Loop for Stability) ---
-                fast_windows = [10, 20, 30]
-                slow_windows = [50, 100, 200]
-                
-                best_sma_return = -float('inf')
-                best_fast, best_slow = 20, 50
-
-                for f in fast_windows:
-                    for s in slow_windows:
-                        if f >= s: continue # Fast must be < Slow
-                        
-                        # Calculate MAs
-                        fast_ma = vbt.MA.run(close_price, window=f)
-                        slow_ma = vbt.MA.run(close_price, window=s)
-                        
-                        entries = fast_ma.ma_crossed_above(slow_ma)
-                        exits = fast_ma.ma_crossed_below(slow_ma)
-                        
-                        # Fast simulation
-                        pf = vbt.Portfolio.from_signals(close_price, entries, exits, init_cash=10000, freq='D')
-                        total_return = float(pf.total_return()) 
-                        
-                        if total_return > best_sma_return:
-                            best_sma_return = total_return
-                            best_fast, best_slow = f, s
-                
-                print(f"    ✅ Best {ticker}: RSI Window={best_window} | SMA Fast={best_fast}, Slow={best_slow}")
-
-                # Update Config
-                if "tickers" not in current_config:
-                    current_config["tickers"] = {}
-                
-                current_config["tickers"][ticker] = {
-                    "rsi": {
-                        "window": best_window,
-                        "buy_threshold": 30,
-                        "sell_threshold": 70
-                    },
-                    "sma": {
-                        "fast_window": int(best_fast),
-                        "slow_window": int(best_slow)
+
+                rsi_wf = optimizer.run_rsi(close, trading.OPT_RSI_WINDOWS, trading.OPT_RSI_BUY_LEVELS, trading.OPT_RSI_SELL_LEVELS)
+                sma_wf = optimizer.run_sma(close, trading.OPT_SMA_FAST_WINDOWS, trading.OPT_SMA_SLOW_WINDOWS)
+
+                results[ticker] = {
+                    "rsi": rsi_wf.best_params or dict(DEFAULT_RSI),
+                    "sma": sma_wf.best_params or dict(DEFAULT_SMA),
+                    "walk_forward": {
+                        "folds": len(rsi_wf.folds),
+                        "rsi_oos_sharpe": None if np.isnan(rsi_wf.oos_sharpe) else round(rsi_wf.oos_sharpe, 4),
+                        "sma_oos_sharpe": None if np.isnan(sma_wf.oos_sharpe) else round(sma_wf.oos_sharpe, 4)
                     },
                     "last_optimized": datetime.now().isoformat()
                 }
+                print(f"    ✅ {ticker}: RSI {results[ticker]['rsi']} | SMA {results[ticker]['sma']} | OOS {results[ticker]['walk_forward']}")
 
+            current_config = await self.load_config()
+            current_config.setdefault("tickers", {}).update(results)
             await self.save_config(current_config)
-            return {"status": "optimized", "updated_tickers": tickers}
+            print(f"    Indicator cache: {optimizer.cache.stats()}")
+            return {"status": "optimized", "mode": "walk_forward", "updated_tickers": list(results.keys())}
 
         except Exception as e:
-            print(f"QuantResearcher Error: {e}")
+            print(f"QuantResearcher Walk-Forward Error: {e}")
             return {"error": str(e)}
 
 quant_researcher = QuantResearcher()
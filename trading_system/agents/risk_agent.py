@@ -1,11 +1,90 @@
+import numpy as np
+from typing import List
 from ..config import config
 from ..state import TradingState
+from ..mcp.alpaca_client import AlpacaMCPClient
+from ..utils.micro_batcher import MicroBatcher
+from ..utils.portfolio_risk import Allocation, allocate, covariance
+from ..utils.volatility import volatility_service
 
 class RiskAgent:
+    """
+    Per-trade checks and sizing, then (RISK_BATCH) a portfolio pass: every trade approved
+    within RISK_BATCH_WINDOW is sized together with the current positions under gross, net,
+    sector and VaR limits (see utils/portfolio_risk.allocate).
+    """
+
     def __init__(self):
-        pass
+        self.alpaca = AlpacaMCPClient()
+        self.batcher = MicroBatcher(self._allocate_batch, window=config.trading.RISK_BATCH_WINDOW)
+        self.last_allocation: Allocation = None
+        self.volatility = volatility_service
+
+    async def run(self, state: TradingState) -> dict:
+        if state.get("final_action", "HOLD") != "HOLD" and not state.get("volatility"):
+            # TechnicalAnalyst normally provides this; otherwise read it from the shared bar cache
+            try:
+                vol = await self.volatility.get(state["ticker"])
+                if vol is not None:
+                    state = {**state, "volatility": vol.as_dict()}
+            except Exception as e:
+                print(f"RiskAgent Volatility Error: {e}")
+
+        decision = self.size_trade(state)
+        if not (config.trading.RISK_BATCH and decision.get("risk_approved") and decision.get("position_size", 0) > 0):
+            return decision
+
+        candidate = {
+            "ticker": state["ticker"],
+            "side": 1 if state.get("final_action") == "BUY" else -1,
+            "price": state.get("current_price", 100.0),
+            "size": decision["position_size"],
+            "account_value": state.get("account_value", 100000.0)
+        }
+        try:
+            size, binding = (await self.batcher.submit([candidate]))[0]
+        except Exception as e:
+            print(f"Portfolio Risk Error (per-trade sizing only): {e}")
+            return decision
+
+        if size >= decision["position_size"]:
+            return decision
+        if size == 0:
+            return {**decision, "position_size": 0, "risk_approved": False,
+                    "reasoning": f"Portfolio limits reached: {binding}"}
+        return {**decision, "position_size": size}
+
+    async def _allocate_batch(self, candidates: List[dict]) -> list:
+        """MicroBatcher target: one covariance + allocation for every candidate in the window"""
+        try:
+            positions = await self.alpaca.get_positions()
+        except Exception as e:
+            print(f"Portfolio Risk: positions unavailable ({e}), assuming flat book")
+            positions = []
+        held = {p["symbol"]: p["market_value"] for p in positions}
+        symbols = list(dict.fromkeys([c["ticker"] for c in candidates] + list(held)))
+        index = {s: i for i, s in enumerate(symbols)}
+
+        # Daily bars were warmed by the cycle prefetch; this is served from the shared bar cache
+        bars = await self.alpaca.get_bars_batch(symbols, timeframe="1Day", limit=config.trading.RISK_COV_LOOKBACK + 1)
+        cov = covariance({s: [b["c"] for b in bars.get(s, [])] for s in symbols})
+
+        requested = np.zeros(len(symbols))
+        for c in candidates:
+            requested[index[c["ticker"]]] += c["side"] * c["size"] * c["price"]
+        existing = np.array([held.get(s, 0.0) for s in symbols])
+        sectors = [config.trading.SECTOR_MAP.get(s, s) for s in symbols]
+
+        allocation = allocate(requested, existing, sectors, cov, equity=candidates[0]["account_value"])
+        self.last_allocation = allocation
+        if allocation.binding:
+            print(f"🛡️ Portfolio Risk: {len(candidates)} trades scaled by {allocation.binding} "
+                  f"(gross {allocation.gross:.0%}, VaR {allocation.var:.2%})")
+        binding = ", ".join(allocation.binding)
+        return [(int(c["size"] * allocation.scale[index[c["ticker"]]]), binding) for c in candidates]
 
-    def run(self, state: TradingState) -> dict:
+    def size_trade(self, state: TradingState) -> dict:
+        """Single-trade checks and fixed-percent sizing"""
         action = state.get("final_action", "HOLD")
         confidence = state.get("confidence_score", 0.0)
         current_price = state.get("current_price", 100.0) # avoid div/0
@@ -38,9 +117,8 @@ class RiskAgent:
         # Method A: Fixed % Risk (e.g. 2% of equity)
         risk_amount = account_value * config.MAX_RISK_PER_TRADE
         
-        # Calculate volatility based stop distance (ATR)
-        # Assuming ATR is available from technicals, otherwise default to 2%
-        atr = state.get("technical_signals", {}).get("ATR", current_price * 0.02)
+        # Calculate volatility based stop distance (ATR from the volatility service, else 2%)
+        atr = (state.get("volatility") or {}).get("atr") or current_price * 0.02
         stop_distance = atr * 2
         
         if stop_distance == 0: stop_distance = current_price * 0.01
@@ -1,61 +1,117 @@
 from typing import List, Dict
-import torch
-from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from ..config import config
 from ..state import TradingState
-from ..mcp.news_client import NewsMCPClient
+from ..utils.news_ingestion import news_ingestion
+from ..utils.cache import TTLCache
+from ..utils.micro_batcher import MicroBatcher
+from ..utils.async_io import run_blocking
 import asyncio
 
 class SentimentAnalyst:
     def __init__(self):
-        # FinBERT (kept as is for analysis, but fetching changes to MCP)
-        try:
-            self.tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
-            self.model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
-            self.nlp = pipeline("sentiment-analysis", model=self.model, tokenizer=self.tokenizer)
-        except Exception as e:
-            print(f"Warning: Could not load FinBERT. {e}")
-            self.nlp = None
+        # FinBERT is loaded on first use (see load_model), not at import time
+        self.nlp = None
+        self._model_loaded = False
+        self._model_lock = threading.Lock()
 
-        self.news_client = NewsMCPClient()
+        # Shared per-cycle news fetch (also read by NewsResearcher), deduped across sources
+        self.news = news_ingestion
+
+        # Headline -> score (FinBERT is deterministic, so entries only leave via LRU)
+        self.score_cache = TTLCache(maxsize=config.trading.SENTIMENT_CACHE_SIZE)
+        # Concurrent per-ticker runs in a cycle share one forward pass
+        self.batcher = MicroBatcher(
+            self._score_batch,
+            window=config.trading.SENTIMENT_BATCH_WINDOW,
+            max_batch=config.trading.SENTIMENT_MAX_BATCH
+        )
+        # Single inference thread: keeps the event loop free and the model single-threaded
+        self.inference_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="finbert")
+
+    def load_model(self):
+        """Load FinBERT once (thread-safe); returns None if it is unavailable"""
+        if self._model_loaded:
+            return self.nlp
+        with self._model_lock:
+            if not self._model_loaded:
+                try:
+                    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
+                    tokenizer = AutoTokenizer.from_pretrained("ProsusAI/finbert")
+                    model = AutoModelForSequenceClassification.from_pretrained("ProsusAI/finbert")
+                    self.nlp = pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+                except Exception as e:
+                    print(f"Warning: Could not load FinBERT. {e}")
+                    self.nlp = None
+                self._model_loaded = True
+        return self.nlp
+
+    @staticmethod
+    def headline_key(headline: str) -> str:
+        normalized = " ".join(headline.lower().split())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    async def score_headlines(self, headlines: List[str]) -> List[float]:
+        """Score headlines in [-1, 1]; only never-seen headlines reach the model"""
+        keys = [self.headline_key(h) if h else None for h in headlines]
+
+        missing = {}
+        for key, headline in zip(keys, headlines):
+            if key and key not in self.score_cache:
+                missing.setdefault(key, headline)
+
+        if missing:
+            await self.batcher.submit(list(missing.items()))
+
+        return [self.score_cache.get(key, 0.0) if key else 0.0 for key in keys]
+
+    async def _score_batch(self, items: List[tuple]) -> List[float]:
+        # Several tickers may share a headline; score each unique one once
+        unique = dict(items)
+        scores = await run_blocking(self._infer, list(unique.values()), timeout=None, executor=self.inference_pool)
+        for key, score in zip(unique.keys(), scores):
+            self.score_cache.set(key, score)
+        return [self.score_cache.get(key, 0.0) for key, _ in items]
+
+    def _infer(self, headlines: List[str]) -> List[float]:
+        nlp = self.load_model()
+        results = nlp(headlines, batch_size=config.trading.SENTIMENT_INFERENCE_BATCH, truncation=True)
+
+        scores = []
+        for result in results:
+            label = result['label']
+            score = result['score']
+
+            final_score = 0.0
+            if label == 'positive': final_score = score
+            elif label == 'negative': final_score = -score
+            scores.append(final_score)
+        return scores
 
     async def run(self, state: TradingState) -> dict: # Async
         ticker = state["ticker"]
-        
-        # Fetch news via MCP
-        news_items = await self.news_client.search_news(
-            query=f"{ticker} stock news",
-            symbols=[ticker],
-            freshness="24h",
-            count=10
-        )
-        
-        headlines = [item.get("title", "") for item in news_items]
-        
-        if not headlines or not self.nlp:
+
+        # Read this cycle's deduped news (fetched once per ticker, shared with NewsResearcher)
+        articles = await self.news.get(ticker)
+
+        headlines = [article.title for article in articles]
+
+        # First call pays the model load, on the inference thread rather than the event loop
+        nlp = self.nlp if self._model_loaded else await run_blocking(self.load_model, timeout=None, executor=self.inference_pool)
+
+        if not headlines or not nlp:
             return {
                 "news_headlines": [],
                 "sentiment_scores": [],
                 "aggregated_sentiment": 0.0,
                 "sentiment_source": "None"
             }
-            
-        sentiment_scores = []
-        total_score = 0.0
-        
-        for headline in headlines:
-            result = self.nlp(headline)[0]
-            label = result['label']
-            score = result['score']
-            
-            final_score = 0.0
-            if label == 'positive': final_score = score
-            elif label == 'negative': final_score = -score
-            
-            sentiment_scores.append(final_score)
-            total_score += final_score
 
-        avg_score = total_score / len(sentiment_scores) if sentiment_scores else 0.0
+        sentiment_scores = await self.score_headlines(headlines)
+
+        avg_score = sum(sentiment_scores) / len(sentiment_scores) if sentiment_scores else 0.0
         avg_score = max(min(avg_score, 1.0), -1.0)
 
         return {
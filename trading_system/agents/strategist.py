@@ -2,28 +2,30 @@
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import PydanticOutputParser
 from pydantic import BaseModel, Field
-from typing import Literal
+from typing import List, Literal
 from ..config import config
 from ..state import TradingState
+from ..utils.llm_client import LLMPriority, llm_client
+from ..utils.micro_batcher import MicroBatcher
+from ..utils.decision_cache import DecisionCache, fingerprint, normalize_text, quantize, quantize_relative
+import asyncio
 import json
+import time
 
 class TradeDecision(BaseModel):
     action: Literal["BUY", "SELL", "HOLD"] = Field(description="The trading action to take")
     confidence: float = Field(description="Confidence score between 0.0 and 1.0")
     reasoning: str = Field(description="Detailed reasoning for the decision")
 
-from ..utils.llm_client import llm_client
+class TickerTradeDecision(TradeDecision):
+    ticker: str = Field(description="The ticker this decision is for")
 
-class Strategist:
-    def __init__(self):
-        # Default to Gemini (Smartest) if not specified
-        # In a real evolution, this could be passed via config
-        self.llm = llm_client.get_model(provider="gemini", temperature=0)
-        self.parser = PydanticOutputParser(pydantic_object=TradeDecision)
-        
-        self.prompt = PromptTemplate(
-            template="""You are a Senior Hedge Fund Portfolio Manager. Analyze the following market data and make a trading decision.
+class BatchTradeDecision(BaseModel):
+    decisions: List[TickerTradeDecision] = Field(description="One decision per ticker, in the order given")
+
+PROMPT_HEADER = "You are a Senior Hedge Fund Portfolio Manager. Analyze the following market data and "
 
+CONTEXT_TEMPLATE = """
 Context:
 - Ticker: {ticker}
 - Price: {price}
@@ -38,14 +40,29 @@ Top Headlines: {headlines}
 
 News Research Report:
 {research_report}
+"""
 
+DECISION_RULES = """
 Decision Rules:
 - STRONG_BUY: Technical > 0.5, Sentiment > 0.3, VIX < 25
 - BUY: Technical > 0.2, Sentiment > 0, Favorable Sector
 - SELL: Technical < -0.2, Sentiment < 0
 - STRONG_SELL: Technical < -0.5, Sentiment < -0.3, VIX > 30
 - HOLD: Conflicting signals or low confidence
+"""
 
+class Strategist:
+    def __init__(self):
+        # Default to Gemini (Smartest) if not specified
+        # In a real evolution, this could be passed via config
+        # The model is built on first use (see `llm`) so importing the graph stays fast
+        self._llm = None
+        self._fast_llm = None
+        self.cache = DecisionCache()
+        self.parser = PydanticOutputParser(pydantic_object=TradeDecision)
+        
+        self.prompt = PromptTemplate(
+            template=PROMPT_HEADER + "make a trading decision.\n" + CONTEXT_TEMPLATE + DECISION_RULES + """
 Provide a JSON decision with action, confidence (0-1), and reasoning.
 {format_instructions}
 """,
@@ -54,7 +71,172 @@ Provide a JSON decision with action, confidence (0-1), and reasoning.
             partial_variables={"format_instructions": self.parser.get_format_instructions()}
         )
 
-    def run(self, state: TradingState) -> dict:
+        # Batch mode: one request carries several tickers' contexts but the rules only once
+        self.batch_parser = PydanticOutputParser(pydantic_object=BatchTradeDecision)
+        self.batch_prompt = PromptTemplate(
+            template=PROMPT_HEADER + "make one trading decision per ticker.\n{contexts}" + DECISION_RULES + """
+Provide a JSON object with one decision per ticker above (ticker, action, confidence (0-1), reasoning), in the same order.
+{format_instructions}
+""",
+            input_variables=["contexts"],
+            partial_variables={"format_instructions": self.batch_parser.get_format_instructions()}
+        )
+        self.batcher = MicroBatcher(
+            self._decide_batch,
+            window=config.trading.STRATEGIST_BATCH_WINDOW,
+            max_batch=config.trading.STRATEGIST_MAX_BATCH
+        )
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            self._llm = llm_client.get_model(provider="gemini", temperature=0, timeout=config.trading.STRATEGIST_DEADLINE)
+        return self._llm
+
+    @property
+    def fast_llm(self):
+        """Groq hedge model; None when no Groq key is configured (get_model would just return Gemini again)"""
+        if self._fast_llm is None and llm_client.groq_key:
+            self._fast_llm = llm_client.get_model(provider="groq", temperature=0, timeout=config.trading.STRATEGIST_DEADLINE, max_retries=0)
+        return self._fast_llm
+
+    async def _ask(self, provider: str, llm, input_data: dict):
+        # Trade decisions jump the queue when a provider is rate limited; a 429 fails over to the next provider
+        return await llm_client.ainvoke(
+            lambda model: self.prompt | model | self.parser, input_data,
+            provider=provider, priority=LLMPriority.CRITICAL, model=llm,
+            timeout=config.trading.STRATEGIST_DEADLINE
+        )
+
+    async def decide(self, input_data: dict, budget: float = None):
+        """
+        Hedged request: Gemini first; if it hasn't produced a valid TradeDecision after
+        STRATEGIST_HEDGE_AFTER seconds (or has failed), race Groq against it and take the first
+        valid answer. Everything is bounded by `budget` (default STRATEGIST_DEADLINE). Returns (provider, decision).
+        """
+        trading = config.trading
+        budget = budget if budget is not None else trading.STRATEGIST_DEADLINE
+        start = time.monotonic()
+        deadline = start + budget
+        hedge_at = start + trading.STRATEGIST_HEDGE_AFTER
+
+        pending = {asyncio.create_task(self._ask("gemini", self.llm, input_data))}
+        hedged = self.fast_llm is None
+        errors = []
+        try:
+            while pending or not hedged:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if not hedged and (now >= hedge_at or not pending):
+                    pending.add(asyncio.create_task(self._ask("groq", self.fast_llm, input_data)))
+                    hedged = True
+
+                wait = deadline - now if hedged else min(deadline, hedge_at) - now
+                done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())  # Unparseable or failed: keep waiting on the other
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if errors and not pending and hedged:
+            raise errors[-1]
+        raise TimeoutError(f"No decision within {budget:.0f}s")
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        return len(text) // 4 + 1  # ~4 characters per token for English prose/JSON
+
+    def chunk_by_tokens(self, contexts: List[str]) -> List[List[int]]:
+        """Group context indices so each request stays under STRATEGIST_BATCH_TOKENS (and STRATEGIST_MAX_BATCH tickers)"""
+        trading = config.trading
+        overhead = self.estimate_tokens(self.batch_prompt.format(contexts=""))
+        chunks, current, used = [], [], overhead
+        for i, text in enumerate(contexts):
+            tokens = self.estimate_tokens(text)
+            if current and (used + tokens > trading.STRATEGIST_BATCH_TOKENS or len(current) >= trading.STRATEGIST_MAX_BATCH):
+                chunks.append(current)
+                current, used = [], overhead
+            current.append(i)
+            used += tokens
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _decide_chunk(self, inputs: List[dict], contexts: List[str]) -> list:
+        """One batched request; tickers it fails to answer validly are retried individually (hedged path)"""
+        start = time.monotonic()
+        answered = {}
+        if len(inputs) > 1:
+            try:
+                _, batch = await asyncio.wait_for(
+                    llm_client.ainvoke(
+                        lambda model: self.batch_prompt | model | self.batch_parser, {"contexts": "\n".join(contexts)},
+                        provider="gemini", priority=LLMPriority.CRITICAL, model=self.llm,
+                        timeout=config.trading.STRATEGIST_DEADLINE
+                    ),
+                    timeout=config.trading.STRATEGIST_DEADLINE
+                )
+                answered = {d.ticker.upper(): TradeDecision(action=d.action, confidence=d.confidence, reasoning=d.reasoning)
+                            for d in batch.decisions}
+            except Exception as e:
+                print(f"⚠️ Strategist batch of {len(inputs)} failed, retrying individually: {e}")
+
+        async def resolve(input_data: dict):
+            decision = answered.get(str(input_data["ticker"]).upper())
+            if decision is not None:
+                return "gemini-batch", decision
+            budget = config.trading.STRATEGIST_DEADLINE - (time.monotonic() - start)
+            try:
+                return await self.decide(input_data, budget=max(budget, 1.0))
+            except Exception as e:
+                return e  # Surfaced to this ticker's caller only
+
+        return await asyncio.gather(*(resolve(input_data) for input_data in inputs))
+
+    async def _decide_batch(self, inputs: List[dict]) -> list:
+        """MicroBatcher target: every ticker that reached the Strategist within the batch window"""
+        contexts = [CONTEXT_TEMPLATE.format(**input_data) for input_data in inputs]
+        results = [None] * len(inputs)
+        chunks = self.chunk_by_tokens(contexts)
+        outputs = await asyncio.gather(*(
+            self._decide_chunk([inputs[i] for i in chunk], [contexts[i] for i in chunk]) for chunk in chunks
+        ))
+        for chunk, output in zip(chunks, outputs):
+            for i, result in zip(chunk, output):
+                results[i] = result
+        return results
+
+    def cache_key(self, input_data: dict, state: TradingState) -> str:
+        """
+        Quantized view of the prompt inputs: sub-threshold jitter in price, scores or VIX,
+        and headline formatting/order, all map to the same decision.
+        """
+        trading = config.trading
+        score_step = trading.DECISION_SCORE_STEP
+        # Two significant figures: RSI 45.3 -> 45, MACD hist 0.0123 -> 0.012
+        signals = {
+            name: float(f"{value:.2g}") if isinstance(value, (int, float)) else str(value)
+            for name, value in state.get("technical_signals", {}).items()
+        }
+        return fingerprint({
+            "ticker": input_data["ticker"],
+            "price": quantize_relative(input_data["price"], trading.DECISION_PRICE_BUCKET),
+            "vix_regime": input_data["vix_regime"],
+            "vix_level": quantize(input_data["vix_level"], trading.DECISION_VIX_STEP),
+            "sector_momentum": quantize(input_data["sector_momentum"], score_step / 10),
+            "technical_score": quantize(input_data["technical_score"], score_step),
+            "technical_signals": signals,
+            "sentiment_score": quantize(input_data["sentiment_score"], score_step),
+            "headlines": sorted(normalize_text(h) for h in state.get("news_headlines", [])[:3]),
+            "research_report": fingerprint(normalize_text(input_data["research_report"]))
+        })
+
+    async def run(self, state: TradingState) -> dict:
+        start = time.monotonic()
         try:
             # Prepare Input
             input_data = {
@@ -70,21 +252,39 @@ Provide a JSON decision with action, confidence (0-1), and reasoning.
                 "research_report": state.get("research_report", "No special research requested.")
             }
             
-            # Generate Decision
-            chain = self.prompt | self.llm | self.parser
-            decision = chain.invoke(input_data)
+            # Unchanged market state: reuse the earlier decision, skip the LLM round-trip
+            key = self.cache_key(input_data, state)
+            cached = await self.cache.get(key)
+            if cached is not None:
+                return {**cached, "decision_provider": "cache", "decision_latency_ms": (time.monotonic() - start) * 1000}
+
+            # Generate Decision (hedged across providers, bounded by the deadline);
+            # in batch mode concurrent tickers share one request
+            if config.trading.STRATEGIST_BATCH:
+                outcome = (await self.batcher.submit([input_data]))[0]
+                if isinstance(outcome, Exception):
+                    raise outcome
+                provider, decision = outcome
+            else:
+                provider, decision = await self.decide(input_data)
             
-            return {
+            result = {
                 "final_action": decision.action,
                 "confidence_score": decision.confidence,
                 "reasoning": decision.reasoning
             }
+            await self.cache.set(key, result)
+            latency_ms = (time.monotonic() - start) * 1000
+            print(f"🧠 Strategist: {state['ticker']} decided by {provider} in {latency_ms:.0f}ms")
+            return {**result, "decision_provider": provider, "decision_latency_ms": latency_ms}
         except Exception as e:
             print(f"Strategist Error: {e}")
             return {
                 "final_action": "HOLD",
                 "confidence_score": 0.0,
-                "reasoning": f"Error in strategy generation: {e}"
+                "reasoning": f"Error in strategy generation: {e}",
+                "decision_provider": "none",
+                "decision_latency_ms": (time.monotonic() - start) * 1000
             }
 
 strategist = Strategist()
@@ -1,15 +1,18 @@
-import pandas as pd
-import ta
 import json
 import os
 from ..state import TradingState
 from ..mcp.alpaca_client import AlpacaMCPClient
+from ..utils.indicators import IndicatorEngine
+from ..utils.data_pipeline import data_pipeline
+from ..utils.volatility import volatility_service
 import asyncio
 
 class TechnicalAnalyst:
     def __init__(self):
         self.alpaca = AlpacaMCPClient()
         self.config_path = "trading_system/strategy_config.json"
+        self.engines = {}  # ticker -> (params, IndicatorEngine)
+        self.volatility = volatility_service
 
     def get_ticker_config(self, ticker: str) -> dict:
         # Load config
@@ -25,12 +28,58 @@ class TechnicalAnalyst:
             "sma": {"fast_window": 20, "slow_window": 50}
         }
 
+    def update_indicators(self, ticker: str, bars: list, params: tuple) -> dict:
+        """
+        Feed only the bars newer than the engine's last committed bar.
+        The newest bar may still be forming, so it is evaluated without being committed;
+        it gets committed on a later cycle once a newer bar exists.
+        """
+        state = self.engines.get(ticker)
+        engine = state[1] if state and state[0] == params else None
+
+        # Rebuild on new params, or when the history no longer overlaps the engine's state
+        if engine is not None and engine.last_t is not None and (bars[0]["t"] > engine.last_t or bars[-1]["t"] <= engine.last_t):
+            engine = None
+        if engine is None:
+            rsi_window, sma_fast, sma_slow = params
+            engine = IndicatorEngine(rsi_window=rsi_window, sma_fast=sma_fast, sma_slow=sma_slow)
+            self.engines[ticker] = (params, engine)
+
+        # Scan back from the newest bar; only a handful are new each cycle
+        start = len(bars) - 1
+        if engine.last_t is not None:
+            while start > 0 and bars[start - 1]["t"] > engine.last_t:
+                start -= 1
+        else:
+            start = 0
+        for i in range(start, len(bars) - 1):
+            engine.update(bars[i])
+        return engine.update(bars[len(bars) - 1], commit=False)
+
+    async def prefetch(self, tickers: list) -> None:
+        """Warm the shared bar cache for a whole cycle with one batched request"""
+        try:
+            await self.alpaca.get_bars_batch(tickers, timeframe="1Day", limit=200)
+        except Exception as e:
+            print(f"TechnicalAnalyst Prefetch Error: {e}")
+
+    async def get_history(self, ticker: str, limit: int = 200):
+        """Daily bars from the streamed ring buffer when it is live and deep enough, else REST (seeding the buffer)"""
+        store = data_pipeline.store
+        if data_pipeline.streaming and store.size(ticker, "1Day") >= limit:
+            return store.last(ticker, "1Day", limit)
+
+        bars = await self.alpaca.get_bars(ticker, timeframe="1Day", limit=limit)
+        if bars:
+            store.extend(ticker, "1Day", bars)
+        return bars
+
     async def run(self, state: TradingState) -> dict: # Async for MCP
         ticker = state["ticker"]
         
-        # 1. Fetch Data via MCP
+        # 1. Fetch Data (stream buffer or MCP)
         # Using 6 months of daily data
-        bars = await self.alpaca.get_bars(ticker, timeframe="1Day", limit=200)
+        bars = await self.get_history(ticker, limit=200)
         
         if not bars:
             return {
@@ -39,14 +88,7 @@ class TechnicalAnalyst:
                 "error": "No data found via MCP"
             }
 
-        # Convert to DataFrame
-        df = pd.DataFrame(bars)
-        # Ensure correct types
-        close = df["c"]
-        high = df["h"]
-        low = df["l"]
-
-        # 2. Calculate Indicators using 'ta' library
+        # 2. Update the streaming indicator engine (O(1) per new bar)
 
         # Get Params
         params = self.get_ticker_config(ticker)
@@ -56,87 +98,54 @@ class TechnicalAnalyst:
         
         sma_fast = params.get("sma", {}).get("fast_window", 20)
         sma_slow = params.get("sma", {}).get("slow_window", 50)
-        
-        # RSI
-        try:
-            rsi_indicator = ta.momentum.RSIIndicator(close=close, window=rsi_window)
-            df["RSI"] = rsi_indicator.rsi()
-        except Exception:
-            df["RSI"] = 50.0 # Default fallback
 
-        # MACD (Keeping defaults for now or add to config later)
-        try:
-            macd = ta.trend.MACD(close=close, window_slow=26, window_fast=12, window_sign=9)
-            df["MACD"] = macd.macd()
-            df["MACD_Signal"] = macd.macd_signal()
-            df["MACD_Hist"] = macd.macd_diff()
-        except Exception:
-            df["MACD_Hist"] = 0.0
-
-        # Bollinger Bands
-        try:
-            bb = ta.volatility.BollingerBands(close=close, window=20, window_dev=2)
-            df["BBL_20_2.0"] = bb.bollinger_lband()
-            df["BBU_20_2.0"] = bb.bollinger_hband()
-        except Exception:
-            pass
-            
-        # ATR
-        try:
-            atr = ta.volatility.AverageTrueRange(high=high, low=low, close=close, window=14)
-            df["ATR"] = atr.average_true_range()
-        except Exception:
-            df["ATR"] = 0.0
-        
-        # SMAs
-        try:
-            sma20_ind = ta.trend.SMAIndicator(close=close, window=sma_fast)
-            df["SMA_FAST"] = sma20_ind.sma_indicator()
-            sma50_ind = ta.trend.SMAIndicator(close=close, window=sma_slow)
-            df["SMA_SLOW"] = sma50_ind.sma_indicator()
-        except Exception:
-            pass
-
-        # Get latest
-        if len(df) > 0:
-            latest = df.iloc[-1]
-        else:
-            return {"technical_score": 0, "technical_signals": {}}
+        latest = self.update_indicators(ticker, bars, (rsi_window, sma_fast, sma_slow))
         
         # Scoring Logic
         score = 0.0
         signals = {}
         
+        # Indicators still warming up (None) fall back to neutral values
+        def value(name, default):
+            v = latest.get(name)
+            return float(default if v is None else v)
+
         # RSI Score
-        rsi = float(latest.get("RSI", 50))
+        rsi = value("RSI", 50)
         signals["RSI"] = rsi
         if rsi < rsi_buy: score += 0.25
         elif rsi > rsi_sell: score -= 0.25
             
         # MACD Score
-        hist = float(latest.get("MACD_Hist", 0))
+        hist = value("MACD_Hist", 0)
         signals["MACD_Hist"] = hist
         if hist > 0: score += 0.25
         else: score -= 0.25
             
         # Trend Score
-        price = float(latest["c"])
-        ma_fast_val = float(latest.get("SMA_FAST", price))
-        ma_slow_val = float(latest.get("SMA_SLOW", price))
+        price = latest["close"]
+        ma_fast_val = value("SMA_FAST", price)
+        ma_slow_val = value("SMA_SLOW", price)
         
         if price > ma_fast_val > ma_slow_val: score += 0.25
         elif price < ma_fast_val < ma_slow_val: score -= 0.25
             
         # BB Score
-        bb_lower = float(latest.get("BBL_20_2.0", 0))
-        bb_upper = float(latest.get("BBU_20_2.0", float('inf')))
+        bb_lower = value("BBL", 0)
+        bb_upper = value("BBU", float('inf'))
         
         if price < bb_lower: score += 0.25
         elif price > bb_upper: score -= 0.25
 
+        # Volatility from the same bars (no extra fetch); RiskAgent sizes stops off it
+        vol = self.volatility.update(ticker, bars)
+        if vol is not None:
+            signals["ATR"] = vol.atr
+
         return {
             "technical_signals": signals,
-            "technical_score": float(score)
+            "technical_score": float(score),
+            "volatility": vol.as_dict() if vol is not None else {}
         }
 
 technical_analyst = TechnicalAnalyst()
@@ -59,6 +59,29 @@ class TradingConfig:
     MIN_CONFIDENCE: float = 0.6
     MAX_DAILY_TRADES: int = 20
     
+    # Cycle Execution
+    MAX_CONCURRENT_TICKERS: int = 8  # Graph runs in flight per cycle
+
+    # Event-Driven Mode (graph runs triggered by the bar stream instead of a fixed timer)
+    EVENT_DRIVEN: bool = field(default_factory=lambda: os.getenv("EVENT_DRIVEN", "false").lower() == "true")
+    EVENT_PRICE_THRESHOLD: float = 0.005   # Re-evaluate on a 0.5% move since the last run
+    EVENT_BAR_MINUTES: int = 15            # ...or when a new bar bucket closes
+    EVENT_DEBOUNCE: float = 2.0            # Seconds to let a burst of bars settle
+    EVENT_QUEUE_SIZE: int = 100            # Per-ticker buffered bars (oldest dropped)
+
+    # Blocking I/O (SDK calls run on a shared thread pool)
+    IO_WORKERS: int = 16
+    IO_TIMEOUT: float = 30.0           # Seconds per SDK call
+    
+    # Market Data Cache
+    BAR_CACHE_TTL: float = 60.0        # Seconds before a cached series is topped up
+    BAR_CACHE_MAX_SERIES: int = 512    # LRU bound on (symbol, timeframe) series
+    BAR_CACHE_MAX_BARS: int = 5000     # Max bars kept per series
+    BAR_STORE_CAPACITY: int = 1024     # Streamed bars kept per (symbol, timeframe) ring buffer
+    BAR_ARCHIVE_DIR: str = "trading_system/data/bars"  # Memory-mapped history for backtests/optimization
+    BAR_ARCHIVE_REFRESH_HOURS: float = 20.0            # Top the archive up once its tail is this old
+    BAR_ARCHIVE_OFFLINE: bool = field(default_factory=lambda: os.getenv("BAR_ARCHIVE_OFFLINE", "false").lower() == "true")  # Never hit the network
+    
     # Technical Analysis
     RSI_PERIOD: int = 14
     MACD_FAST: int = 12
@@ -67,10 +90,115 @@ class TradingConfig:
     BB_PERIOD: int = 20
     BB_STD: int = 2
     
+    # Strategy Optimization (QuantResearcher grid)
+    OPT_RSI_WINDOWS: List[int] = field(default_factory=lambda: list(range(10, 31, 2)))
+    OPT_RSI_BUY_LEVELS: List[int] = field(default_factory=lambda: [20, 25, 30, 35])
+    OPT_RSI_SELL_LEVELS: List[int] = field(default_factory=lambda: [65, 70, 75, 80])
+    OPT_SMA_FAST_WINDOWS: List[int] = field(default_factory=lambda: [5, 10, 15, 20, 30, 40])
+    OPT_SMA_SLOW_WINDOWS: List[int] = field(default_factory=lambda: [50, 75, 100, 150, 200])
+    OPT_CHUNK_COLUMNS: int = 4096      # Backtest columns per Portfolio call (bounds memory)
+    OPT_WORKERS: int = field(default_factory=lambda: int(os.getenv("OPT_WORKERS", "1")))  # >1 enables the process pool
+    OPT_MODE: str = field(default_factory=lambda: os.getenv("OPT_MODE", "grid"))  # "grid" or "walk_forward"
+    WF_LOOKBACK_BARS: int = 756        # ~3 years of daily bars
+    WF_TRAIN_BARS: int = 252
+    WF_TEST_BARS: int = 63
+    WF_STEP_BARS: int = 63
+    
+    # Sentiment (FinBERT)
+    SENTIMENT_CACHE_SIZE: int = 20000      # Cached headline scores
+    SENTIMENT_BATCH_WINDOW: float = 0.25   # Seconds to gather headlines from concurrent tickers
+    SENTIMENT_MAX_BATCH: int = 512         # Headlines per coalesced batch
+    SENTIMENT_INFERENCE_BATCH: int = 32    # Pipeline batch_size per forward pass
+    
+    # LLM Providers (shared registry in utils/llm_client.py)
+    LLM_RATE_LIMITS: Dict[str, float] = field(default_factory=lambda: {"gemini": 15, "groq": 30, "openrouter": 20})  # Requests/minute
+    LLM_BURST: int = 5                        # Requests allowed back-to-back before the rate applies
+    LLM_FAILOVER_ORDER: List[str] = field(default_factory=lambda: ["gemini", "groq", "openrouter"])
+    LLM_RATE_LIMIT_COOLDOWN: float = 30.0     # Seconds to skip a provider after a 429 without Retry-After
+    
+    # News Ingestion (one shared fetch per ticker per cycle)
+    NEWS_INGEST_TTL: float = 300.0            # Seconds a ticker's fetch serves every reader
+    NEWS_MAX_RESULTS: int = 10
+    NEWS_LOOKBACK_HOURS: float = 24.0         # Window the agents read
+    NEWS_RETENTION_HOURS: float = 72.0        # Window the store keeps
+    NEWS_TITLE_SIMILARITY: float = 0.85       # Titles this similar are one story
+    
+    # News Research
+    RESEARCH_CACHE_SIZE: int = 1000
+    RESEARCH_CACHE_TTL: float = 6 * 3600.0     # Reports older than this are re-synthesized even if results match
+    RESEARCH_CACHE_EVICT_INTERVAL: float = 600.0
+    
+    # Strategist LLM Calls
+    STRATEGIST_DEADLINE: float = 20.0        # Hard budget per decision (seconds); HOLD if exceeded
+    STRATEGIST_HEDGE_AFTER: float = 4.0      # Start the fast Groq model if Gemini hasn't answered by then
+    STRATEGIST_BATCH: bool = field(default_factory=lambda: os.getenv("STRATEGIST_BATCH", "true").lower() == "true")  # One request for concurrent tickers
+    STRATEGIST_BATCH_WINDOW: float = 0.5     # Seconds to gather tickers into one request
+    STRATEGIST_MAX_BATCH: int = 10           # Tickers per request
+    STRATEGIST_BATCH_TOKENS: int = 6000      # Estimated prompt tokens per request
+    
+    # Strategist Decision Cache
+    DECISION_CACHE_PATH: str = "trading_system/data/decision_cache.sqlite"
+    DECISION_CACHE_TTL: float = 1800.0       # Seconds a decision stays valid for an unchanged market state
+    DECISION_CACHE_SIZE: int = 5000
+    DECISION_PRICE_BUCKET: float = 0.005     # Prices within ~0.5% share a key
+    DECISION_SCORE_STEP: float = 0.05        # Technical/sentiment/momentum score resolution
+    DECISION_VIX_STEP: float = 1.0
+    
+    # Notifications (background dispatcher)
+    NOTIFY_QUEUE_SIZE: int = 500
+    NOTIFY_COALESCE_WINDOW: float = 2.0       # Alerts within this window go out as one message
+    NOTIFY_MAX_BATCH: int = 20
+    NOTIFY_MAX_RETRIES: int = 5
+    NOTIFY_BACKOFF: float = 1.0               # Seconds, doubled per retry
+    
+    # Macro Matrix (VIX, SPY, sector ETFs; shared by every ticker in a cycle)
+    MACRO_TTL: float = 600.0                 # Seconds before the snapshot is re-downloaded
+    MACRO_PERIOD: str = "1y"                 # History downloaded for the relative-strength matrix
+    MACRO_LOOKBACKS: List[int] = field(default_factory=lambda: [5, 21, 63])  # Trading days vs SPY
+    MACRO_MOMENTUM_LOOKBACK: int = 21        # Lookback reported as sector_momentum (~1 month)
+    SECTOR_ETFS: List[str] = field(default_factory=lambda: [
+        "XLB", "XLC", "XLE", "XLF", "XLI", "XLK", "XLP", "XLRE", "XLU", "XLV", "XLY"
+    ])
+    SECTOR_MAP: Dict[str, str] = field(default_factory=lambda: {
+        "AAPL": "XLK", "MSFT": "XLK", "NVDA": "XLK",
+        "GOOGL": "XLC", "META": "XLC",
+        "JPM": "XLF", "BAC": "XLF",
+        "TSLA": "XLY", "AMZN": "XLY"
+    })
+    
+    # Volatility (shared by TechnicalAnalyst and RiskAgent)
+    VOL_HISTORY: int = 200                   # Daily bars used
+    ATR_WINDOW: int = 14
+    VOL_WINDOW: int = 20                     # Realized-vol window (trading days)
+    VOL_EWMA_LAMBDA: float = 0.94            # RiskMetrics daily decay
+    
+    # Portfolio Risk (batch mode sizes a whole cycle's trades together)
+    RISK_BATCH: bool = field(default_factory=lambda: os.getenv("RISK_BATCH", "true").lower() == "true")
+    RISK_BATCH_WINDOW: float = 0.25          # Seconds to gather candidate trades into one allocation
+    RISK_MAX_GROSS: float = 1.0              # Sum of |position| / equity
+    RISK_MAX_NET: float = 1.0                # |Sum of signed positions| / equity
+    RISK_MAX_SECTOR: float = 0.30            # Gross exposure per sector / equity
+    RISK_MAX_VAR: float = 0.02               # 1-day parametric VaR / equity
+    RISK_VAR_Z: float = 2.326                # 99% one-sided
+    RISK_COV_LOOKBACK: int = 60              # Daily returns in the covariance estimate
+    RISK_COV_SHRINK: float = 0.1             # Pull correlations toward zero
+    RISK_DEFAULT_VOL: float = 0.02           # Daily vol assumed for symbols without history
+    RISK_SOLVER_STEPS: int = 101             # Scale grid resolution
+    
+    # Database Write-Behind (trade log / snapshots)
+    DB_FLUSH_SIZE: int = 50                  # Rows per table that trigger an immediate bulk write
+    DB_FLUSH_INTERVAL: float = 5.0           # Seconds between background flushes
+    DB_JOURNAL_PATH: str = "trading_system/data/db_journal.jsonl"  # Rows spilled while the DB is unreachable
+    
     # Circuit Breaker
     CONSECUTIVE_LOSS_LIMIT: int = 3
     VIX_THRESHOLD: float = 40.0
     SLIPPAGE_THRESHOLD: float = 0.02
+    CIRCUIT_BREAKER_PATH: str = "trading_system/data/circuit_breaker.sqlite"  # Survives restarts, shared by workers
+    CIRCUIT_BREAKER_BASE_EQUITY: float = 100000.0  # Daily-loss base when the state has no account value
+    FILL_POLL_INTERVAL: float = 2.0          # First wait before re-reading an open order; doubles per poll
+    FILL_POLL_MAX_INTERVAL: float = 60.0
+    FILL_POLL_TIMEOUT: float = 16 * 3600     # Give up on an order that is still open (extended-hours day orders)
     
     # Keys (Legacy Support until full migration)
     ALPACA_API_KEY: str = os.getenv("ALPACA_API_KEY", "")
@@ -9,12 +9,17 @@ from trading_system.config import config
 from trading_system.graph import build_graph
 from trading_system.utils.data_pipeline import data_pipeline
 from trading_system.utils.circuit_breaker import circuit_breaker
+from trading_system.agents.technical_analyst import technical_analyst
+from trading_system.agents.strategist import strategist
+from trading_system.agents.executor import executor
+from trading_system.utils.event_scheduler import EventScheduler
+from trading_system.utils.news_ingestion import news_ingestion
+from trading_system.utils.macro_snapshot import macro_snapshot
 from datetime import datetime
+from typing import Dict, List
 
-async def main():
-    print("🚀 Starting Multi-Agent Trading System...")
-    print(f"Tickers: {config.TRADING_TICKERS}")
-    
+async def setup_graph():
+    """Build the compiled graph, with Postgres checkpoints when DATABASE_URL is set"""
     # 1. Initialize Checkpointer (Persistence)
     checkpointer = None
     db_url = os.getenv("DATABASE_URL")
@@ -43,47 +48,157 @@ async def main():
             checkpointer = None
 
     # 2. Build Graph
-    graph = build_graph(checkpointer=checkpointer)
+    return build_graph(checkpointer=checkpointer), pool
+
+async def main():
+    print("🚀 Starting Multi-Agent Trading System...")
+    print(f"Tickers: {config.TRADING_TICKERS}")
     
-    # 3. Start Data Pipeline (Background)
-    # asyncio.create_task(data_pipeline.start_stream())
+    graph, pool = await setup_graph()
     
-    # 3. Trading Loop
-    # In a real event-driven system, we'd react to data_pipeline events.
-    # Here, we'll simulate a loop for demonstration.
+    # 3. Trading Cycle (all configured tickers)
+    # Timer-driven; see run_event_driven() for the bar-stream variant (EVENT_DRIVEN=true)
     
     print("\n--- Starting Trading Cycle ---\n")
-    
-    # Initial State
-    initial_state = {
-        "ticker": "AAPL",
-        "current_price": 150.0, # Mock start
-        "timestamp": datetime.now(),
-        "account_value": 100000.0,
-        "daily_pnl": 0.0
-    }
-    
-    # Run the Graph
-    # We use .stream() or .invoke(). .invoke() runs until END.
-    
-    config_run = {"recursion_limit": 50, "configurable": {"thread_id": "1"}}
-    
+
     try:
-        if circuit_breaker.check(initial_state):
+        if circuit_breaker.is_tripped:
             print("Circuit breaker active. Halting.")
             return
 
-        final_state = await graph.ainvoke(initial_state, config_run)
-        
+        # Warm the shared bar cache, news store and macro snapshot so per-ticker analysts don't each hit the APIs
+        await asyncio.gather(
+            technical_analyst.prefetch(config.TRADING_TICKERS),
+            news_ingestion.prefetch(config.TRADING_TICKERS),
+            macro_snapshot.refresh()
+        )
+
+        account = await load_account()
+        if not account:
+            print("Account unavailable. Skipping cycle.")
+            return
+        prices = await latest_prices(config.TRADING_TICKERS)
+        results = await run_portfolio_cycle(graph, config.TRADING_TICKERS, prices, account)
+
         print("\n--- Cycle Complete ---")
-        print(f"Action: {final_state.get('final_action')}")
-        print(f"Confidence: {final_state.get('confidence_score')}")
-        print(f"Reasoning: {final_state.get('reasoning')}")
-        print(f"Execution: {final_state.get('execution_status')}")
-        
+        for ticker, final_state in results.items():
+            if final_state.get("error") and not final_state.get("final_action"):
+                print(f"{ticker}: ERROR {final_state.get('error')}")
+                continue
+            print(f"{ticker}: {final_state.get('final_action')} "
+                  f"(Confidence: {final_state.get('confidence_score')}) "
+                  f"-> {final_state.get('execution_status', 'n/a')}")
+            print(f"    Reasoning: {final_state.get('reasoning')}")
+        print(f"🧠 Strategist decision cache: {strategist.cache.stats()}")
+
+        # Trade rows were buffered on the order path; write them (and today's snapshot) now
+        try:
+            await executor.snapshot_portfolio()
+        except Exception as e:
+            print(f"⚠️ Portfolio snapshot skipped: {e}")
+        await executor.db.flush()
+
     except Exception as e:
         print(f"System Error: {e}")
 
+async def load_account() -> dict:
+    """Live equity and day P&L for risk sizing and the breaker's daily-loss limit ({} if unavailable)"""
+    try:
+        account = await executor.alpaca.get_account()
+    except Exception as e:
+        print(f"⚠️ Account lookup failed: {e}")
+        return {}
+    return {"account_value": account["equity"], "daily_pnl": account["equity"] - account["last_equity"]}
+
+async def latest_prices(tickers: List[str]) -> Dict[str, float]:
+    """
+    Last price per ticker: the bar stream when it is running, else the newest bar from the shared
+    bar cache (one batched request, usually already warm). Tickers without a price are left out.
+    """
+    prices = {t: data_pipeline.get_latest_price(t) for t in tickers}
+    missing = [t for t, price in prices.items() if not price]
+    if missing:
+        try:
+            # A few bars, so a cold fetch still reaches back past a weekend
+            bars = await executor.alpaca.get_bars_batch(missing, timeframe="1Day", limit=5)
+        except Exception as e:
+            print(f"⚠️ Price lookup failed for {missing}: {e}")
+            bars = {}
+        for t in missing:
+            if bars.get(t):
+                prices[t] = bars[t][-1]["c"]
+    return {t: price for t, price in prices.items() if price}
+
+async def run_ticker(graph, ticker: str, semaphore: asyncio.Semaphore, price: float, account: dict) -> dict:
+    """Run the full agent graph for one ticker (bounded by the shared semaphore)"""
+    # The price is the limit price and the sizing base: never trade on a made-up one
+    if not price:
+        print(f"⚠️ {ticker}: no price available, skipping")
+        return {"ticker": ticker, "error": "No price available"}
+
+    # Initial State
+    initial_state = {
+        "ticker": ticker,
+        "current_price": price,
+        "timestamp": datetime.now(),
+        **account  # account_value, daily_pnl (load_account)
+    }
+
+    # One thread per ticker so checkpoints never mix symbols
+    config_run = {"recursion_limit": 50, "configurable": {"thread_id": ticker}}
+
+    async with semaphore:
+        try:
+            if await circuit_breaker.check(initial_state):
+                return {"ticker": ticker, "error": f"Circuit breaker active: {circuit_breaker.trip_reason}"}
+
+            # .invoke() runs until END
+            return await graph.ainvoke(initial_state, config_run)
+        except Exception as e:
+            print(f"❌ {ticker} Graph Error: {e}")
+            return {"ticker": ticker, "error": str(e)}
+
+async def run_portfolio_cycle(graph, tickers: List[str], prices: Dict[str, float], account: dict,
+                              max_concurrency: int = None) -> Dict[str, dict]:
+    """
+    Fan the compiled graph out over every ticker concurrently. `prices` and `account` are fetched
+    once per cycle (latest_prices, load_account) and shared by every ticker.
+    Returns {ticker: final_state}; a failing or unpriced ticker never aborts the others.
+    """
+    max_concurrency = max_concurrency or config.trading.MAX_CONCURRENT_TICKERS
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    print(f"📊 Portfolio Cycle: {len(tickers)} tickers (max {max_concurrency} concurrent)")
+    states = await asyncio.gather(*(run_ticker(graph, t, semaphore, prices.get(t), account) for t in tickers))
+    return dict(zip(tickers, states))
+
+async def run_event_driven():
+    """
+    Event-driven mode: stream bars and let the EventScheduler trigger a graph run per ticker
+    only on a meaningful price move or a newly closed bar (bursts coalesce into one run).
+    """
+    graph, pool = await setup_graph()
+    semaphore = asyncio.Semaphore(max(1, config.trading.MAX_CONCURRENT_TICKERS))
+
+    async def evaluate(ticker: str):
+        if circuit_breaker.is_tripped:
+            return
+        account = await load_account()
+        if not account:
+            return
+        prices = await latest_prices([ticker])
+        state = await run_ticker(graph, ticker, semaphore, prices.get(ticker), account)
+        print(f"⚡ {ticker}: {state.get('final_action', state.get('error'))} "
+              f"(Confidence: {state.get('confidence_score')})")
+
+    await technical_analyst.prefetch(config.TRADING_TICKERS)
+    queues = {t: data_pipeline.get_queue(t) for t in config.TRADING_TICKERS}
+    scheduler = EventScheduler(evaluate)
+
+    print(f"📡 Event-Driven Mode: {len(queues)} tickers "
+          f"(threshold {scheduler.price_threshold:.2%}, {scheduler.bar_minutes}m bars)")
+    await asyncio.gather(data_pipeline.start_stream(), scheduler.start(queues))
+
 from trading_system.agents.quant_researcher import quant_researcher
 
 async def run_loop():
@@ -96,6 +211,10 @@ async def run_loop():
     except Exception as e:
         print(f"⚠️ Optimization Warning: {e}")
 
+    if config.trading.EVENT_DRIVEN:
+        await run_event_driven()
+        return
+
     while True:
         try:
             print("\n" + "="*50)
@@ -8,8 +8,11 @@ from alpaca.trading.requests import MarketOrderRequest, LimitOrderRequest, GetOr
 from alpaca.trading.enums import OrderSide, TimeInForce, OrderStatus
 from alpaca.data.historical import StockHistoricalDataClient
 from alpaca.data.requests import StockBarsRequest
+from alpaca.data.enums import Adjustment
 from alpaca.data.timeframe import TimeFrame
 from ..config import config
+from ..utils.bar_cache import bar_cache, lookback_start
+from ..utils.async_io import run_blocking
 from datetime import datetime, timedelta
 
 class AlpacaMCPClient:
@@ -29,10 +32,7 @@ class AlpacaMCPClient:
     
     async def get_quote(self, symbol: str) -> Dict[str, Any]:
         """Get latest bar as 'quote' approximation"""
-        # Data client is synchronous usually, but we wrap result or use standard calls
-        # Note: alpaca-py historical methods usually sync? 
-        # Actually StockHistoricalDataClient is sync. 
-        # We can implement async wrapper if needed or just block for simplicity in this 'embedded mcp'
+        # StockHistoricalDataClient is sync, so every SDK call runs on the shared I/O pool
         
         request_params = StockBarsRequest(
             symbol_or_symbols=symbol,
@@ -40,7 +40,7 @@ class AlpacaMCPClient:
             start=datetime.now() - timedelta(days=1),
             limit=1
         )
-        bars = self.data_client.get_stock_bars(request_params)
+        bars = await run_blocking(self.data_client.get_stock_bars, request_params)
         if bars.df.empty:
             return {"symbol": symbol, "price": 0.0}
         
@@ -48,45 +48,62 @@ class AlpacaMCPClient:
         return {"symbol": symbol, "price": price}
     
     async def get_bars(self, symbol: str, timeframe: str = "1Day", limit: int = 100) -> List[Dict]:
-        """Get historical bars"""
+        """Get historical bars (served from the shared bar cache)"""
+        bars = await self.get_bars_batch([symbol], timeframe=timeframe, limit=limit)
+        return bars.get(symbol, [])
+
+    async def get_bars_batch(self, symbols: List[str], timeframe: str = "1Day", limit: int = 100) -> Dict[str, List[Dict]]:
+        """
+        Get historical bars for many symbols at once.
+        Cache misses are fetched in a single multi-symbol request; warm symbols only fetch bars after the cached tail.
+        """
+        start = lookback_start(timeframe, limit)
+        return await run_blocking(bar_cache.get_many, symbols, timeframe, limit, self._fetch_bars, start)
+
+    async def get_bars_since(self, symbols: List[str], timeframe: str, start: datetime) -> Dict[str, List[Dict]]:
+        """Bars from `start` on for many symbols in one request (bypasses the bar cache; used to top up the archive)"""
+        return await run_blocking(self._fetch_bars, symbols, timeframe, start)
+
+    def _fetch_bars(self, symbols: List[str], timeframe: str, start: datetime) -> Dict[str, List[Dict]]:
         tf = TimeFrame.Day
         if timeframe == "1Min": tf = TimeFrame.Minute
-        
-        start = datetime.now() - timedelta(days=limit * 2) # Buffer
-        
+
+        # No 'limit': it caps the total across symbols and counts from 'start', so it would return the oldest bars
         request_params = StockBarsRequest(
-            symbol_or_symbols=symbol,
+            symbol_or_symbols=symbols,
             timeframe=tf,
             start=start,
-            limit=limit
+            adjustment=Adjustment.SPLIT  # Same basis as the yfinance backtest bars (auto_adjust=False)
         )
-        
+
         bars = self.data_client.get_stock_bars(request_params)
-        data = []
-        for bar in bars[symbol]:
-            data.append({
+        data = {}
+        for symbol, symbol_bars in bars.data.items():
+            data[symbol] = [{
                 "t": bar.timestamp,
                 "o": bar.open,
                 "h": bar.high,
                 "l": bar.low,
                 "c": bar.close,
                 "v": bar.volume
-            })
+            } for bar in symbol_bars]
         return data
     
     async def get_account(self) -> Dict[str, Any]:
         """Get account information"""
-        acc = self.trading_client.get_account()
+        acc = await run_blocking(self.trading_client.get_account)
         return {
             "buying_power": float(acc.buying_power),
             "cash": float(acc.cash),
             "portfolio_value": float(acc.portfolio_value),
+            "equity": float(acc.equity),
+            "last_equity": float(acc.last_equity),
             "status": acc.status
         }
     
     async def get_positions(self) -> List[Dict]:
         """Get current positions"""
-        positions = self.trading_client.get_all_positions()
+        positions = await run_blocking(self.trading_client.get_all_positions)
         return [{"symbol": p.symbol, "qty": float(p.qty), "market_value": float(p.market_value)} for p in positions]
     
     async def submit_order(
@@ -118,12 +135,23 @@ class AlpacaMCPClient:
             else:
                 req = MarketOrderRequest(**req_params)
 
-            order = self.trading_client.submit_order(req)
-            return {
-                "id": str(order.id),
-                "status": str(order.status),
-                "filled_avg_price": float(order.filled_avg_price) if order.filled_avg_price else None
-            }
+            # No timeout: abandoning an in-flight order would leave its state unknown
+            order = await run_blocking(self.trading_client.submit_order, req, timeout=None)
+            return self._order_dict(order)
         except Exception as e:
             print(f"Alpaca Order Error: {e}")
             return {}
+
+    async def get_order(self, order_id: str) -> Dict[str, Any]:
+        """Current status and fill progress of an order"""
+        order = await run_blocking(self.trading_client.get_order_by_id, order_id)
+        return self._order_dict(order)
+
+    @staticmethod
+    def _order_dict(order) -> Dict[str, Any]:
+        return {
+            "id": str(order.id),
+            "status": getattr(order.status, "value", str(order.status)),
+            "filled_qty": float(order.filled_qty or 0),
+            "filled_avg_price": float(order.filled_avg_price) if order.filled_avg_price else None
+        }
@@ -3,19 +3,58 @@ Supabase MCP Client
 Handles trade logging, portfolio history, and state persistence
 """
 from typing import Dict, Any, List, Optional
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import os
+import numpy as np
 from supabase import create_client, Client
+from ..utils.async_io import run_blocking
+from ..utils.write_behind import WriteBehindBuffer
+
+# Tables written with upsert (conflict column); everything else is a plain insert
+UPSERT_KEYS = {"portfolio_snapshots": "snapshot_date"}
+
+def performance_from_snapshots(snapshots: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Daily P&L statistics from portfolio snapshots ordered oldest first"""
+    if not snapshots:
+        return {}
+    values = np.array([float(s["total_value"]) for s in snapshots])
+    pnl = np.array([float(s.get("daily_pnl") or 0.0) for s in snapshots])
+    start_values = values - pnl
+    returns = np.divide(pnl, start_values, out=np.zeros_like(pnl), where=start_values > 0)
+
+    wins, losses = pnl[pnl > 0], pnl[pnl < 0]
+    gross_profit, gross_loss = float(wins.sum()), float(-losses.sum())
+    std = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    peaks = np.maximum.accumulate(values)
+    return {
+        "trading_days": len(snapshots),
+        "winning_days": int(len(wins)),
+        "losing_days": int(len(losses)),
+        "win_rate": len(wins) / len(snapshots),
+        "gross_profit": gross_profit,
+        "gross_loss": gross_loss,
+        "net_profit": float(pnl.sum()),
+        "avg_win": float(wins.mean()) if len(wins) else 0.0,
+        "avg_loss": float(-losses.mean()) if len(losses) else 0.0,
+        "profit_factor": gross_profit / gross_loss if gross_loss else None,
+        "sharpe_ratio": float(returns.mean() / std * np.sqrt(252)) if std > 0 else 0.0,
+        "sortino_ratio": float(returns.mean() / downside * np.sqrt(252)) if downside > 0 else 0.0,
+        "max_drawdown": float(np.max(1 - values / np.where(peaks > 0, peaks, 1.0))),
+    }
 
 class SupabaseMCPClient:
     """
     Real-world Database Client using Supabase Cloud (Free Tier).
+    Trade rows and snapshots are write-behind: they're buffered and bulk-written in the
+    background (see WriteBehindBuffer), so callers on the order path never wait on the DB.
     """
     
     def __init__(self, project_ref: str = None):
         self.url = os.getenv("SUPABASE_URL")
         self.key = os.getenv("SUPABASE_KEY")
         self.client: Client = None
+        self.buffer = WriteBehindBuffer(self._write)
         
         if self.url and self.key:
             try:
@@ -23,35 +62,72 @@ class SupabaseMCPClient:
             except Exception as e:
                 print(f"Supabase Init Error: {e}")
 
+    async def _write(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """One bulk request per table (raises on failure; the buffer decides retry vs journal)"""
+        query = self.client.table(table)
+        key = UPSERT_KEYS.get(table)
+        if key:
+            # Postgres refuses to upsert the same key twice in one statement: last row wins
+            rows = list({row[key]: row for row in rows}.values())
+            query = query.upsert(rows, on_conflict=key)
+        else:
+            query = query.insert(rows)
+        # Supabase-py is sync, so the request runs on the shared I/O pool
+        await run_blocking(query.execute)
+        print(f"✅ DB LOG: Saved {len(rows)} rows to Supabase '{table}'")
+
     async def log_trade(self, trade: Dict[str, Any]) -> str:
         """
-        Log a trade to Supabase 'trades' table
+        Queue a trade for the Supabase 'trades' table (returns without a DB round-trip)
         """
         if not self.client:
             print(f"DB FALLBACK (No Creds): {trade}")
             return "no_db"
 
-        try:
-            # Supabase-py is sync by default, but fast enough for this agent loop.
-            # Ideally wrap in executor, but direct call is acceptable for low frequency.
-            data = self.client.table("trades").insert(trade).execute()
-            print(f"✅ DB LOG: Saved to Supabase - {trade.get('symbol')}")
-            return "logged"
-        except Exception as e:
-            print(f"❌ Supabase Error: {e}")
-            return "error"
+        self.buffer.add("trades", trade)
+        return "queued"
+
+    async def flush(self) -> None:
+        """Write everything buffered (and any journaled backlog) now"""
+        if self.client:
+            await self.buffer.flush()
+
+    async def aclose(self) -> None:
+        if self.client:
+            await self.buffer.aclose()
     
     async def get_trade_history(self) -> List[Dict]:
         """Get historical trades"""
         if not self.client: return []
         try:
-            response = self.client.table("trades").select("*").order("timestamp", desc=True).limit(50).execute()
+            query = self.client.table("trades").select("*").order("execution_time", desc=True).limit(50)
+            response = await run_blocking(query.execute)
             return response.data
         except Exception:
             return []
 
+    async def save_portfolio_snapshot(self, snapshot: Dict[str, Any]) -> None:
+        """Queue today's snapshot for 'portfolio_snapshots' (one row per day, later ones overwrite)"""
+        if not self.client:
+            return
+        self.buffer.add("portfolio_snapshots", {"snapshot_date": date.today().isoformat(), **snapshot})
+
+    async def get_performance_metrics(self, period: str = "30d") -> Dict[str, Any]:
+        """Daily P&L statistics over `period` (e.g. "30d") from portfolio snapshots, plus trade count"""
+        if not self.client: return {}
+        since = date.today() - timedelta(days=int(period.rstrip("d")))
+        try:
+            await self.buffer.flush()  # Include rows still sitting in the buffer
+            snapshots = self.client.table("portfolio_snapshots").select("*") \
+                .gte("snapshot_date", since.isoformat()).order("snapshot_date")
+            trades = self.client.table("trades").select("id", count="exact") \
+                .gte("execution_time", since.isoformat())
+            snapshots, trades = await run_blocking(snapshots.execute), await run_blocking(trades.execute)
+        except Exception as e:
+            print(f"❌ Supabase Error: {e}")
+            return {}
+        return {"period": period, "total_trades": trades.count or 0, **performance_from_snapshots(snapshots.data)}
+
     # Stubs
-    async def save_portfolio_snapshot(self, snapshot: Dict[str, Any]) -> None: pass
-    async def get_performance_metrics(self, period: str = "30d") -> Dict[str, Any]: return {}
     async def save_agent_state(self, agent_name: str, state: Dict[str, Any]) -> None: pass
     async def load_agent_state(self, agent_name: str) -> Optional[Dict]: return None
@@ -4,6 +4,7 @@ Provides real-time news and research capabilities
 """
 from typing import List, Dict, Any, Optional
 from duckduckgo_search import DDGS
+from ..utils.async_io import run_blocking
 
 class NewsMCPClient:
     """
@@ -26,14 +27,12 @@ class NewsMCPClient:
         """
         print(f"📰 Searching News for: {query}")
         try:
-            # DDGS is synchronous, but fast. In a high-perf asyncio app we might wrap in thread executor,
-            # but for this scale direct call is fine or we can use the async wrapper if available (v6 has async? sticking to sync for stability unless verified).
-            # v4+ usually sync. Let's wrap in simple sync call for now.
+            # DDGS is synchronous, so the call runs on the shared I/O pool
             
             # Map freshness
             timelimit = 'd' if freshness == '24h' else 'w'
             
-            results = self.ddgs.news(keywords=query, region="us-en", safesearch="off", timelimit=timelimit, max_results=count)
+            results = await run_blocking(self.ddgs.news, keywords=query, region="us-en", safesearch="off", timelimit=timelimit, max_results=count)
             
             # Normalize format
             normalized = []
@@ -42,7 +41,8 @@ class NewsMCPClient:
                     "title": r.get("title"),
                     "url": r.get("url"),
                     "source": r.get("source"),
-                    "published": r.get("date")
+                    "published": r.get("date"),
+                    "snippet": r.get("body")
                 })
             
             return normalized
@@ -53,7 +53,7 @@ class NewsMCPClient:
     
     async def deep_research(self, topic: str) -> Dict[str, Any]:
         """Simple Deep Search simulation using standard search"""
-        results = self.ddgs.text(keywords=topic, max_results=5)
+        results = await run_blocking(self.ddgs.text, keywords=topic, max_results=5)
         return {
             "summary": f"Research on {topic}",
             "sources": results
@@ -3,9 +3,12 @@ Notification MCP Client
 Sends alerts via Slack and Discord
 """
 import os
+import asyncio
 import aiohttp
 from typing import Optional, List, Dict, Any
 from enum import Enum
+from ..config import config
+from ..utils.async_io import run_blocking
 
 class AlertLevel(Enum):
     INFO = "info"
@@ -14,13 +17,30 @@ class AlertLevel(Enum):
     DANGER = "danger"
     CRITICAL = "critical"
 
+SEVERITY = [AlertLevel.INFO, AlertLevel.SUCCESS, AlertLevel.WARNING, AlertLevel.DANGER, AlertLevel.CRITICAL]
+DISCORD_MAX_CHARS = 2000
+
 class NotificationMCPClient:
-    """Multi-channel notification client"""
+    """
+    Multi-channel notification client.
+    Alerts are queued and returned from immediately; a background dispatcher coalesces
+    everything queued within NOTIFY_COALESCE_WINDOW into one message and delivers it over
+    a persistent aiohttp session (Discord) and a shared WebClient on the I/O pool (Slack),
+    retrying with backoff and honoring Discord's rate-limit headers.
+    """
     
     def __init__(self):
         self.slack_token = os.getenv("SLACK_BOT_TOKEN")
         self.slack_channel = os.getenv("SLACK_CHANNEL", "#trading-alerts")
         self.discord_webhook = os.getenv("DISCORD_WEBHOOK_URL")
+
+        self._slack = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+        self.sent = 0
+        self.dropped = 0
     
     async def send_trade_alert(
         self,
@@ -57,29 +77,111 @@ class NotificationMCPClient:
         await self._send_to_all(message, AlertLevel.CRITICAL)
     
     async def _send_to_all(self, message: str, level: AlertLevel) -> None:
-        """Send to all enabled channels"""
+        """Queue for all enabled channels (returns immediately)"""
         print(f"NOTIFICATION [{level.value}]: {message}") # Console Fallback
 
-        if self.discord_webhook:
+        if not (self.discord_webhook or self.slack_token):
+            return
+        self._ensure_worker()
+        if self._queue.full():
+            self._queue.get_nowait()  # Bounded: the oldest alert gives way
+            self._queue.task_done()
+            self.dropped += 1
+        self._queue.put_nowait((message, level))
+
+    def _ensure_worker(self) -> None:
+        # Queue, session and worker belong to one event loop; rebuild them on a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=config.trading.NOTIFY_QUEUE_SIZE)
+            self._session = None
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._dispatch())
+
+    async def flush(self) -> None:
+        """Wait until every queued alert has been delivered (or given up on)"""
+        if self._queue is not None and self._loop is asyncio.get_running_loop():
+            await self._queue.join()
+
+    async def aclose(self) -> None:
+        await self.flush()
+        if self._worker is not None:
+            self._worker.cancel()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+
+    async def _dispatch(self) -> None:
+        trading = config.trading
+        while True:
+            batch = [await self._queue.get()]
+            # Coalesce: whatever arrives within the window joins this message
+            deadline = asyncio.get_running_loop().time() + trading.NOTIFY_COALESCE_WINDOW
+            while len(batch) < trading.NOTIFY_MAX_BATCH:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            message = "\n\n".join(m for m, _ in batch)
+            level = max((lvl for _, lvl in batch), key=SEVERITY.index)
             try:
-                async with aiohttp.ClientSession() as session:
-                    # Simple color coding for embeds could be added, but sending plain content first
-                    payload = {"content": message}
-                    async with session.post(self.discord_webhook, json=payload) as response:
-                        if response.status >= 300:
-                            print(f"❌ Discord API Error: {response.status}")
-                            print(await response.text())
-                        else:
-                            print(f"✅ Discord Sent: {response.status}")
+                await self._deliver(message, level)
+                self.sent += 1
             except Exception as e:
-                print(f"Failed to send Discord alert: {e}")
-        
+                print(f"Failed to deliver notification: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def _deliver(self, message: str, level: AlertLevel) -> None:
+        if self.discord_webhook:
+            # Discord caps a message at 2000 characters
+            for start in range(0, len(message), DISCORD_MAX_CHARS):
+                await self._post_discord({"content": message[start:start + DISCORD_MAX_CHARS]})
+
         if self.slack_token:
             try:
-                from slack_sdk import WebClient
-                client = WebClient(token=self.slack_token)
-                client.chat_postMessage(channel=self.slack_channel, text=message)
+                if self._slack is None:
+                    from slack_sdk import WebClient
+                    self._slack = WebClient(token=self.slack_token)
+                # slack_sdk is synchronous: keep it off the event loop
+                await run_blocking(self._slack.chat_postMessage, channel=self.slack_channel, text=message)
             except Exception as e:
                 print(f"Failed to send Slack alert: {e}")
 
+    async def _post_discord(self, payload: Dict[str, Any]) -> None:
+        trading = config.trading
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=trading.IO_TIMEOUT))
+
+        for attempt in range(trading.NOTIFY_MAX_RETRIES):
+            backoff = trading.NOTIFY_BACKOFF * 2 ** attempt
+            try:
+                async with self._session.post(self.discord_webhook, json=payload) as response:
+                    if response.status < 300:
+                        print(f"✅ Discord Sent: {response.status}")
+                        return
+                    if response.status == 429:
+                        # Seconds until the bucket resets: header first, then the JSON body
+                        delay = response.headers.get("Retry-After") or response.headers.get("X-RateLimit-Reset-After")
+                        if delay is None:
+                            body = await response.json(content_type=None)
+                            delay = (body or {}).get("retry_after", backoff)
+                        await asyncio.sleep(float(delay))
+                        continue
+                    if response.status < 500:
+                        print(f"❌ Discord API Error: {response.status}")
+                        print(await response.text())
+                        return
+                    print(f"⚠️ Discord {response.status}, retrying in {backoff:.0f}s")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"⚠️ Discord send failed ({e}), retrying in {backoff:.0f}s")
+            await asyncio.sleep(backoff)
+        print("❌ Discord alert dropped after retries")
+
 notification_client = NotificationMCPClient()
@@ -13,6 +13,7 @@ class TradingState(TypedDict, total=False):
     # Technical Analysis
     technical_signals: dict  # RSI, MACD, BB, ATR, SMA20, SMA50
     technical_score: float   # -1 to 1
+    volatility: dict         # atr, atr_pct, realized_vol, ewma_vol (annualized)
     
     # Sentiment Analysis
     news_headlines: Annotated[List[str], operator.add]
@@ -41,6 +42,8 @@ class TradingState(TypedDict, total=False):
     stop_loss_price: Optional[float]
     take_profit_price: Optional[float]
     reasoning: str
+    decision_provider: str       # "gemini", "groq", "cache" or "none"
+    decision_latency_ms: float
     
     # Execution
     order_id: Optional[str]
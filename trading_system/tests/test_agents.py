@@ -1,9 +1,37 @@
 import unittest
+import asyncio
+import json
+from langchain_core.runnables import RunnableLambda
 from trading_system.agents.technical_analyst import technical_analyst
 from trading_system.agents.macro_analyst import macro_analyst
+from trading_system.agents.strategist import Strategist, strategist
+from trading_system.config import config
+from trading_system.utils.llm_client import llm_client
+from trading_system.agents.news_researcher import NewsResearcherAgent
+from trading_system.utils.news_ingestion import Article
 from trading_system.state import TradingState
+from trading_system.agents import executor as executor_module
+from trading_system import main as main_module
+from trading_system.utils.circuit_breaker import CircuitBreaker
+from unittest import mock
+import os
+import tempfile
+from itertools import product
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+from trading_system.agents.quant_researcher import (
+    QuantResearcher, build_close_frame, optimize_close_frame, optimize_parallel, sweep_rsi, sweep_sma
+)
 
 class TestAgents(unittest.TestCase):
+    def setUp(self):
+        # Fake models below shouldn't spend (or wait on) the shared provider rate limits
+        self._buckets, llm_client.buckets = llm_client.buckets, {}
+
+    def tearDown(self):
+        llm_client.buckets = self._buckets
+
     def test_technical_analyst_structure(self):
         state = TradingState(ticker="AAPL")
         # Mocking run not easily possible without internet/mocking yfinance
@@ -12,6 +40,277 @@ class TestAgents(unittest.TestCase):
 
     def test_macro_analyst_structure(self):
         self.assertTrue(hasattr(macro_analyst, 'run'))
+
+    def test_strategist_cache_key_ignores_jitter(self):
+        def key(price, score, headlines):
+            state = TradingState(ticker="AAPL", current_price=price, technical_score=score,
+                                 technical_signals={"RSI": 41.2}, news_headlines=headlines)
+            inputs = {"ticker": "AAPL", "price": price, "vix_regime": "normal", "vix_level": 18.2,
+                      "sector_momentum": 0.01, "technical_score": score, "sentiment_score": 0.2,
+                      "research_report": "None"}
+            return strategist.cache_key(inputs, state)
+
+        base = key(150.00, 0.25, ["Apple beats", "iPhone sales up"])
+        self.assertEqual(base, key(150.10, 0.26, ["iphone  sales up", "Apple beats"]))
+        self.assertNotEqual(base, key(153.00, 0.25, ["Apple beats", "iPhone sales up"]))
+        self.assertNotEqual(base, key(150.00, -0.25, ["Apple beats", "iPhone sales up"]))
         
+    def test_strategist_hedges_slow_primary(self):
+        def fake_model(delay, action):
+            async def respond(prompt):
+                await asyncio.sleep(delay)
+                return json.dumps({"action": action, "confidence": 0.8, "reasoning": "test"})
+            return RunnableLambda(respond)
+
+        trading = config.trading
+        saved = trading.STRATEGIST_DEADLINE, trading.STRATEGIST_HEDGE_AFTER
+        trading.STRATEGIST_DEADLINE, trading.STRATEGIST_HEDGE_AFTER = 0.5, 0.05
+        try:
+            inputs = {"ticker": "AAPL", "price": 150.0, "vix_regime": "normal", "vix_level": 18.0,
+                      "sector_momentum": 0.0, "technical_score": 0.3, "technical_signals": "{}",
+                      "sentiment_score": 0.1, "headlines": "[]", "research_report": "None"}
+            hedged = Strategist()
+            hedged._llm, hedged._fast_llm = fake_model(0.3, "BUY"), fake_model(0.01, "SELL")
+            provider, decision = asyncio.run(hedged.decide(inputs))
+            self.assertEqual((provider, decision.action), ("groq", "SELL"))
+
+            # Fast primary answers before the hedge is ever started
+            hedged._llm = fake_model(0.01, "BUY")
+            self.assertEqual(asyncio.run(hedged.decide(inputs))[0], "gemini")
+
+            hedged._llm, hedged._fast_llm = fake_model(1.0, "BUY"), fake_model(1.0, "SELL")
+            with self.assertRaises(TimeoutError):
+                asyncio.run(hedged.decide(inputs))
+        finally:
+            trading.STRATEGIST_DEADLINE, trading.STRATEGIST_HEDGE_AFTER = saved
+
+    def test_strategist_batch_retries_missing_tickers(self):
+        calls = []
+
+        async def respond(prompt):
+            text = prompt.to_string()
+            if "one trading decision per ticker" in text:
+                calls.append("batch")
+                # Model only answers two of the three tickers
+                return json.dumps({"decisions": [
+                    {"ticker": "AAPL", "action": "BUY", "confidence": 0.7, "reasoning": "a"},
+                    {"ticker": "MSFT", "action": "SELL", "confidence": 0.6, "reasoning": "m"}
+                ]})
+            calls.append("single")
+            return json.dumps({"action": "HOLD", "confidence": 0.5, "reasoning": "retry"})
+
+        batched = Strategist()
+        batched._llm = RunnableLambda(respond)
+        inputs = [{"ticker": t, "price": 100.0, "vix_regime": "normal", "vix_level": 18.0, "sector_momentum": 0.0,
+                   "technical_score": 0.3, "technical_signals": "{}", "sentiment_score": 0.1,
+                   "headlines": "[]", "research_report": "None"} for t in ("AAPL", "MSFT", "NVDA")]
+
+        results = asyncio.run(batched._decide_batch(inputs))
+        self.assertEqual([(p, d.action) for p, d in results],
+                         [("gemini-batch", "BUY"), ("gemini-batch", "SELL"), ("gemini", "HOLD")])
+        self.assertEqual(sorted(calls), ["batch", "single"])
+
+        # Token cap splits the request
+        trading = config.trading
+        saved = trading.STRATEGIST_BATCH_TOKENS
+        trading.STRATEGIST_BATCH_TOKENS = batched.estimate_tokens(batched.batch_prompt.format(contexts="")) + 150
+        try:
+            self.assertEqual(batched.chunk_by_tokens(["x" * 400] * 3), [[0], [1], [2]])
+        finally:
+            trading.STRATEGIST_BATCH_TOKENS = saved
+        self.assertEqual(batched.chunk_by_tokens(["x" * 400] * 3), [[0, 1, 2]])
+
+    def test_news_researcher_reuses_report_for_same_results(self):
+        snapshots = iter([
+            [Article("Apple beats", "u1", "s", "", 1.0), Article("New iPhone", "u2", "s", "", 2.0)],
+            [Article("New iPhone", "u2", "s", "", 2.0), Article("Apple beats", "u1", "s", "", 1.0)],
+            [Article("Apple sued", "u3", "s", "", 3.0)]
+        ])
+        reports = []
+
+        class FakeNews:
+            async def get(self, ticker, kind="news"):
+                assert kind == "research"
+                return next(snapshots)
+
+        async def synthesize(prompt):
+            reports.append(prompt)
+            return f"report {len(reports)}"
+
+        researcher = NewsResearcherAgent()
+        researcher.news = FakeNews()
+        researcher._llm = RunnableLambda(synthesize)
+
+        run = lambda: asyncio.run(researcher.run({"ticker": "AAPL"}))["research_report"]
+        self.assertEqual([run(), run(), run()], ["report 1", "report 1", "report 2"])
+
+    def test_executor_books_fills_from_order_polls(self):
+        class Orders:
+            """Stands in for the Alpaca order endpoint: a limit order that fills over two polls"""
+            def __init__(self):
+                self.polls = [
+                    {"id": "o1", "status": "partially_filled", "filled_qty": 1.0, "filled_avg_price": 100.0},
+                    {"id": "o1", "status": "filled", "filled_qty": 3.0, "filled_avg_price": 101.0},
+                ]
+
+            async def get_order(self, order_id):
+                return self.polls.pop(0)
+
+        async def go(breaker):
+            executor = executor_module.Executor()
+            executor.alpaca = Orders()
+            submitted = {"id": "o1", "status": "new", "filled_qty": 0.0, "filled_avg_price": None}
+            await executor.track_fills(submitted, "AAPL", "buy", 100.0)
+            return breaker.writer.execute("SELECT qty, price FROM fills ORDER BY ts").fetchall()
+
+        trading = config.trading
+        saved = trading.FILL_POLL_INTERVAL
+        trading.FILL_POLL_INTERVAL = 0.01
+        try:
+            with tempfile.TemporaryDirectory() as root:
+                breaker = CircuitBreaker(os.path.join(root, "breaker.sqlite"))
+                with mock.patch.object(executor_module, "circuit_breaker", breaker):
+                    fills = asyncio.run(go(breaker))
+        finally:
+            trading.FILL_POLL_INTERVAL = saved
+
+        # Submit response had no fill; the two polls book 1 @ 100 and the 2-share increment @ 101.5
+        self.assertEqual(len(fills), 2)
+        self.assertEqual(fills[0], (1.0, 100.0))
+        self.assertAlmostEqual(fills[1][0], 2.0)
+        self.assertAlmostEqual(fills[1][1], 101.5)
+
+    def test_pending_order_logged_at_limit_price(self):
+        async def go():
+            executor = executor_module.Executor()
+            executor.alpaca = mock.Mock(submit_order=mock.AsyncMock(
+                return_value={"id": "o2", "status": "new", "filled_qty": 0.0, "filled_avg_price": None}))
+            executor.db = mock.Mock(log_trade=mock.AsyncMock(return_value="queued"))
+            executor.notify = mock.Mock(send_trade_alert=mock.AsyncMock())
+            with mock.patch.object(executor, "track_fills", mock.AsyncMock()):
+                result = await executor.run({"risk_approved": True, "final_action": "BUY", "ticker": "AAPL",
+                                             "position_size": 3, "current_price": 187.25})
+            return result, executor.db.log_trade.call_args.args[0]
+
+        result, row = asyncio.run(go())
+        self.assertEqual(result["order_id"], "o2")
+        self.assertEqual(row["price"], 187.25)
+        self.assertEqual(row["order_id"], "o2")
+
+def random_closes(seed: int, lengths: dict) -> dict:
+    rng = np.random.default_rng(seed)
+    return {t: 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n))) for t, n in lengths.items()}
+
+class TestQuantResearcher(unittest.TestCase):
+    def test_sweeps_match_standalone_backtests(self):
+        closes = random_closes(5, {"AAPL": 300, "MSFT": 160, "NVDA": 300})
+        close = build_close_frame(closes, 300)
+        rsi_scores = sweep_rsi(close, [10, 14], [30], [65, 70], chunk_columns=5)
+        sma_scores = sweep_sma(close, [5, 10], [20, 40], chunk_columns=5)
+
+        for ticker, values in closes.items():
+            series = pd.Series(values)
+            for (w, b, s) in product([10, 14], [30], [65, 70]):
+                rsi = vbt.RSI.run(series, window=w).rsi
+                expected = vbt.Portfolio.from_signals(series, rsi < b, rsi > s, init_cash=10000, freq='D', fees=0.001).sharpe_ratio()
+                self.assertAlmostEqual(rsi_scores[(w, b, s, ticker)], expected, places=9, msg=(ticker, w, b, s))
+            for (f, s) in product([5, 10], [20, 40]):
+                fast, slow = vbt.MA.run(series, window=f).ma, vbt.MA.run(series, window=s).ma
+                entries = (fast > slow) & (fast.shift(1) < slow.shift(1))
+                exits = (fast < slow) & (fast.shift(1) > slow.shift(1))
+                expected = vbt.Portfolio.from_signals(series, entries, exits, init_cash=10000, freq='D').total_return()
+                self.assertAlmostEqual(sma_scores[(f, s, ticker)], expected, places=9, msg=(ticker, f, s))
+
+    def test_parallel_optimization_matches_serial_and_merges_config(self):
+        closes = random_closes(9, {"AAPL": 250, "MSFT": 180, "NVDA": 250})
+        close = build_close_frame(closes, 250)
+        strip = lambda results: {t: {k: v for k, v in p.items() if k != "last_optimized"} for t, p in results.items()}
+
+        serial = strip(optimize_close_frame(close))
+        parallel = asyncio.run(optimize_parallel(close, 1))
+        self.assertEqual(list(parallel), list(close.columns))
+        self.assertEqual(strip(parallel), serial)
+
+        # 2 workers, through the full run: results merged into an existing config on disk
+
+        with tempfile.TemporaryDirectory() as root:
+            researcher = QuantResearcher()
+            researcher.config_path = os.path.join(root, "strategy_config.json")
+            existing = {"tickers": {"TSLA": {"rsi": {"window": 12}}}, "notes": "kept"}
+            with open(researcher.config_path, "w") as f:
+                json.dump(existing, f)
+
+            with mock.patch.object(researcher, "load_closes", mock.AsyncMock(return_value=closes)):
+                result = asyncio.run(researcher.run_optimization(list(closes), workers=2))
+
+            self.assertEqual(result, {"status": "optimized", "updated_tickers": list(closes)})
+            self.assertEqual(os.listdir(root), ["strategy_config.json"])  # Temp file swapped in
+            with open(researcher.config_path) as f:
+                saved = json.load(f)
+            self.assertEqual(saved["notes"], "kept")
+            self.assertEqual(saved["tickers"]["TSLA"], existing["tickers"]["TSLA"])
+            self.assertEqual(strip({t: saved["tickers"][t] for t in closes}), serial)
+            self.assertIn("updated_at", saved)
+
+class TestPortfolioCycle(unittest.TestCase):
+    def test_concurrency_bounded_and_failures_isolated(self):
+        class Graph:
+            active = peak = 0
+
+            async def ainvoke(self, state, config_run):
+                Graph.active += 1
+                Graph.peak = max(Graph.peak, Graph.active)
+                try:
+                    await asyncio.sleep(0.02)
+                    if state["ticker"] == "BAD":
+                        raise RuntimeError("boom")
+                    return {"ticker": state["ticker"], "thread": config_run["configurable"]["thread_id"], "price": state["current_price"],
+                            "equity": state["account_value"]}
+                finally:
+                    Graph.active -= 1
+
+        tickers = ["AAPL", "BAD", "MSFT", "NVDA", "AMZN", "TSLA", "META", "NOPRICE"]
+        prices = {t: 100.0 + i for i, t in enumerate(tickers) if t != "NOPRICE"}
+        with tempfile.TemporaryDirectory() as root:
+            breaker = CircuitBreaker(os.path.join(root, "breaker.sqlite"))
+            with mock.patch.object(main_module, "circuit_breaker", breaker):
+                account = {"account_value": 25_000.0, "daily_pnl": -120.0}
+                states = asyncio.run(main_module.run_portfolio_cycle(Graph(), tickers, prices, account, max_concurrency=2))
+
+        self.assertEqual(Graph.peak, 2)
+        self.assertEqual(list(states), tickers)
+        self.assertEqual(states["BAD"], {"ticker": "BAD", "error": "boom"})
+        self.assertEqual(states["NOPRICE"], {"ticker": "NOPRICE", "error": "No price available"})  # Never run
+        for ticker in prices.keys() - {"BAD"}:
+            self.assertEqual(states[ticker], {"ticker": ticker, "thread": ticker, "price": prices[ticker], "equity": 25_000.0})
+
+    def test_daily_loss_limit_uses_live_equity(self):
+        graph = mock.Mock(ainvoke=mock.AsyncMock(return_value={"final_action": "HOLD"}))
+
+        async def go(breaker):
+            # Realized -600 today: 6% of a 10k account (tripped), 0.6% of the old hard-coded 100k (not)
+            await breaker.record_fill("AAPL", "buy", 10, 100.0)
+            await breaker.record_fill("AAPL", "sell", 10, 40.0)
+            account = {"account_value": 10_000.0, "daily_pnl": 0.0}
+            return await main_module.run_ticker(graph, "AAPL", asyncio.Semaphore(1), 40.0, account)
+
+        with tempfile.TemporaryDirectory() as root:
+            breaker = CircuitBreaker(os.path.join(root, "breaker.sqlite"))
+            with mock.patch.object(main_module, "circuit_breaker", breaker):
+                state = asyncio.run(go(breaker))
+
+        self.assertIn("Daily Loss Limit", state["error"])
+        graph.ainvoke.assert_not_called()
+
+    def test_prices_fall_back_to_cached_bars(self):
+        streamed = {"AAPL": 190.5}
+        bars = mock.AsyncMock(return_value={"MSFT": [{"c": 410.0}, {"c": 412.25}], "DELISTED": []})
+        with mock.patch.object(main_module.data_pipeline, "get_latest_price", side_effect=lambda t: streamed.get(t, 0.0)), \
+             mock.patch.object(main_module.executor.alpaca, "get_bars_batch", bars):
+            prices = asyncio.run(main_module.latest_prices(["AAPL", "MSFT", "DELISTED"]))
+
+        self.assertEqual(prices, {"AAPL": 190.5, "MSFT": 412.25})
+        self.assertEqual(bars.call_args.args[0], ["MSFT", "DELISTED"])  # One batched request for the rest
+
 if __name__ == '__main__':
     unittest.main()
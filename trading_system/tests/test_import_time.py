@@ -0,0 +1,33 @@
+import os
+import subprocess
+import sys
+import unittest
+
+# Seconds allowed for a cold `import trading_system.graph` (FinBERT/LLM loading must stay lazy)
+IMPORT_BUDGET_SECONDS = 6.0
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PROBE = """
+import sys, time
+start = time.perf_counter()
+import trading_system.graph
+elapsed = time.perf_counter() - start
+heavy = [m for m in ("transformers", "torch", "langchain_google_genai", "langchain_community") if m in sys.modules]
+print(f"{elapsed}|{','.join(heavy)}")
+"""
+
+class TestImportTime(unittest.TestCase):
+    def test_graph_import_budget(self):
+        result = subprocess.run(
+            [sys.executable, "-c", PROBE],
+            cwd=REPO_ROOT, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+        elapsed, heavy = result.stdout.strip().splitlines()[-1].split("|")
+        self.assertEqual(heavy, "", f"Heavy modules imported eagerly: {heavy}")
+        self.assertLess(float(elapsed), IMPORT_BUDGET_SECONDS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,6 +2,10 @@ import unittest
 import asyncio
 from trading_system.mcp.alpaca_client import AlpacaMCPClient
 from trading_system.mcp.news_client import NewsMCPClient
+from trading_system.mcp.notification_client import NotificationMCPClient
+from trading_system.mcp.database_client import performance_from_snapshots
+from trading_system.config import config
+from aiohttp import web
 
 class TestMCPClients(unittest.TestCase):
     def test_alpaca_init(self):
@@ -12,5 +16,61 @@ class TestMCPClients(unittest.TestCase):
         client = NewsMCPClient()
         self.assertIsNotNone(client)
 
+    def test_notifications_coalesce_and_honor_rate_limit(self):
+        received = []
+
+        async def webhook(request):
+            received.append((await request.json())["content"])
+            if len(received) == 1:
+                return web.json_response({"retry_after": 0.05}, status=429)
+            return web.Response(status=204)
+
+        async def go():
+            app = web.Application()
+            app.router.add_post("/hook", webhook)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            client = NotificationMCPClient()
+            client.slack_token, client.discord_webhook = None, f"http://127.0.0.1:{port}/hook"
+            await client.send_risk_alert("a", {})
+            await client.send_risk_alert("b", {})
+            await client.send_circuit_breaker_alert("c", "now")
+            queued_immediately = client._queue.qsize()
+            await client.aclose()
+            await runner.cleanup()
+            return queued_immediately, client.sent
+
+        trading = config.trading
+        saved = trading.NOTIFY_COALESCE_WINDOW
+        trading.NOTIFY_COALESCE_WINDOW = 0.1
+        try:
+            queued, sent = asyncio.run(go())
+        finally:
+            trading.NOTIFY_COALESCE_WINDOW = saved
+
+        self.assertEqual(queued, 3)        # Senders returned before any delivery
+        self.assertEqual(sent, 1)          # One coalesced message...
+        self.assertEqual(len(received), 2) # ...retried once after the 429
+        self.assertIn("Type: a", received[1])
+        self.assertIn("CIRCUIT BREAKER", received[1])
+
+    def test_performance_from_snapshots(self):
+        snapshots = [
+            {"total_value": 100_000, "daily_pnl": 0},
+            {"total_value": 101_000, "daily_pnl": 1_000},
+            {"total_value": 99_990, "daily_pnl": -1_010},
+            {"total_value": 100_490, "daily_pnl": 500},
+        ]
+        metrics = performance_from_snapshots(snapshots)
+        self.assertEqual((metrics["winning_days"], metrics["losing_days"]), (2, 1))
+        self.assertAlmostEqual(metrics["net_profit"], 490)
+        self.assertAlmostEqual(metrics["profit_factor"], 1500 / 1010)
+        self.assertAlmostEqual(metrics["max_drawdown"], 0.01)
+        self.assertEqual(performance_from_snapshots([]), {})
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,597 @@
+import unittest
+import asyncio
+import time
+import os
+import tempfile
+import json
+import warnings
+import numpy as np
+from datetime import datetime, timedelta
+from trading_system.utils.bar_cache import BarCache, lookback_start
+from trading_system.utils.async_io import run_blocking
+from trading_system.utils.micro_batcher import MicroBatcher
+from trading_system.utils.indicators import IndicatorEngine
+from trading_system.utils.event_scheduler import EventScheduler
+from trading_system.utils.bar_store import BarRing, BarStore
+from trading_system.utils.bar_archive import BarArchive
+from trading_system.utils.walk_forward import IndicatorCache, WalkForwardOptimizer
+from trading_system.utils.decision_cache import DecisionCache
+from trading_system.utils.rate_limiter import TokenBucket
+from trading_system.utils.llm_client import LLMClient, LLMPriority
+from langchain_core.runnables import RunnableLambda
+from trading_system.utils.news_ingestion import Article, NewsIngestion, NewsStore
+from trading_system.utils.write_behind import WriteBehindBuffer, is_unreachable
+from trading_system.utils.macro_snapshot import MacroMatrix
+from trading_system.utils.portfolio_risk import allocate, covariance
+from trading_system.utils.volatility import VolatilityService, compute_volatility
+from trading_system.utils.indicators import ATR
+from trading_system.utils.circuit_breaker import CircuitBreaker, adverse_slippage
+from trading_system.config import config
+import pandas as pd
+import vectorbt as vbt
+
+def make_bars(start: datetime, n: int, price: float = 100.0):
+    return [{"t": start + timedelta(days=i), "o": price, "h": price, "l": price, "c": price + i, "v": 1000}
+            for i in range(n)]
+
+class TestBarCache(unittest.TestCase):
+    def test_batch_miss_then_incremental_tail(self):
+        base = datetime(2024, 1, 1)
+        calls = []
+
+        def fetch(symbols, timeframe, start):
+            calls.append((tuple(symbols), start))
+            if len(calls) == 1:
+                return {s: make_bars(base, 10) for s in symbols}
+            # Top-up: re-sends the tail bar plus one new bar
+            return {s: make_bars(base + timedelta(days=9), 2) for s in symbols}
+
+        cache = BarCache(ttl=0, max_series=10, max_bars=100)
+        first = cache.get_many(["AAPL", "MSFT"], "1Day", 5, fetch, base)
+        self.assertEqual(len(calls), 1)  # One request for both symbols
+        self.assertEqual(len(first["AAPL"]), 5)
+
+        second = cache.get_many(["AAPL", "MSFT"], "1Day", 5, fetch, base)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[1][1], base + timedelta(days=9))  # Fetch starts at cached tail
+        self.assertEqual(second["AAPL"][-1]["t"], base + timedelta(days=10))
+        self.assertEqual(len({b["t"] for b in second["AAPL"]}), 5)  # No duplicated tail bar
+
+    def test_fresh_series_skips_fetch(self):
+        calls = []
+
+        def fetch(symbols, timeframe, start):
+            calls.append(symbols)
+            return {s: make_bars(datetime(2024, 1, 1), 20) for s in symbols}
+
+        cache = BarCache(ttl=3600, max_series=10, max_bars=100)
+        cache.get_many(["AAPL"], "1Day", 20, fetch, datetime(2024, 1, 1))
+        cache.get_many(["AAPL"], "1Day", 10, fetch, datetime(2024, 1, 1))
+        self.assertEqual(len(calls), 1)
+
+    def test_concurrent_misses_share_one_fetch(self):
+        calls = []
+
+        def fetch(symbols, timeframe, start):
+            calls.append(tuple(symbols))
+            time.sleep(0.1)
+            return {s: make_bars(datetime(2024, 1, 1), 20) for s in symbols}
+
+        async def fan_out():
+            return await asyncio.gather(*(
+                run_blocking(cache.get_many, ["AAPL"], "1Min", 20, fetch, datetime(2024, 1, 1)) for _ in range(4)
+            ))
+
+        cache = BarCache(ttl=3600, max_series=10, max_bars=100)
+        results = asyncio.run(fan_out())
+        self.assertEqual(calls, [("AAPL",)])
+        self.assertTrue(all(len(r["AAPL"]) == 20 for r in results))
+
+    def test_minute_start_counts_trading_sessions(self):
+        now = datetime(2024, 6, 14, 15, 0)  # A Friday
+        self.assertLessEqual(now - lookback_start("1Min", 200, now), timedelta(days=7))
+        self.assertGreaterEqual(now - lookback_start("1Min", 2000, now), timedelta(days=7))  # 6 sessions
+        self.assertEqual(now - lookback_start("1Day", 200, now), timedelta(days=400))
+
+class TestRunBlocking(unittest.TestCase):
+    def test_blocking_calls_overlap(self):
+        async def fan_out():
+            start = time.monotonic()
+            await asyncio.gather(*(run_blocking(time.sleep, 0.2) for _ in range(4)))
+            return time.monotonic() - start
+
+        self.assertLess(asyncio.run(fan_out()), 0.6)
+
+    def test_timeout(self):
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(run_blocking(time.sleep, 0.5, timeout=0.05))
+
+class TestMicroBatcher(unittest.TestCase):
+    def test_concurrent_submits_share_one_batch(self):
+        batches = []
+
+        async def process(items):
+            batches.append(items)
+            return [i * 10 for i in items]
+
+        async def go():
+            batcher = MicroBatcher(process, window=0.01)
+            return await asyncio.gather(batcher.submit([1, 2]), batcher.submit([3]))
+
+        self.assertEqual(asyncio.run(go()), [[10, 20], [30]])
+        self.assertEqual(batches, [[1, 2, 3]])
+
+class TestIndicatorEngine(unittest.TestCase):
+    def test_matches_ta(self):
+        import numpy as np
+        import pandas as pd
+        import ta
+
+        rng = np.random.default_rng(7)
+        close = pd.Series(100 * np.exp(np.cumsum(rng.normal(0, 0.02, 250))))
+        high = close * (1 + rng.uniform(0, 0.01, 250))
+        low = close * (1 - rng.uniform(0, 0.01, 250))
+
+        engine = IndicatorEngine(rsi_window=14, sma_fast=20, sma_slow=50)
+        for i in range(len(close) - 1):
+            engine.update({"t": i, "c": close[i], "h": high[i], "l": low[i]})
+        last = len(close) - 1
+        latest = engine.update({"t": last, "c": close[last], "h": high[last], "l": low[last]}, commit=False)
+
+        bb = ta.volatility.BollingerBands(close=close, window=20, window_dev=2)
+        expected = {
+            "RSI": ta.momentum.RSIIndicator(close=close, window=14).rsi(),
+            "MACD_Hist": ta.trend.MACD(close=close, window_slow=26, window_fast=12, window_sign=9).macd_diff(),
+            "BBL": bb.bollinger_lband(),
+            "BBU": bb.bollinger_hband(),
+            "ATR": ta.volatility.AverageTrueRange(high=high, low=low, close=close, window=14).average_true_range(),
+            "SMA_FAST": ta.trend.SMAIndicator(close=close, window=20).sma_indicator(),
+            "SMA_SLOW": ta.trend.SMAIndicator(close=close, window=50).sma_indicator()
+        }
+        for name, series in expected.items():
+            self.assertAlmostEqual(latest[name], series.iloc[-1], places=8, msg=name)
+
+class TestEventScheduler(unittest.TestCase):
+    def test_burst_coalesces_and_small_moves_skip(self):
+        runs = []
+
+        async def run_fn(ticker):
+            runs.append(ticker)
+
+        async def go():
+            scheduler = EventScheduler(run_fn, price_threshold=0.01, bar_minutes=15, debounce=0.05)
+            queue = asyncio.Queue()
+            consumer = asyncio.create_task(scheduler.consume("AAPL", queue))
+            t0 = datetime(2024, 1, 2, 10, 0)
+
+            # Burst inside one bucket: the 2% jumps land during the debounce and fold into the first run
+            for i, price in enumerate([100.0, 102.0, 104.5, 104.6]):
+                queue.put_nowait({"t": t0 + timedelta(seconds=i), "c": price})
+                await asyncio.sleep(0)
+            await asyncio.sleep(0.2)
+            burst_runs = len(runs)
+
+            # Sub-threshold move in the same bucket: no run; new bucket: one run
+            queue.put_nowait({"t": t0 + timedelta(minutes=1), "c": 104.7})
+            await asyncio.sleep(0.1)
+            queue.put_nowait({"t": t0 + timedelta(minutes=15), "c": 104.7})
+            await asyncio.sleep(0.1)
+            consumer.cancel()
+            return burst_runs, len(runs)
+
+        burst_runs, total_runs = asyncio.run(go())
+        self.assertEqual(burst_runs, 1)
+        self.assertEqual(total_runs, 2)
+
+class TestBarStore(unittest.TestCase):
+    def bar(self, minute, close):
+        return {"t": datetime(2024, 1, 2, 10, minute), "o": close, "h": close, "l": close, "c": close, "v": 1.0}
+
+    def test_ring_wraps_with_contiguous_views(self):
+        ring = BarRing(capacity=4)
+        for m in range(7):
+            ring.append(self.bar(m, 100.0 + m))
+        ring.append(self.bar(6, 200.0))  # Updated bar replaces the newest one
+
+        window = ring.last(3)
+        self.assertEqual(window.c.tolist(), [104.0, 105.0, 200.0])
+        self.assertTrue(np.shares_memory(window.c, ring.cols["c"]))
+        self.assertEqual(window[-1]["t"].replace(tzinfo=None), datetime(2024, 1, 2, 10, 6))
+        self.assertEqual(len(ring.last()), 4)
+
+    def test_history_seeded_before_streamed_bars(self):
+        store = BarStore(capacity=8)
+        store.append("AAPL", "1Min", self.bar(5, 105.0))
+        store.extend("AAPL", "1Min", [self.bar(m, 100.0 + m) for m in range(5)])
+        self.assertEqual(store.last("AAPL", "1Min").c.tolist(), [100.0, 101.0, 102.0, 103.0, 104.0, 105.0])
+        self.assertEqual(store.latest("AAPL", "1Min")["c"], 105.0)
+
+class TestBarArchive(unittest.TestCase):
+    def test_append_range_read_and_backfill(self):
+        with tempfile.TemporaryDirectory() as root:
+            archive = BarArchive(root)
+            day = datetime(2024, 1, 1)
+            bars = make_bars(day, 10)
+
+            self.assertEqual(archive.append("AAPL", "1Day", bars[5:]), 5)
+            self.assertEqual(archive.append("AAPL", "1Day", bars[5:]), 0)  # Already archived
+            self.assertEqual(archive.merge("AAPL", "1Day", bars[:7]), 5)     # Backfill the head
+
+            window = archive.read("AAPL", "1Day", day + timedelta(days=2), day + timedelta(days=4))
+            self.assertEqual(window.c.tolist(), [b["c"] for b in bars[2:5]])
+            self.assertIsInstance(window.c.base, np.memmap)
+            self.assertEqual(archive.last("AAPL", "1Day", 3).c.tolist(), [b["c"] for b in bars[7:]])
+
+            # A torn append (price columns longer than timestamps) is ignored and then overwritten
+            with open(os.path.join(root, "1Day", "AAPL", "c.bin"), "ab") as f:
+                f.write(np.array([1.0]).tobytes())
+            self.assertEqual(archive.size("AAPL", "1Day"), 10)
+            archive.append("AAPL", "1Day", make_bars(day + timedelta(days=10), 1, price=500.0))
+            self.assertEqual(archive.last("AAPL", "1Day", 1).c.tolist(), [500.0])
+
+    def test_daily_sources_merge_on_session_date(self):
+        with tempfile.TemporaryDirectory() as root:
+            archive = BarArchive(root)
+            # yfinance stamps daily bars at naive midnight, Alpaca at midnight New York (05:00 UTC)
+            yahoo = make_bars(datetime(2024, 1, 2), 3)
+            alpaca = make_bars(pd.Timestamp("2024-01-02 05:00", tz="UTC").to_pydatetime(), 3, price=200.0)
+
+            archive.merge("AAPL", "1Day", yahoo)
+            self.assertEqual(archive.merge("AAPL", "1Day", alpaca), 0)  # Same sessions, replaced
+            window = archive.read("AAPL", "1Day")
+            self.assertEqual(len(window), 3)
+            self.assertEqual(window.c.tolist(), [b["c"] for b in alpaca])
+            self.assertEqual(pd.DatetimeIndex(window.t).normalize().tolist(), pd.DatetimeIndex(window.t).tolist())
+
+            # Newer bars stay append-only: the tail session is rewritten in place, the files are not swapped
+            inode = os.stat(os.path.join(root, "1Day", "AAPL", "t.bin")).st_ino
+            mapped = archive.read("AAPL", "1Day")
+            forming = dict(alpaca[-1], c=250.0)
+            archive.append("AAPL", "1Day", [forming])
+            self.assertEqual(mapped.c.tolist(), [200.0, 201.0, 250.0])  # Same mapping, tail replaced in place
+            self.assertEqual(archive.merge("AAPL", "1Day", [forming] + make_bars(datetime(2024, 1, 5, 5), 2)), 2)
+            self.assertEqual(os.stat(os.path.join(root, "1Day", "AAPL", "t.bin")).st_ino, inode)
+            self.assertEqual(archive.read("AAPL", "1Day").c.tolist(), [200.0, 201.0, 250.0, 100.0, 101.0])
+
+            # A backfill after a crashed merge (stale .old directory) still swaps in
+            os.makedirs(os.path.join(root, "1Day", "AAPL.old"))
+            self.assertEqual(archive.merge("AAPL", "1Day", make_bars(datetime(2024, 1, 1), 1)), 1)
+            self.assertEqual(archive.size("AAPL", "1Day"), 6)
+
+class TestWalkForward(unittest.TestCase):
+    def test_windows_end_on_latest_bar(self):
+        optimizer = WalkForwardOptimizer(train_bars=10, test_bars=5, step_bars=5, cache=IndicatorCache())
+        splits = optimizer.windows(32)
+        self.assertEqual([(tr.start, tr.stop, te.start, te.stop) for tr, te in splits],
+                         [(2, 12, 12, 17), (7, 17, 17, 22), (12, 22, 22, 27), (17, 27, 27, 32)])
+        self.assertEqual(optimizer.windows(14), [])
+
+    def test_indicator_cache_extends_sliding_series(self):
+        close = 100 * np.exp(np.cumsum(np.random.default_rng(3).normal(0, 0.02, 300)))
+        cache = IndicatorCache()
+        for indicator in ("rsi", "ma"):
+            cache.get("AAPL", close[:250], indicator, 14)
+            # A later run: the 10 oldest bars rolled off, 50 new ones arrived
+            values = cache.get("AAPL", close[10:], indicator, 14)
+            np.testing.assert_allclose(values, IndicatorCache.compute(close[10:], indicator, 14), rtol=1e-9)
+        self.assertEqual((cache.computed, cache.extended), (2, 2))
+
+    def test_oos_metrics_match_direct_backtest(self):
+        close = pd.Series(100 * np.exp(np.cumsum(np.random.default_rng(11).normal(0, 0.02, 160))), name="AAPL")
+        optimizer = WalkForwardOptimizer(train_bars=60, test_bars=25, step_bars=25, cache=IndicatorCache())
+        result = optimizer.run_sma(close, [5, 10], [20, 30])
+
+        splits = optimizer.windows(len(close))
+        expected = np.full((len(splits), 4), np.nan)
+        for j, (fast, slow) in enumerate([(5, 20), (5, 30), (10, 20), (10, 30)]):
+            ma_fast, ma_slow = (vbt.MA.run(close, window=w).ma for w in (fast, slow))
+            entries = (ma_fast > ma_slow) & (ma_fast.shift(1) < ma_slow.shift(1))
+            exits = (ma_fast < ma_slow) & (ma_fast.shift(1) > ma_slow.shift(1))
+            for i, (_, test) in enumerate(splits):
+                sharpe = vbt.Portfolio.from_signals(close[test], entries[test], exits[test], init_cash=10000, freq='D').sharpe_ratio()
+                expected[i, j] = sharpe if np.isfinite(sharpe) else np.nan
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            np.testing.assert_allclose(result.param_metrics["oos_sharpe_mean"].values, np.nanmean(expected, axis=0))
+        np.testing.assert_array_equal(result.param_metrics["folds"].values, np.isfinite(expected).sum(0))
+        picked = [fold["oos_sharpe"] for fold in result.folds if "params" in fold]
+        self.assertAlmostEqual(result.oos_sharpe, np.nanmean(picked))
+
+class TestDecisionCache(unittest.TestCase):
+    def test_persists_across_instances_and_expires(self):
+        async def go(path):
+            cache = DecisionCache(path=path, ttl=60, maxsize=10)
+            self.assertIsNone(await cache.get("k"))
+            await cache.set("k", {"final_action": "BUY"})
+            self.assertEqual(await cache.get("k"), {"final_action": "BUY"})
+
+            # A fresh process (new instance) is served from SQLite
+            restarted = DecisionCache(path=path, ttl=60, maxsize=10)
+            self.assertEqual(await restarted.get("k"), {"final_action": "BUY"})
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+            expired = DecisionCache(path=path, ttl=-1, maxsize=10)
+            await expired.set("old", {"final_action": "SELL"})
+            self.assertIsNone(await DecisionCache(path=path, ttl=60).get("old"))
+            self.assertEqual(await expired.evict(), 1)
+
+        with tempfile.TemporaryDirectory() as root:
+            asyncio.run(go(os.path.join(root, "decisions.sqlite")))
+
+class TestLLMRegistry(unittest.TestCase):
+    def test_bucket_serves_priority_first(self):
+        async def go():
+            bucket = TokenBucket(rate_per_minute=600, burst=1)  # 1 token now, then one per 0.1s
+            order = []
+
+            async def request(name, priority):
+                await bucket.acquire(priority)
+                order.append(name)
+
+            await bucket.acquire()  # Drain the burst
+            await asyncio.gather(request("research", LLMPriority.RESEARCH), request("trade", LLMPriority.CRITICAL))
+            return order
+
+        self.assertEqual(asyncio.run(go()), ["trade", "research"])
+
+    def test_models_reused_and_429_fails_over(self):
+        client = LLMClient()
+        client.google_key, client.groq_key = "g", "q"
+        self.assertIs(client.get_model("gemini", timeout=5), client.get_model("gemini", timeout=5))
+
+        class RateLimited(Exception):
+            status_code = 429
+
+        async def limited(inputs):
+            raise RateLimited("quota exceeded")
+
+        client._models[("groq", None, 0.0, None, None)] = RunnableLambda(lambda inputs: "groq answer")
+        provider, output = asyncio.run(client.ainvoke(lambda model: model, {}, provider="gemini", model=RunnableLambda(limited)))
+        self.assertEqual((provider, output), ("groq", "groq answer"))
+        self.assertTrue(client.buckets["gemini"].blocked)
+
+class TestNewsIngestion(unittest.TestCase):
+    def test_store_dedupes_and_reads_by_time(self):
+        now = time.time()
+        store = NewsStore(similarity=0.85, retention_hours=48)
+        added = store.add("AAPL", [
+            Article("Apple beats earnings estimates", "https://www.site.com/a?utm_source=x", "s", "", now - 3600),
+            Article("Apple Beats Earnings Estimates!", "https://other.com/b", "s", "", now - 1800),  # Syndicated copy
+            Article("Apple sued over patents", "https://site.com/a", "s", "", now - 60),            # Same canonical URL
+            Article("iPhone sales slow in China", "https://site.com/c", "s", "", now - 30 * 3600),
+            Article("Ancient news", "https://site.com/old", "s", "", now - 72 * 3600)                # Past retention
+        ])
+        self.assertEqual(added, 3)
+        self.assertEqual([a.title for a in store.recent("AAPL", hours=24)], ["Apple beats earnings estimates"])
+        self.assertEqual(len(store.recent("AAPL", hours=48)), 2)
+
+    def test_concurrent_readers_share_one_fetch(self):
+        ingestion = NewsIngestion()
+        calls = []
+
+        class FakeClient:
+            async def search_news(self, query, **kwargs):
+                calls.append(query)
+                await asyncio.sleep(0.01)
+                title = "Apple falls on iPhone delay" if "price move" in query else "Apple beats"
+                return [{"title": title, "url": f"https://site.com/{len(calls)}", "source": "s", "published": None}]
+
+        ingestion.client = FakeClient()
+
+        async def go():
+            return await asyncio.gather(ingestion.get("AAPL"), ingestion.get("AAPL", kind="research"),
+                                        ingestion.get("AAPL"), ingestion.prefetch(["AAPL"]))
+
+        sentiment, research, again, _ = asyncio.run(go())
+        # One fetch: the headline search and the researcher's own query, once each
+        self.assertEqual(sorted(calls), ["AAPL stock news", "AAPL stock news reason for price move today"])
+        self.assertEqual([a.title for a in sentiment], [a.title for a in again])
+        self.assertEqual([a.title for a in research], ["Apple falls on iPhone delay"])
+
+class TestWriteBehindBuffer(unittest.TestCase):
+    def test_journal_while_down_then_replay_in_order(self):
+        written, state = [], {"up": False}
+
+        async def write(table, rows):
+            if not state["up"]:
+                raise ConnectionError("db down")
+            if any(r.get("bad") for r in rows):
+                raise ValueError("violates check constraint")
+            written.append((table, [r["n"] for r in rows]))
+
+        async def go(journal):
+            buffer = WriteBehindBuffer(write, journal_path=journal, max_rows=100, interval=60)
+            buffer.add("trades", {"n": 1})
+            buffer.add("trades", {"n": 2})
+            await buffer.flush()
+            spilled = buffer.spilled
+            state["up"] = True
+            buffer.add("trades", {"n": 3, "bad": True})
+            buffer.add("trades", {"n": 4})
+            await buffer.aclose()
+            return spilled, buffer
+
+        with tempfile.TemporaryDirectory() as root:
+            journal = os.path.join(root, "journal.jsonl")
+            spilled, buffer = asyncio.run(go(journal))
+            self.assertFalse(os.path.exists(journal))
+
+        self.assertEqual(spilled, 2)
+        # Journaled rows go first; the rejected row is dropped alone
+        self.assertEqual(written, [("trades", [1, 2]), ("trades", [4])])
+        self.assertEqual((buffer.written, buffer.rejected), (3, 1))
+
+    def test_outage_and_throttling_are_journaled(self):
+        from postgrest.exceptions import APIError
+        errors = [
+            APIError({"message": "JSON could not be generated", "code": 503, "details": "<html>Service Unavailable</html>"}),
+            APIError({"message": "Too many requests", "code": "429"}),
+            APIError({"message": "Could not connect to the database", "code": "PGRST001"}),
+        ]
+        calls = []
+
+        async def write(table, rows):
+            calls.append(len(rows))
+            raise errors[len(calls) - 1]
+
+        async def go(journal):
+            buffer = WriteBehindBuffer(write, journal_path=journal, max_rows=100, interval=60)
+            for n in range(3):
+                buffer.add("trades", {"n": n})
+                await buffer.flush()
+            with open(journal) as f:
+                return buffer, [json.loads(line)["row"]["n"] for line in f if line.strip()]
+
+        with tempfile.TemporaryDirectory() as root:
+            buffer, journaled = asyncio.run(go(os.path.join(root, "journal.jsonl")))
+
+        # Each failure keeps every row on disk (the journal goes first on the next flush); none dropped
+        self.assertEqual(calls, [1, 1, 2])  # Replays stop at the first failure; new rows go straight to disk
+        self.assertEqual(journaled, [0, 1, 2])
+        self.assertEqual((buffer.rejected, buffer.written), (0, 0))
+        # A constraint violation (SQLSTATE, not an HTTP status) is still a rejection
+        self.assertFalse(is_unreachable(APIError({"message": "null value", "code": "23502"})))
+
+class TestMacroMatrix(unittest.TestCase):
+    def test_relative_strength_and_date_lookups(self):
+        dates = pd.bdate_range("2024-01-01", periods=30)
+        spy = 100 * 1.001 ** np.arange(30)
+        close = pd.DataFrame({
+            "^VIX": np.r_[np.full(20, 14.0), np.full(10, 30.0)],
+            "SPY": spy,
+            "XLK": spy * 1.002 ** np.arange(30),
+            "XLF": np.r_[np.full(29, 40.0), np.nan],   # Missing last bar is forward-filled
+        }, index=dates)
+        matrix = MacroMatrix.from_close(close, lookbacks=[5, 21])
+
+        k = matrix.lookbacks.index(5)
+        expected = (close["XLK"] / close["XLK"].shift(5) - 1) - (close["SPY"] / close["SPY"].shift(5) - 1)
+        np.testing.assert_allclose(matrix.rs[k, :, matrix.columns["XLK"]], expected.to_numpy(), equal_nan=True)
+
+        live = matrix.lookup("NVDA")
+        self.assertEqual(live["vix_regime"], "elevated")
+        month = (close["XLK"].iloc[-1] / close["XLK"].iloc[-22] - 1) - (spy[-1] / spy[-22] - 1)
+        self.assertAlmostEqual(live["sector_momentum"], month)   # MACRO_MOMENTUM_LOOKBACK = 21
+        self.assertEqual(matrix.lookup("UNKNOWN")["sector_momentum"], 0.0)
+
+        # A Saturday resolves to Friday's row; before the history starts falls back to defaults
+        saturday = dates[10] + pd.Timedelta(days=(5 - dates[10].weekday()) % 7)
+        self.assertEqual(matrix.row(saturday), dates.get_loc(saturday - pd.Timedelta(days=1)))
+        self.assertEqual(matrix.lookup("AAPL", "2023-06-01"), {"vix_level": 20.0, "vix_regime": "normal", "sector_momentum": 0.0})
+        self.assertEqual(matrix.lookup("AAPL", dates[5])["vix_regime"], "low")
+
+        history = matrix.history("AAPL", dates)
+        np.testing.assert_allclose(history["momentum_5"].to_numpy(), expected.to_numpy(), equal_nan=True)
+        self.assertEqual(list(history["vix_regime"].iloc[[0, -1]]), ["low", "elevated"])
+
+class TestPortfolioRisk(unittest.TestCase):
+    def test_sector_cap_scales_only_that_sector(self):
+        cov = np.eye(3) * 0.01 ** 2
+        alloc = allocate([20_000, 20_000, 10_000], np.zeros(3), ["XLK", "XLK", "XLF"], cov, equity=100_000)
+        np.testing.assert_allclose(alloc.scale, [0.75, 0.75, 1.0])   # XLK held to 30% of equity
+        self.assertEqual(alloc.binding, ["sector:XLK"])
+
+    def test_var_limit_scales_the_whole_batch(self):
+        cov = np.full((3, 3), 0.05 ** 2)                              # Perfectly correlated, 5% daily vol
+        alloc = allocate([10_000, 10_000, 10_000], np.zeros(3), ["A", "B", "C"], cov, equity=100_000)
+        self.assertEqual(alloc.binding, ["var"])
+        self.assertLessEqual(alloc.var, 0.02)
+        self.assertAlmostEqual(alloc.scale[0], 0.57)
+
+    def test_trades_that_reduce_a_breach_are_allowed(self):
+        cov = np.eye(2) * 0.01 ** 2
+        alloc = allocate([-10_000, 5_000], np.array([40_000, 0.0]), ["XLK", "XLK"], cov, equity=100_000)
+        np.testing.assert_allclose(alloc.scale, [1.0, 1.0])
+
+    def test_covariance_defaults_thin_history(self):
+        rng = np.random.default_rng(0)
+        long = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, 61)))
+        cov = covariance({"A": long, "B": long * 2, "NEW": [50.0]}, lookback=60, shrink=0.0, default_vol=0.03)
+        self.assertAlmostEqual(cov[0, 1], cov[0, 0])                  # Same returns: full covariance
+        self.assertAlmostEqual(cov[2, 2], 0.03 ** 2)
+        self.assertEqual(cov[0, 2], 0.0)
+
+class TestVolatility(unittest.TestCase):
+    def test_matches_streaming_atr_and_ewma_recursion(self):
+        rng = np.random.default_rng(3)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, 120)))
+        high, low = close * 1.01, close * 0.99
+        vol = compute_volatility(high, low, close, atr_window=14, vol_window=20, lam=0.94)
+
+        atr = ATR(14)
+        for h, l, c in zip(high, low, close):
+            expected_atr = atr.update(h, l, c)
+        self.assertAlmostEqual(vol.atr, expected_atr)
+
+        returns = np.diff(np.log(close))
+        variance = np.mean(returns[:20] ** 2)
+        for r in returns[20:]:
+            variance = 0.94 * variance + 0.06 * r ** 2
+        self.assertAlmostEqual(vol.ewma_vol, np.sqrt(variance * 252))
+        self.assertAlmostEqual(vol.realized_vol, returns[-20:].std(ddof=1) * np.sqrt(252))
+
+    def test_memoized_on_newest_bar(self):
+        service = VolatilityService()
+        bars = make_bars(datetime(2024, 1, 1), 30)
+        first = service.update("AAPL", bars)
+        self.assertIs(service.update("AAPL", list(bars)), first)
+        bars[-1] = {**bars[-1], "c": bars[-1]["c"] * 1.05}   # Forming bar moved
+        self.assertIsNot(service.update("AAPL", bars), first)
+
+class TestCircuitBreaker(unittest.TestCase):
+    def test_fills_persist_and_trip_across_instances(self):
+        async def go(path):
+            worker_a, worker_b = CircuitBreaker(path), CircuitBreaker(path)
+            self.assertFalse(worker_a.is_tripped)                                           # No store yet
+
+            self.assertEqual(await worker_a.record_fill("AAPL", "buy", 10, 100.0), 0.0)
+            self.assertEqual(await worker_b.record_fill("AAPL", "buy", 10, 110.0), 0.0)    # 20 held, avg 105
+            self.assertAlmostEqual(await worker_a.record_fill("AAPL", "sell", 5, 95.0), -50.0)  # 15 left
+            self.assertEqual(worker_b.consecutive_losses, 1)                                # Sees A's commit
+            self.assertAlmostEqual(worker_b.daily_pnl, -50.0)
+
+            await worker_b.record_fill("MSFT", "sell", 1, 50.0)                             # Opens a short
+            await worker_b.record_fill("MSFT", "buy", 1, 51.0)
+            self.assertFalse(await worker_a.check({"account_value": 100_000}))
+            # Sells the remaining 15 shares (avg 105) at 90: third loss in a row, lot closed
+            self.assertAlmostEqual(await worker_a.record_fill("AAPL", "sell", 15, 90.0), -225.0)
+            self.assertTrue(worker_b.is_tripped)
+            self.assertIn("3 consecutive", worker_b.trip_reason)
+
+            restarted = CircuitBreaker(path)
+            self.assertTrue(await restarted.check({}))
+            await restarted.reset()
+            self.assertFalse(worker_a.is_tripped)
+            self.assertEqual(worker_a.consecutive_losses, 0)
+            lots = restarted.writer.execute("SELECT COUNT(*) FROM lots").fetchone()[0]
+            self.assertEqual(lots, 0)
+
+        with tempfile.TemporaryDirectory() as root:
+            asyncio.run(go(os.path.join(root, "breaker.sqlite")))
+
+    def test_slippage_trips_with_first_reason_kept(self):
+        async def go(breaker):
+            await breaker.record_fill("NVDA", "buy", 1, 100.0, slippage=config.trading.SLIPPAGE_THRESHOLD * 2)
+            await breaker.trip("later reason")
+            return breaker.trip_reason
+
+        with tempfile.TemporaryDirectory() as root:
+            self.assertIn("Slippage", asyncio.run(go(CircuitBreaker(os.path.join(root, "breaker.sqlite")))))
+
+    def test_favorable_fills_do_not_trip(self):
+        low, high = 100.0 * (1 - 2 * config.trading.SLIPPAGE_THRESHOLD), 100.0 * (1 + 2 * config.trading.SLIPPAGE_THRESHOLD)
+
+        async def go(breaker):
+            # Bought below and sold above the expected 100: far past the threshold, but in our favor
+            await breaker.record_fill("NVDA", "buy", 1, low, slippage=adverse_slippage("buy", low, 100.0))
+            await breaker.record_fill("NVDA", "sell", 1, high, slippage=adverse_slippage("sell", high, 100.0))
+            favorable = breaker.is_tripped
+            await breaker.record_fill("AMD", "sell", 1, low, slippage=adverse_slippage("sell", low, 100.0))
+            return favorable, breaker.is_tripped
+
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(asyncio.run(go(CircuitBreaker(os.path.join(root, "breaker.sqlite")))), (False, True))
+
+if __name__ == '__main__':
+    unittest.main()
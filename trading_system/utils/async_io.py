@@ -0,0 +1,41 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+from ..config import config
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def get_io_executor() -> ThreadPoolExecutor:
+    """Shared, size-limited pool for blocking SDK calls (alpaca-py, DDGS, supabase-py, slack)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=config.trading.IO_WORKERS,
+                    thread_name_prefix="mcp-io"
+                )
+    return _executor
+
+async def run_blocking(
+    func: Callable,
+    *args,
+    timeout: Optional[float] = config.trading.IO_TIMEOUT,
+    executor: Optional[Executor] = None,
+    **kwargs
+) -> Any:
+    """
+    Run a synchronous call on the shared I/O pool without stalling the event loop.
+    On timeout or task cancellation the pending call is cancelled if it has not started yet;
+    a call already running in a worker finishes in the background and its result is dropped.
+    Pass timeout=None to wait indefinitely (e.g. order submission, where abandoning is unsafe),
+    and `executor` to use a dedicated pool instead of the shared one (e.g. CPU-bound model inference).
+    """
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(executor or get_io_executor(), functools.partial(func, *args, **kwargs))
+    if timeout is None:
+        return await future
+    return await asyncio.wait_for(future, timeout)
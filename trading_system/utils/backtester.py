@@ -1,38 +1,74 @@
 import vectorbt as vbt
 import yfinance as yf
+import pandas as pd
+from datetime import datetime, timedelta
+from .bar_archive import bar_archive
+from .macro_snapshot import MacroMatrix, MacroSnapshotService
 from ..config import config
 
 class Backtester:
     def __init__(self):
-        pass
+        self.archive = bar_archive
+        self.coverage_slack = timedelta(days=5)  # Weekends/holidays at the range edges
+
+    def _download(self, ticker: str, start_date: str, end_date: str) -> list:
+        # auto_adjust=False: split-adjusted closes only, the same basis as the archived Alpaca bars
+        data = yf.download(ticker, start=start_date, end=end_date, auto_adjust=False, progress=False)
+        if isinstance(data.columns, pd.MultiIndex):
+            data = data.xs(ticker, axis=1, level=-1)
+        return [
+            {"t": t, "o": o, "h": h, "l": l, "c": c, "v": v}
+            for t, o, h, l, c, v in zip(data.index, data["Open"], data["High"], data["Low"], data["Close"], data["Volume"])
+        ]
+
+    def load_close(self, ticker: str, start_date: str, end_date: str) -> pd.Series:
+        """Daily closes from the local archive; downloads (and archives) only the range it doesn't cover yet"""
+        start, end = pd.Timestamp(start_date), pd.Timestamp(end_date)
+        window = self.archive.read(ticker, "1Day", start, end)
+
+        covered = len(window) and (
+            pd.Timestamp(window.t[0]) <= start + self.coverage_slack and
+            pd.Timestamp(window.t[-1]) >= min(end, pd.Timestamp(datetime.now())) - self.coverage_slack
+        )
+        if not covered and not config.trading.BAR_ARCHIVE_OFFLINE:
+            self.archive.merge(ticker, "1Day", self._download(ticker, start_date, end_date))
+            window = self.archive.read(ticker, "1Day", start, end)
+
+        return pd.Series(window.c, index=pd.DatetimeIndex(window.t), name=ticker)
+
+    def load_macro(self, start_date: str, end_date: str) -> MacroMatrix:
+        """VIX regime and sector relative-strength history for a backtest range (same archive as prices)"""
+        close = pd.concat(
+            {s: self.load_close(s, start_date, end_date) for s in MacroSnapshotService.symbols()}, axis=1
+        )
+        return MacroMatrix.from_close(close)
 
     def run_backtest(self, ticker: str, start_date: str, end_date: str):
         print(f"Running backtest for {ticker}...")
-        
-        # 1. Fetch Data
-        data = yf.download(ticker, start=start_date, end=end_date, progress=False)
-        
+
+        # 1. Load Data (local memory-mapped archive; network only for missing ranges)
+        close = self.load_close(ticker, start_date, end_date)
+
         # 2. Define Strategy (Simple MA Crossover for demo)
         # In a real system, we'd try to invoke the Agent logic, but vectorbt is best for vectorized logic
         # So we approximate the logic or just run a standard check
-        
-        close = data['Close']
+
         fast_ma = vbt.MA.run(close, 20)
         slow_ma = vbt.MA.run(close, 50)
-        
+
         entries = fast_ma.ma_crossed_above(slow_ma)
         exits = fast_ma.ma_crossed_below(slow_ma)
-        
+
         # 3. Run Portfolio
         portfolio = vbt.Portfolio.from_signals(
-            close, entries, exits, 
+            close, entries, exits,
             init_cash=100000,
             fees=0.001,
             slippage=0.001
         )
-        
+
         # 4. Stats
         print(portfolio.stats())
-        # portfolio.plot().show() 
+        # portfolio.plot().show()
 
 backtester = Backtester()
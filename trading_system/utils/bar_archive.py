@@ -0,0 +1,142 @@
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+import numpy as np
+from .bar_store import BarWindow, COLUMNS, to_ns
+from ..config import config
+
+DAY_NS = 86_400 * 1_000_000_000
+
+def archive_ns(t, timeframe: str) -> int:
+    """
+    Archive key for a bar. Daily bars are keyed by session date (midnight UTC): yfinance stamps
+    them at naive midnight, Alpaca at 04:00/05:00 UTC (midnight New York), both the same UTC date.
+    """
+    ns = to_ns(t)
+    return ns - ns % DAY_NS if timeframe == "1Day" else ns
+
+class BarArchive:
+    """
+    Local columnar bar archive: one directory per (timeframe, symbol) holding raw little-endian
+    column files (t.bin int64 ns, o/h/l/c/v.bin float64). Writes are append-only; reads memory-map
+    the columns and slice them, so a range query returns NumPy views of the mapped pages
+    (no parsing, no copy) and years of minute bars load in milliseconds.
+    """
+
+    DTYPES = {"t": np.dtype("<i8"), **{name: np.dtype("<f8") for name in COLUMNS}}
+
+    def __init__(self, root: str = None):
+        self.root = root or config.trading.BAR_ARCHIVE_DIR
+        self._lock = threading.Lock()  # Serializes writers; readers only map what is already on disk
+
+    def _dir(self, symbol: str, timeframe: str) -> str:
+        return os.path.join(self.root, timeframe, symbol.replace("/", "_"))
+
+    def _path(self, symbol: str, timeframe: str, column: str) -> str:
+        return os.path.join(self._dir(symbol, timeframe), f"{column}.bin")
+
+    def _rows(self, symbol: str, timeframe: str) -> int:
+        """Rows present in every column (a torn append leaves some columns longer)"""
+        sizes = []
+        for column, dtype in self.DTYPES.items():
+            path = self._path(symbol, timeframe, column)
+            sizes.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(sizes)
+
+    def _map(self, symbol: str, timeframe: str) -> Dict[str, np.ndarray]:
+        """Memory-map every column, truncated to the complete rows"""
+        rows = self._rows(symbol, timeframe)
+        if rows == 0:
+            return {column: np.empty(0, dtype=dtype) for column, dtype in self.DTYPES.items()}
+        return {
+            column: np.memmap(self._path(symbol, timeframe, column), dtype=dtype, mode="r", shape=(rows,))
+            for column, dtype in self.DTYPES.items()
+        }
+
+    def size(self, symbol: str, timeframe: str) -> int:
+        return len(self._map(symbol, timeframe)["t"])
+
+    def last_timestamp(self, symbol: str, timeframe: str) -> Optional[int]:
+        t = self._map(symbol, timeframe)["t"]
+        return int(t[-1]) if len(t) else None
+
+    def _keyed(self, timeframe: str, bars: List[Dict]) -> List[tuple]:
+        """(archive key, bar) sorted by key, one row per key (the last bar given wins)"""
+        rows = {archive_ns(b["t"], timeframe): b for b in bars}
+        return sorted(rows.items(), key=lambda row: row[0])
+
+    def append(self, symbol: str, timeframe: str, bars: List[Dict]) -> int:
+        """
+        Append bars newer than the archived tail; returns how many were added. A bar for the tail's
+        own session overwrites that last row in place (a bar archived while forming gets its final values).
+        """
+        with self._lock:
+            last = self.last_timestamp(symbol, timeframe)
+            rows = [(t, b) for t, b in self._keyed(timeframe, bars) if last is None or t >= last]
+            if not rows:
+                return 0
+
+            complete = self._rows(symbol, timeframe)
+            replaces_tail = rows[0][0] == last
+            self._write(self._dir(symbol, timeframe), rows, complete - 1 if replaces_tail else complete)
+            return len(rows) - replaces_tail
+
+    def merge(self, symbol: str, timeframe: str, bars: List[Dict]) -> int:
+        """
+        Like append, but bars older than the archived tail are merged in as well (backfill).
+        Backfill rewrites the series into a fresh directory and swaps it in; bars from the tail on take the append path.
+        A bar for an already-archived session replaces it rather than adding a second row.
+        """
+        if not bars:
+            return 0
+        head = self._map(symbol, timeframe)["t"]
+        if not len(head) or min(archive_ns(b["t"], timeframe) for b in bars) >= head[-1]:
+            return self.append(symbol, timeframe, bars)
+
+        with self._lock:
+            existing = self.read(symbol, timeframe)
+            rows = dict(self._keyed(timeframe, [existing[i] for i in range(len(existing))]))
+            incoming = self._keyed(timeframe, bars)
+            added = sum(1 for t, _ in incoming if t not in rows)
+            rows.update(incoming)
+
+            target = self._dir(symbol, timeframe)
+            tmp, old = f"{target}.tmp", f"{target}.old"
+            shutil.rmtree(tmp, ignore_errors=True)
+            shutil.rmtree(old, ignore_errors=True)  # Left behind by a crashed merge
+            self._write(tmp, sorted(rows.items(), key=lambda row: row[0]), 0)
+            os.replace(target, old)
+            os.replace(tmp, target)
+            shutil.rmtree(old, ignore_errors=True)
+            return added
+
+    def _write(self, directory: str, rows: List[tuple], complete_rows: int) -> None:
+        os.makedirs(directory, exist_ok=True)
+        columns = {"t": np.array([t for t, _ in rows], dtype=self.DTYPES["t"])}
+        for name in COLUMNS:
+            columns[name] = np.array([b[name] for _, b in rows], dtype=self.DTYPES[name])
+        # Overwrite from the first incomplete row (a torn tail, or the tail row being replaced) without
+        # ever shrinking a file readers may have mapped; timestamps go last so a crash mid-append stays invisible
+        for column in list(COLUMNS) + ["t"]:
+            path = os.path.join(directory, f"{column}.bin")
+            with open(path, "r+b" if os.path.exists(path) else "wb") as f:
+                f.seek(complete_rows * self.DTYPES[column].itemsize)
+                f.write(columns[column].tobytes())
+
+    def read(self, symbol: str, timeframe: str, start: datetime = None, end: datetime = None) -> BarWindow:
+        """Bars with start <= t <= end as zero-copy views into the mapped files"""
+        cols = self._map(symbol, timeframe)
+        t = cols.pop("t")
+        lo = int(np.searchsorted(t, to_ns(start), side="left")) if start is not None else 0
+        hi = int(np.searchsorted(t, to_ns(end), side="right")) if end is not None else len(t)
+        return BarWindow(t[lo:hi], {name: col[lo:hi] for name, col in cols.items()})
+
+    def last(self, symbol: str, timeframe: str, n: int) -> BarWindow:
+        cols = self._map(symbol, timeframe)
+        t = cols.pop("t")
+        return BarWindow(t[-n:], {name: col[-n:] for name, col in cols.items()})
+
+# Singleton Instance
+bar_archive = BarArchive()
@@ -0,0 +1,134 @@
+import math
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+from .cache import TTLCache
+from ..config import config
+
+# fetch_fn(symbols, timeframe, start) -> {symbol: [bar dicts sorted by "t"]}
+FetchFn = Callable[[List[str], str, Optional[datetime]], Dict[str, List[Dict]]]
+
+SESSION_MINUTES = 390  # Regular session, 9:30-16:00
+
+def lookback_start(timeframe: str, limit: int, now: datetime = None) -> datetime:
+    """
+    Earliest start that still covers `limit` bars. Minute bars are counted in trading sessions
+    (a 200-bar request spans one session, not 400 days); weekends and a holiday are slack.
+    """
+    now = now or datetime.now()
+    if timeframe == "1Min":
+        sessions = math.ceil(limit / SESSION_MINUTES)
+        return now - timedelta(days=math.ceil(sessions * 7 / 5) + 4)
+    return now - timedelta(days=limit * 2)  # Buffer
+
+@dataclass
+class BarSeries:
+    """Cached bar history for one (symbol, timeframe)"""
+    bars: List[Dict] = field(default_factory=list)
+    depth: int = 0            # Largest 'limit' this series was filled for
+    fetched_at: float = 0.0   # monotonic time of last refresh
+
+class BarCache:
+    """
+    Process-wide bar history store shared by every AlpacaMCPClient.
+    - LRU eviction over (symbol, timeframe) series
+    - TTL on freshness: stale series are topped up with only the bars after the cached tail
+    - Misses are grouped so N symbols cost one multi-symbol request
+    - Single-flight: a caller missing a series that another thread is already fetching joins
+      that fetch instead of issuing its own
+    """
+
+    def __init__(self, ttl: float = None, max_series: int = None, max_bars: int = None):
+        self.ttl = ttl if ttl is not None else config.trading.BAR_CACHE_TTL
+        self.max_bars = max_bars or config.trading.BAR_CACHE_MAX_BARS
+        self._series = TTLCache(maxsize=max_series or config.trading.BAR_CACHE_MAX_SERIES)
+        self._lock = threading.Lock()
+        self.inflight: Dict[tuple, Future] = {}  # (symbol, timeframe) -> fetch in progress
+
+    def get_many(
+        self,
+        symbols: List[str],
+        timeframe: str,
+        limit: int,
+        fetch_fn: FetchFn,
+        full_start: datetime
+    ) -> Dict[str, List[Dict]]:
+        """Serve the last `limit` bars per symbol, fetching only what is missing or stale"""
+        pending = list(dict.fromkeys(symbols))  # Dedupe, keep order
+        while pending:
+            full, incremental, joined = [], [], {}
+            with self._lock:
+                now = time.monotonic()
+                for symbol in pending:
+                    key = (symbol, timeframe)
+                    entry: BarSeries = self._series.get(key)
+                    if entry is not None and entry.depth >= limit and now - entry.fetched_at < self.ttl:
+                        continue  # Fresh
+                    if key in self.inflight:
+                        joined[symbol] = self.inflight[key]
+                        continue
+                    (full if entry is None or entry.depth < limit else incremental).append(symbol)
+                    self.inflight[key] = Future()
+
+            try:
+                self._fetch(full, incremental, timeframe, limit, fetch_fn, full_start)
+            finally:
+                with self._lock:
+                    for symbol in full + incremental:
+                        self.inflight.pop((symbol, timeframe)).set_result(None)
+
+            # Re-check what we joined: the other fetch may have been shallower, or failed
+            for future in joined.values():
+                future.result()
+            pending = list(joined)
+
+        result = {}
+        for symbol in symbols:
+            entry = self._series.get((symbol, timeframe))
+            result[symbol] = list(entry.bars[-limit:]) if entry else []
+        return result
+
+    def _fetch(self, full: List[str], incremental: List[str], timeframe: str, limit: int,
+               fetch_fn: FetchFn, full_start: datetime) -> None:
+        # 1. Cold / too-shallow series: one batched request for the whole window
+        if full:
+            fetched = fetch_fn(full, timeframe, full_start)
+            for symbol in full:
+                self._store(symbol, timeframe, fetched.get(symbol, []), limit, replace=True)
+
+        # 2. Stale series: one batched request starting at the oldest cached tail
+        if incremental:
+            tails = {s: self._series.get((s, timeframe)).bars for s in incremental}
+            tail_times = [b[-1]["t"] for b in tails.values() if b]
+            start = min(tail_times) if tail_times else full_start
+            fetched = fetch_fn(incremental, timeframe, start)
+            for symbol in incremental:
+                self._store(symbol, timeframe, fetched.get(symbol, []), limit, replace=False)
+
+    def _store(self, symbol: str, timeframe: str, new_bars: List[Dict], limit: int, replace: bool):
+        key = (symbol, timeframe)
+        entry: BarSeries = None if replace else self._series.get(key)
+
+        if entry is None:
+            bars = list(new_bars)
+            depth = limit
+        else:
+            bars = list(entry.bars)
+            depth = max(entry.depth, limit)
+            if new_bars:
+                # Re-fetched tail bar (e.g. today's still-forming daily bar) replaces the cached one
+                first_new = new_bars[0]["t"]
+                while bars and bars[-1]["t"] >= first_new:
+                    bars.pop()
+                bars.extend(new_bars)
+
+        self._series.set(key, BarSeries(bars=bars[-self.max_bars:], depth=depth, fetched_at=time.monotonic()))
+
+    def stats(self) -> Dict:
+        return self._series.stats()
+
+# Singleton Instance (shared across all clients in the process)
+bar_cache = BarCache()
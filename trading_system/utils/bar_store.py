@@ -0,0 +1,130 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from ..config import config
+
+COLUMNS = ("o", "h", "l", "c", "v")
+
+def to_ns(t) -> int:
+    """Bar timestamp (datetime / pd.Timestamp / int ns) to int64 ns; naive times are taken as UTC"""
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    if t.tzinfo is None:
+        t = t.replace(tzinfo=timezone.utc)
+    return int(t.timestamp() * 1_000_000) * 1000
+
+class BarWindow:
+    """
+    Zero-copy view of the last N bars: `t` (int64 ns) and OHLCV float64 column arrays.
+    Indexing returns a bar dict ({"t","o","h","l","c","v"}) so it can stand in for a list of REST bars.
+    """
+
+    def __init__(self, t: np.ndarray, cols: Dict[str, np.ndarray]):
+        self.t = t
+        self.cols = cols
+
+    def __len__(self) -> int:
+        return len(self.t)
+
+    def __getattr__(self, name: str) -> np.ndarray:
+        try:
+            return self.__dict__["cols"][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __getitem__(self, i: int) -> Dict:
+        bar = {name: float(col[i]) for name, col in self.cols.items()}
+        bar["t"] = datetime.fromtimestamp(int(self.t[i]) / 1e9, tz=timezone.utc)
+        return bar
+
+class BarRing:
+    """
+    Fixed-capacity ring buffer of bars in columnar NumPy arrays.
+    Every slot is written twice (at i and i + capacity) so the newest N bars are always one
+    contiguous slice, i.e. a view rather than a copy. There is a single writer (the stream
+    handler on the event loop); the bar count is bumped only after the row is fully written,
+    so readers never observe a half-written bar and need no lock.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.t = np.zeros(2 * capacity, dtype=np.int64)
+        self.cols = {name: np.zeros(2 * capacity, dtype=np.float64) for name in COLUMNS}
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def _write(self, slot: int, t: int, bar: Dict) -> None:
+        for i in (slot, slot + self.capacity):
+            self.t[i] = t
+            for name, col in self.cols.items():
+                col[i] = bar[name]
+
+    def append(self, bar: Dict) -> None:
+        """Append a bar; a bar with the same timestamp as the newest one replaces it (updated bar)"""
+        t = to_ns(bar["t"])
+        if self.count:
+            last = (self.count - 1) % self.capacity
+            if t == self.t[last]:
+                self._write(last, t, bar)
+                return
+            if t < self.t[last]:
+                return  # Out of order / already stored
+        self._write(self.count % self.capacity, t, bar)
+        self.count += 1
+
+    def last(self, n: int = None) -> BarWindow:
+        count = self.count  # Snapshot once; later appends don't affect this view's bounds
+        n = min(n or self.capacity, count, self.capacity)
+        end = count % self.capacity + self.capacity
+        window = slice(end - n, end)
+        return BarWindow(self.t[window], {name: col[window] for name, col in self.cols.items()})
+
+    def latest(self) -> Optional[Dict]:
+        if not self.count:
+            return None
+        return self.last(1)[0]
+
+class BarStore:
+    """Per-(symbol, timeframe) ring buffers fed by the DataPipeline stream"""
+
+    def __init__(self, capacity: int = None):
+        self.capacity = capacity or config.trading.BAR_STORE_CAPACITY
+        self.rings: Dict[Tuple[str, str], BarRing] = {}
+
+    def ring(self, symbol: str, timeframe: str) -> BarRing:
+        key = (symbol, timeframe)
+        if key not in self.rings:
+            self.rings[key] = BarRing(self.capacity)
+        return self.rings[key]
+
+    def append(self, symbol: str, timeframe: str, bar: Dict) -> None:
+        self.ring(symbol, timeframe).append(bar)
+
+    def extend(self, symbol: str, timeframe: str, bars: List[Dict]) -> None:
+        """Seed/top up from REST history; history older than the streamed bars is placed before them"""
+        ring = self.ring(symbol, timeframe)
+        if bars and len(ring) and to_ns(bars[0]["t"]) < ring.last().t[0]:
+            streamed = ring.last()
+            ring = self.rings[(symbol, timeframe)] = BarRing(self.capacity)
+            bars = list(bars) + [streamed[i] for i in range(len(streamed))]
+        for bar in bars:
+            ring.append(bar)
+
+    def last(self, symbol: str, timeframe: str, n: int = None) -> BarWindow:
+        ring = self.rings.get((symbol, timeframe))
+        if ring is None:
+            return BarWindow(np.empty(0, dtype=np.int64), {name: np.empty(0) for name in COLUMNS})
+        return ring.last(n)
+
+    def latest(self, symbol: str, timeframe: str) -> Optional[Dict]:
+        ring = self.rings.get((symbol, timeframe))
+        return ring.latest() if ring else None
+
+    def size(self, symbol: str, timeframe: str) -> int:
+        ring = self.rings.get((symbol, timeframe))
+        return len(ring) if ring else 0
+
+# Singleton Instance
+bar_store = BarStore()
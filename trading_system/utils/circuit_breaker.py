@@ -1,48 +1,221 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Dict, Optional
 from ..state import TradingState
 from ..config import config
+from .async_io import run_blocking
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS breaker (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    tripped INTEGER NOT NULL DEFAULT 0,
+    reason TEXT NOT NULL DEFAULT '',
+    tripped_at REAL,
+    consecutive_losses INTEGER NOT NULL DEFAULT 0,
+    day TEXT NOT NULL DEFAULT '',
+    day_pnl REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS lots (symbol TEXT PRIMARY KEY, qty REAL NOT NULL, avg_price REAL NOT NULL);
+CREATE TABLE IF NOT EXISTS fills (
+    ts REAL NOT NULL, symbol TEXT NOT NULL, side TEXT NOT NULL, qty REAL NOT NULL,
+    price REAL NOT NULL, slippage REAL, realized_pnl REAL NOT NULL
+);
+INSERT OR IGNORE INTO breaker (id) VALUES (1);
+"""
+DEFAULT_ROW = {"tripped": 0, "reason": "", "tripped_at": None, "consecutive_losses": 0, "day": "", "day_pnl": 0.0}
+
+def adverse_slippage(side: str, price: float, expected: float) -> float:
+    """Fill price vs expected as a fraction, positive when the fill was worse (paid more / received less)"""
+    if not expected:
+        return 0.0
+    move = (price - expected) / expected
+    return move if side.lower() == "buy" else -move
 
 class CircuitBreaker:
-    def __init__(self):
-        self.consecutive_losses = 0
-        self.is_tripped = False
-        self.trip_reason = ""
+    """
+    Trip state, today's realized P&L and the consecutive-loss streak live in one SQLite row
+    (WAL mode), so a trip survives restarts and is shared by every worker process.
+    Fills and trips are written in BEGIN IMMEDIATE transactions on the shared I/O pool, so a
+    writer waiting on another process never stalls the event loop. Checks read through a
+    separate connection (WAL readers don't wait on writers) and re-read the row only when a
+    commit has happened since the last read (PRAGMA data_version), so they stay O(1).
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.trading.CIRCUIT_BREAKER_PATH
+        self._writer = None
+        self._reader = None
+        self._lock = threading.Lock()
+        self._row: Optional[Dict] = None
+        self._version = None
+
+    @property
+    def writer(self) -> sqlite3.Connection:
+        if self._writer is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            # isolation_level=None: transactions are explicit (BEGIN IMMEDIATE below)
+            self._writer = sqlite3.connect(self.path, timeout=10.0, isolation_level=None, check_same_thread=False)
+            self._writer.execute("PRAGMA journal_mode=WAL")
+            self._writer.execute("PRAGMA synchronous=NORMAL")
+            self._writer.executescript(SCHEMA)
+        return self._writer
+
+    @contextmanager
+    def _transaction(self):
+        """Serializes read-modify-write across threads and processes (runs on the I/O pool)"""
+        with self._lock:
+            conn = self.writer
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+
+    def _state(self) -> Dict:
+        if not os.path.exists(self.path):
+            return DEFAULT_ROW  # Nothing recorded yet
+        if self._reader is None:
+            self._reader = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+        version = self._reader.execute("PRAGMA data_version").fetchone()[0]
+        if self._row is None or version != self._version:
+            try:
+                cursor = self._reader.execute("SELECT * FROM breaker WHERE id = 1")
+            except sqlite3.OperationalError:
+                return DEFAULT_ROW  # Schema not created yet by the first writer
+            self._row = dict(zip([c[0] for c in cursor.description], cursor.fetchone()))
+            self._version = version
+        return self._row
+
+    @property
+    def is_tripped(self) -> bool:
+        return bool(self._state()["tripped"])
 
-    def check(self, state: TradingState) -> bool:
+    @property
+    def trip_reason(self) -> str:
+        return self._state()["reason"]
+
+    @property
+    def consecutive_losses(self) -> int:
+        return self._state()["consecutive_losses"]
+
+    @property
+    def daily_pnl(self) -> float:
+        """Realized P&L of today's recorded fills"""
+        row = self._state()
+        return row["day_pnl"] if row["day"] == date.today().isoformat() else 0.0
+
+    async def check(self, state: TradingState) -> bool:
         if self.is_tripped:
             return True # Still tripped
 
-        # Trip on: 3 consecutive losses
-        # This requires tracking history which might be in state or DB. 
-        # Here we assume state has 'daily_trades' or we track it externally.
-        # For this simulation, we'll check 'daily_pnl' against threshold
-        
-        # 1. Daily Loss Limit
-        if state.get("daily_pnl", 0) < -(config.MAX_DAILY_LOSS * 100000): # Assuming 100k base
-             self.trip("Daily Loss Limit Hit")
+        trading = config.trading
+        base = state.get("account_value") or trading.CIRCUIT_BREAKER_BASE_EQUITY
+        max_loss = trading.MAX_DAILY_LOSS * base
+
+        # 1. Daily Loss Limit (account P&L from the state, realized P&L from our own fills)
+        if state.get("daily_pnl", 0) < -max_loss or self.daily_pnl < -max_loss:
+             await self.trip("Daily Loss Limit Hit")
+             return True
+
+        # 2. Losing streak
+        if self.consecutive_losses >= trading.CONSECUTIVE_LOSS_LIMIT:
+             await self.trip(f"{self.consecutive_losses} consecutive losing trades")
              return True
 
-        # 2. VIX Check
+        # 3. VIX Check
         vix = state.get("vix_level", 0)
-        if vix > 40:
-             self.trip(f"VIX is {vix} (> 40)")
+        if vix and vix > trading.VIX_THRESHOLD:
+             await self.trip(f"VIX is {vix} (> {trading.VIX_THRESHOLD:.0f})")
              return True
-             
-        # 3. Slippage Check (from last trade)
+
+        # 4. Slippage Check (from last trade)
         slippage = state.get("slippage", 0)
-        if slippage and slippage > 0.02:
-             self.trip(f"Slippage {slippage:.2%} too high")
+        if slippage and slippage > trading.SLIPPAGE_THRESHOLD:
+             await self.trip(f"Slippage {slippage:.2%} too high")
              return True
 
         return False
 
-    def trip(self, reason: str):
-        self.is_tripped = True
-        self.trip_reason = reason
+    async def record_fill(self, symbol: str, side: str, qty: float, price: float, slippage: float = None) -> float:
+        """
+        Book a fill; returns the P&L it realized against the symbol's open lot (0 when opening).
+        `slippage` is adverse slippage (see adverse_slippage): a better-than-expected fill is negative.
+        """
+        realized, reason = await run_blocking(self._record_fill, symbol, side, qty, price, slippage, timeout=None)
+        if reason:
+            print(f"CIRCUIT BREAKER TRIPPED: {reason}")
+        return realized
+
+    def _record_fill(self, symbol: str, side: str, qty: float, price: float, slippage: float = None):
+        trading = config.trading
+        signed = qty if side.lower() == "buy" else -qty
+        today = date.today().isoformat()
+        reason = None
+
+        with self._transaction() as conn:
+            lot = conn.execute("SELECT qty, avg_price FROM lots WHERE symbol = ?", (symbol,)).fetchone()
+            held, avg = lot if lot else (0.0, 0.0)
+
+            realized = 0.0
+            if held and (held > 0) != (signed > 0):
+                closed = min(abs(signed), abs(held))
+                realized = closed * (price - avg) * (1 if held > 0 else -1)
+            remaining = held + signed
+            if abs(remaining) < 1e-9:
+                conn.execute("DELETE FROM lots WHERE symbol = ?", (symbol,))
+            else:
+                if not held or (remaining > 0) != (held > 0):
+                    avg = price                                  # Opened, or flipped side
+                elif (signed > 0) == (held > 0):
+                    avg = (avg * abs(held) + price * abs(signed)) / abs(remaining)  # Added
+                conn.execute("INSERT OR REPLACE INTO lots VALUES (?, ?, ?)", (symbol, remaining, avg))
+
+            conn.execute("INSERT INTO fills VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (time.time(), symbol, side.lower(), qty, price, slippage, realized))
+
+            day, day_pnl, losses = conn.execute("SELECT day, day_pnl, consecutive_losses FROM breaker WHERE id = 1").fetchone()
+            if day != today:
+                day_pnl = 0.0
+            if realized < 0:
+                losses += 1
+            elif realized > 0:
+                losses = 0
+            conn.execute("UPDATE breaker SET day = ?, day_pnl = ?, consecutive_losses = ? WHERE id = 1",
+                         (today, day_pnl + realized, losses))
+
+            if slippage is not None and slippage > trading.SLIPPAGE_THRESHOLD:
+                reason = f"Slippage {slippage:.2%} too high on {symbol}"
+            elif losses >= trading.CONSECUTIVE_LOSS_LIMIT:
+                reason = f"{losses} consecutive losing trades"
+            if reason:
+                self._set_tripped(conn, reason)
+        return realized, reason
+
+    def _set_tripped(self, conn: sqlite3.Connection, reason: str) -> None:
+        # First trip wins; a second worker tripping concurrently keeps the original reason
+        conn.execute("UPDATE breaker SET tripped = 1, reason = ?, tripped_at = ? WHERE id = 1 AND tripped = 0",
+                     (reason, time.time()))
+
+    def _trip(self, reason: str) -> None:
+        with self._transaction() as conn:
+            self._set_tripped(conn, reason)
+
+    async def trip(self, reason: str):
+        await run_blocking(self._trip, reason, timeout=None)
         print(f"CIRCUIT BREAKER TRIPPED: {reason}")
-    
-    def reset(self):
-        self.is_tripped = False
-        self.trip_reason = ""
-        self.consecutive_losses = 0
+
+    def _reset(self) -> None:
+        with self._transaction() as conn:
+            conn.execute("UPDATE breaker SET tripped = 0, reason = '', tripped_at = NULL, consecutive_losses = 0 WHERE id = 1")
+
+    async def reset(self):
+        """Manual reset: clears the trip and the losing streak (open lots and fills are kept)"""
+        await run_blocking(self._reset, timeout=None)
 
 circuit_breaker = CircuitBreaker()
@@ -1,13 +1,29 @@
 from alpaca.data.live import StockDataStream
 from alpaca.data.enums import DataFeed
 from ..config import config
+from .bar_store import bar_store
+from typing import Dict
 import threading
 import asyncio
 
 class DataPipeline:
     def __init__(self):
         self.stream = StockDataStream(config.ALPACA_API_KEY, config.ALPACA_SECRET_KEY)
-        self.latest_bars = {}
+        self.store = bar_store  # Ring-buffer history per (symbol, timeframe)
+        self.streaming = False
+        self.queues: Dict[str, asyncio.Queue] = {}  # ticker -> bar updates for the EventScheduler
+
+    def get_queue(self, ticker: str) -> asyncio.Queue:
+        if ticker not in self.queues:
+            self.queues[ticker] = asyncio.Queue(maxsize=config.trading.EVENT_QUEUE_SIZE)
+        return self.queues[ticker]
+
+    def publish(self, ticker: str, bar: Dict) -> None:
+        """Push a bar to the ticker's queue; a full queue drops its oldest bar (only the newest matters)"""
+        queue = self.get_queue(ticker)
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(bar)
 
     async def start_stream(self):
         # Subscribe to bars
@@ -17,18 +33,39 @@ class DataPipeline:
              # Basic handler
             async def bar_handler(bar):
                 symbol = bar.symbol
-                self.latest_bars[symbol] = bar
+                data = self._to_dict(bar)
+                self.store.append(symbol, "1Min", data)
+                self.publish(symbol, data)
                 print(f"Update: {symbol} @ {bar.close}")
 
+            # Daily bars keep the 1Day history TechnicalAnalyst reads current without REST refetches
+            async def daily_bar_handler(bar):
+                self.store.append(bar.symbol, "1Day", self._to_dict(bar))
+
             self.stream.subscribe_bars(bar_handler, *config.TRADING_TICKERS)
+            self.stream.subscribe_daily_bars(daily_bar_handler, *config.TRADING_TICKERS)
+            self.streaming = True
             await self.stream._run_forever()
         except Exception as e:
             print(f"Data Stream Error: {e}")
+        finally:
+            self.streaming = False
+
+    @staticmethod
+    def _to_dict(bar) -> Dict:
+        return {
+            "t": bar.timestamp,
+            "o": bar.open,
+            "h": bar.high,
+            "l": bar.low,
+            "c": bar.close,
+            "v": bar.volume
+        }
 
     def get_latest_price(self, ticker: str) -> float:
-        bar = self.latest_bars.get(ticker)
+        bar = self.store.latest(ticker, "1Min")
         if bar:
-            return bar.close
+            return bar["c"]
         return 0.0
 
 data_pipeline = DataPipeline()
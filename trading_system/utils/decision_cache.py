@@ -0,0 +1,124 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+from .async_io import run_blocking
+from .cache import TTLCache
+from ..config import config
+
+def quantize(value: float, step: float) -> float:
+    """Snap to a grid of `step` so jitter below the step maps to the same key"""
+    if value is None:
+        return None
+    return round(round(float(value) / step) * step, 10)
+
+def quantize_relative(value: float, pct: float) -> Optional[int]:
+    """Log-scale bucket index: values within ~pct of each other share a bucket"""
+    if value is None or value <= 0:
+        return value
+    return int(math.floor(math.log(float(value)) / math.log1p(pct)))
+
+def normalize_text(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+def fingerprint(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+class DecisionCache:
+    """
+    Two-tier decision cache: an in-memory TTL/LRU tier in front of a SQLite table, so
+    decisions survive restarts. Entries expire on wall-clock time in both tiers.
+    Memory hits return immediately; SQLite reads and commits run on the shared I/O pool,
+    so concurrent tickers never wait on the disk inside the event loop.
+    """
+
+    def __init__(self, path: str = None, ttl: float = None, maxsize: int = None):
+        trading = config.trading
+        self.path = path or trading.DECISION_CACHE_PATH
+        self.ttl = ttl if ttl is not None else trading.DECISION_CACHE_TTL
+        self.maxsize = maxsize or trading.DECISION_CACHE_SIZE
+        self.memory = TTLCache(maxsize=self.maxsize, ttl=self.ttl)
+        self._conn = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.writes = 0
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS decisions (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    async def get(self, key: str) -> Optional[Dict]:
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        row = await run_blocking(self._read, key, timeout=None)
+        if row is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = json.loads(row[0]), row[1]
+        self.memory.set(key, value, ttl=expires_at - time.time())
+        self.hits += 1
+        self.disk_hits += 1
+        return value
+
+    def _read(self, key: str) -> Optional[tuple]:
+        with self._lock:
+            return self.conn.execute(
+                "SELECT value, expires_at FROM decisions WHERE key = ? AND expires_at > ?", (key, time.time())
+            ).fetchone()
+
+    async def set(self, key: str, value: Dict) -> None:
+        self.memory.set(key, value)
+        await run_blocking(self._write, key, value, timeout=None)
+        self.writes += 1
+        if self.writes % 100 == 0:
+            await self.evict()
+
+    def _write(self, key: str, value: Dict) -> None:
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO decisions (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time() + self.ttl)
+            )
+            self.conn.commit()
+
+    async def evict(self) -> int:
+        """Drop expired rows and trim the table to `maxsize` (soonest-expiring first)"""
+        self.memory.evict_expired()
+        return await run_blocking(self._evict, timeout=None)
+
+    def _evict(self) -> int:
+        with self._lock:
+            removed = self.conn.execute("DELETE FROM decisions WHERE expires_at <= ?", (time.time(),)).rowcount
+            removed += self.conn.execute(
+                "DELETE FROM decisions WHERE key NOT IN (SELECT key FROM decisions ORDER BY expires_at DESC LIMIT ?)",
+                (self.maxsize,)
+            ).rowcount
+            self.conn.commit()
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.memory),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
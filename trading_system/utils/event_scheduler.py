@@ -0,0 +1,81 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Optional
+from ..config import config
+
+class EventScheduler:
+    """
+    Turns the DataPipeline bar stream into graph runs.
+    A ticker is evaluated only when its price has moved past `price_threshold` since the last
+    evaluation or a new `bar_minutes` bucket has closed. Bursts are coalesced: bars queued while
+    a run is pending or in flight collapse into at most one follow-up run per ticker.
+    """
+
+    def __init__(
+        self,
+        run_fn: Callable[[str], Awaitable],
+        price_threshold: float = None,
+        bar_minutes: int = None,
+        debounce: float = None
+    ):
+        self.run_fn = run_fn
+        self.price_threshold = price_threshold if price_threshold is not None else config.trading.EVENT_PRICE_THRESHOLD
+        self.bar_minutes = bar_minutes or config.trading.EVENT_BAR_MINUTES
+        self.debounce = debounce if debounce is not None else config.trading.EVENT_DEBOUNCE
+
+        self.last_eval: Dict[str, tuple] = {}          # ticker -> (price, bucket) at last trigger
+        self.runs: Dict[str, asyncio.Task] = {}        # ticker -> pending/in-flight run
+        self.rerun: Dict[str, bool] = {}               # ticker -> another trigger arrived meanwhile
+        self.trigger_count = 0
+        self.run_count = 0
+
+    def _bucket(self, bar: Dict) -> Optional[int]:
+        t = bar.get("t")
+        if t is None:
+            return None
+        return int(t.timestamp() // (self.bar_minutes * 60))
+
+    def should_trigger(self, ticker: str, bar: Dict) -> bool:
+        last = self.last_eval.get(ticker)
+        if last is None:
+            return True
+        last_price, last_bucket = last
+        bucket = self._bucket(bar)
+        if bucket is not None and bucket != last_bucket:
+            return True
+        return last_price > 0 and abs(bar["c"] / last_price - 1) >= self.price_threshold
+
+    async def consume(self, ticker: str, queue: asyncio.Queue) -> None:
+        """Drain one ticker's queue forever, keeping only the newest bar of each burst"""
+        while True:
+            bar = await queue.get()
+            while not queue.empty():
+                bar = queue.get_nowait()
+
+            if self.should_trigger(ticker, bar):
+                self.trigger(ticker, bar)
+
+    def trigger(self, ticker: str, bar: Dict) -> None:
+        self.trigger_count += 1
+        self.last_eval[ticker] = (bar["c"], self._bucket(bar))
+
+        task = self.runs.get(ticker)
+        if task is not None and not task.done():
+            self.rerun[ticker] = True  # Coalesce into the run already scheduled
+            return
+        self.runs[ticker] = asyncio.create_task(self._run(ticker))
+
+    async def _run(self, ticker: str) -> None:
+        while True:
+            # Let the rest of a burst arrive before evaluating
+            await asyncio.sleep(self.debounce)
+            self.rerun[ticker] = False
+            self.run_count += 1
+            try:
+                await self.run_fn(ticker)
+            except Exception as e:
+                print(f"❌ Event Run Error ({ticker}): {e}")
+            if not self.rerun.get(ticker):
+                break
+
+    async def start(self, queues: Dict[str, asyncio.Queue]) -> None:
+        await asyncio.gather(*(self.consume(ticker, queue) for ticker, queue in queues.items()))
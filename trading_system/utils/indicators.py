@@ -0,0 +1,190 @@
+"""
+Incremental (streaming) technical indicators.
+Each indicator updates in O(1) per bar and reproduces the `ta` library's definitions:
+- SMA / Bollinger: simple rolling window (population std, ddof=0)
+- EMA: pandas ewm(span, adjust=False), seeded with the first value
+- RSI: Wilder smoothing, ewm(alpha=1/window, adjust=False) of gains/losses
+- ATR: mean of the first `window` true ranges, then Wilder smoothing
+
+`update(..., commit=False)` evaluates a bar without changing state, so a still-forming
+bar can be scored every cycle and committed once it closes.
+"""
+from collections import deque
+from math import sqrt
+from typing import Dict, Optional
+
+class SMA:
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+
+    def update(self, x: float, commit: bool = True) -> Optional[float]:
+        total = self.total + x
+        count = len(self.values) + 1
+        if count > self.window:
+            total -= self.values[0]
+            count = self.window
+        if commit:
+            self.values.append(x)
+            if len(self.values) > self.window:
+                self.values.popleft()
+            self.total = total
+        return total / count if count == self.window else None
+
+class RollingStd:
+    """Rolling mean and population std (sliding Welford update, numerically stable)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def _next(self, x: float):
+        n = len(self.values)
+        if n < self.window:
+            mean = self.mean + (x - self.mean) / (n + 1)
+            m2 = self.m2 + (x - self.mean) * (x - mean)
+        else:
+            old = self.values[0]
+            mean = self.mean + (x - old) / n
+            m2 = self.m2 + (x - old) * (x - mean + old - self.mean)
+        return mean, max(m2, 0.0)
+
+    def update(self, x: float, commit: bool = True):
+        mean, m2 = self._next(x)
+        full = min(len(self.values) + 1, self.window) == self.window
+        if commit:
+            self.values.append(x)
+            if len(self.values) > self.window:
+                self.values.popleft()
+            self.mean, self.m2 = mean, m2
+        if not full:
+            return None, None
+        return mean, sqrt(m2 / self.window)
+
+class EMA:
+    def __init__(self, span: int = None, alpha: float = None, min_periods: int = None):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1)
+        self.min_periods = min_periods if min_periods is not None else span
+        self.value = None
+        self.count = 0
+
+    def update(self, x: float, commit: bool = True) -> Optional[float]:
+        value = x if self.value is None else self.value + self.alpha * (x - self.value)
+        count = self.count + 1
+        if commit:
+            self.value, self.count = value, count
+        return value if count >= self.min_periods else None
+
+class WilderRSI:
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.prev_close = None
+        self.up = EMA(alpha=1.0 / window, min_periods=window)
+        self.down = EMA(alpha=1.0 / window, min_periods=window)
+
+    def update(self, close: float, commit: bool = True) -> Optional[float]:
+        # Like `ta`, the first bar contributes a zero gain/loss rather than being skipped
+        diff = 0.0 if self.prev_close is None else close - self.prev_close
+        up = self.up.update(max(diff, 0.0), commit)
+        down = self.down.update(max(-diff, 0.0), commit)
+        if commit:
+            self.prev_close = close
+        if up is None or down is None:
+            return None
+        if down == 0:
+            return 100.0
+        return 100.0 - 100.0 / (1.0 + up / down)
+
+class MACD:
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(span=fast)
+        self.slow = EMA(span=slow)
+        self.signal = EMA(span=signal)
+
+    def update(self, close: float, commit: bool = True):
+        fast = self.fast.update(close, commit)
+        slow = self.slow.update(close, commit)
+        if fast is None or slow is None:
+            return None, None, None
+        macd = fast - slow
+        signal = self.signal.update(macd, commit)
+        if signal is None:
+            return macd, None, None
+        return macd, signal, macd - signal
+
+class ATR:
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.prev_close = None
+        self.warmup_sum = 0.0
+        self.count = 0
+        self.value = None
+
+    def update(self, high: float, low: float, close: float, commit: bool = True) -> Optional[float]:
+        tr = high - low
+        if self.prev_close is not None:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+
+        count = self.count + 1
+        warmup_sum = self.warmup_sum
+        value = self.value
+        if count < self.window:
+            warmup_sum += tr
+        elif count == self.window:
+            value = (warmup_sum + tr) / self.window
+        else:
+            value = (value * (self.window - 1) + tr) / self.window
+
+        if commit:
+            self.prev_close, self.count, self.warmup_sum, self.value = close, count, warmup_sum, value
+        return value
+
+class IndicatorEngine:
+    """Per-ticker bundle of streaming indicators used by TechnicalAnalyst"""
+
+    def __init__(
+        self,
+        rsi_window: int = 14,
+        sma_fast: int = 20,
+        sma_slow: int = 50,
+        macd: tuple = (12, 26, 9),
+        bb_window: int = 20,
+        bb_dev: float = 2.0,
+        atr_window: int = 14
+    ):
+        self.rsi = WilderRSI(rsi_window)
+        self.macd = MACD(*macd)
+        self.bb = RollingStd(bb_window)
+        self.bb_dev = bb_dev
+        self.atr = ATR(atr_window)
+        self.sma_fast = SMA(sma_fast)
+        self.sma_slow = SMA(sma_slow)
+        self.last_t = None
+        self.bars_seen = 0
+
+    def update(self, bar: Dict, commit: bool = True) -> Dict[str, Optional[float]]:
+        """Feed one bar ({"t","h","l","c",...}); returns the latest value of every indicator (None while warming up)"""
+        close, high, low = float(bar["c"]), float(bar["h"]), float(bar["l"])
+
+        macd, macd_signal, macd_hist = self.macd.update(close, commit)
+        bb_mid, bb_std = self.bb.update(close, commit)
+
+        snapshot = {
+            "close": close,
+            "RSI": self.rsi.update(close, commit),
+            "MACD": macd,
+            "MACD_Signal": macd_signal,
+            "MACD_Hist": macd_hist,
+            "BBL": bb_mid - self.bb_dev * bb_std if bb_mid is not None else None,
+            "BBU": bb_mid + self.bb_dev * bb_std if bb_mid is not None else None,
+            "ATR": self.atr.update(high, low, close, commit),
+            "SMA_FAST": self.sma_fast.update(close, commit),
+            "SMA_SLOW": self.sma_slow.update(close, commit)
+        }
+        if commit:
+            self.last_t = bar.get("t")
+            self.bars_seen += 1
+        return snapshot
@@ -1,12 +1,32 @@
-from typing import Optional, Literal
+from typing import Any, Callable, Dict, List, Optional, Literal, Tuple
 import os
+import threading
 from langchain_core.language_models import BaseChatModel
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_groq import ChatGroq
-from langchain_openai import ChatOpenAI
+from .rate_limiter import TokenBucket
+from ..config import config
 
 LLMProvider = Literal["gemini", "groq", "openrouter"]
 
+class LLMPriority:
+    """Queue order when a provider is rate limited (lower is served first)"""
+    CRITICAL = 0   # Trade decisions the executor is waiting on
+    NORMAL = 1
+    RESEARCH = 2   # Background research / synthesis
+
+def is_rate_limit_error(e: Exception) -> bool:
+    status = getattr(e, "status_code", None) or getattr(getattr(e, "response", None), "status_code", None)
+    if status == 429:
+        return True
+    text = str(e).lower()
+    return "429" in text or "rate limit" in text or "resource_exhausted" in text or "quota" in text
+
+def retry_after(e: Exception, default: float) -> float:
+    headers = getattr(getattr(e, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", default))
+    except (TypeError, ValueError):
+        return default
+
 class LLMClient:
     """
     Unified client for LLM Rotation.
@@ -14,6 +34,10 @@ class LLMClient:
     - Gemini (Deep Reasoning)
     - Groq (Fast/Cheap)
     - OpenRouter (Universal Backup)
+
+    Also acts as the process-wide model registry: model instances (and so their HTTP clients)
+    are reused, each provider has a token-bucket rate limit with a priority queue, and
+    `ainvoke` fails over to the next configured provider when one answers 429.
     """
     
     def __init__(self):
@@ -24,21 +48,94 @@ class LLMClient:
         # Configurable Defaults
         self.default_fast_model = "llama3-8b-8192" # Groq
         self.default_smart_model = "gemini-flash-latest" # Google (Stable, better quotas)
+
+        self._models: Dict[tuple, BaseChatModel] = {}
+        self._models_lock = threading.Lock()
+        trading = config.trading
+        self.buckets = {
+            provider: TokenBucket(rpm, burst=trading.LLM_BURST)
+            for provider, rpm in trading.LLM_RATE_LIMITS.items()
+        }
+        self.failovers = 0
+
+    def available(self, provider: str) -> bool:
+        return bool({"gemini": self.google_key, "groq": self.groq_key, "openrouter": self.openrouter_key}.get(provider))
+
+    def get_model(self, provider: LLMProvider = "gemini", model_name: Optional[str] = None, temperature: float = 0.0,
+                  timeout: Optional[float] = None, max_retries: Optional[int] = None) -> BaseChatModel:
+        """Shared model instance for these settings (built once, reused by every caller)"""
+        key = (provider, model_name, temperature, timeout, max_retries)
+        with self._models_lock:
+            model = self._models.get(key)
+            if model is None:
+                model = self._models[key] = self.build_model(provider, model_name, temperature, timeout, max_retries)
+        return model
+
+    async def ainvoke(
+        self,
+        build_chain: Callable[[BaseChatModel], Any],
+        inputs: Dict,
+        provider: LLMProvider = "gemini",
+        priority: int = LLMPriority.NORMAL,
+        model: Optional[BaseChatModel] = None,
+        **model_kwargs
+    ) -> Tuple[str, Any]:
+        """
+        Run `build_chain(model)` on `provider`, waiting for a rate-limit token at `priority`.
+        A 429 blocks that provider for its Retry-After and moves on to the next configured
+        provider in LLM_FAILOVER_ORDER. Returns (provider used, chain output).
+        """
+        chain_order = [provider] + [p for p in config.trading.LLM_FAILOVER_ORDER if p != provider and self.available(p)]
+        last_error = None
+        for i, name in enumerate(chain_order):
+            bucket = self.buckets.get(name)
+            if bucket is not None and bucket.blocked and i < len(chain_order) - 1:
+                continue  # Still cooling down from a 429; don't queue behind it
+            llm = model if i == 0 and model is not None else self.get_model(name, **model_kwargs)
+            if bucket is not None:
+                await bucket.acquire(priority)
+            try:
+                return name, await build_chain(llm).ainvoke(inputs)
+            except Exception as e:
+                if not is_rate_limit_error(e):
+                    raise
+                last_error = e
+                cooldown = retry_after(e, config.trading.LLM_RATE_LIMIT_COOLDOWN)
+                if bucket is not None:
+                    bucket.penalize(cooldown)
+                self.failovers += 1
+                print(f"⚠️ LLM {name} rate limited (cooling {cooldown:.0f}s), failing over")
+        raise last_error or RuntimeError(f"No LLM provider available for {provider}")
         
-    def get_model(self, provider: LLMProvider = "gemini", model_name: Optional[str] = None, temperature: float = 0.0) -> BaseChatModel:
+    def build_model(
+        self,
+        provider: LLMProvider = "gemini",
+        model_name: Optional[str] = None,
+        temperature: float = 0.0,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None
+    ) -> BaseChatModel:
         """
-        Returns a LangChain Chat Model based on provider.
+        Builds a new LangChain Chat Model based on provider (use get_model for the shared instance).
+        Provider SDKs are imported on demand so importing this module stays cheap.
+        `timeout` bounds each HTTP request (seconds); `max_retries` overrides the SDK's retry count.
         """
+        # Request limits, passed only when set so each SDK keeps its own defaults otherwise
+        limits = {"timeout": timeout}
+        if max_retries is not None:
+            limits["max_retries"] = max_retries
         
         # 1. Gemini (Default Smart)
         if provider == "gemini":
             if not self.google_key:
                 raise ValueError("GOOGLE_API_KEY is missing")
+            from langchain_google_genai import ChatGoogleGenerativeAI
             return ChatGoogleGenerativeAI(
                 model=model_name or self.default_smart_model,
                 temperature=temperature,
                 google_api_key=self.google_key,
-                convert_system_message_to_human=True 
+                convert_system_message_to_human=True,
+                **limits
             )
 
         # 2. Groq (Fast Inference)
@@ -46,12 +143,14 @@ class LLMClient:
             if not self.groq_key:
                 # Fallback to Gemini if Groq missing
                 print("⚠️ Warning: GROQ_API_KEY missing, falling back to Gemini")
-                return self.get_model("gemini", temperature=temperature)
+                return self.build_model("gemini", temperature=temperature, timeout=timeout, max_retries=max_retries)
                 
+            from langchain_groq import ChatGroq
             return ChatGroq(
                 model_name=model_name or self.default_fast_model,
                 temperature=temperature,
-                groq_api_key=self.groq_key
+                groq_api_key=self.groq_key,
+                **limits
             )
 
         # 3. OpenRouter (Universal / OpenAI Protocol)
@@ -59,11 +158,13 @@ class LLMClient:
             if not self.openrouter_key:
                 raise ValueError("OPENROUTER_API_KEY is missing")
                 
+            from langchain_openai import ChatOpenAI
             return ChatOpenAI(
                 base_url="https://openrouter.ai/api/v1",
                 api_key=self.openrouter_key,
                 model=model_name or "openai/gpt-4o",
-                temperature=temperature
+                temperature=temperature,
+                **limits
             )
             
         else:
@@ -0,0 +1,173 @@
+import asyncio
+import time
+from datetime import date, datetime
+from typing import Dict, List, Optional, Sequence, Union
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from ..config import config
+from .async_io import run_blocking
+
+VIX = "^VIX"
+MARKET = "SPY"
+REGIMES = ("low", "normal", "elevated", "crisis")
+REGIME_BOUNDS = np.array([15.0, 25.0, 35.0])  # VIX below 15 is "low", 35 and up is "crisis"
+DEFAULT_VIX = 20.0                            # Fallback when nothing has been fetched
+
+When = Union[None, str, date, datetime, np.datetime64]
+
+def vix_regime(level: float) -> str:
+    return REGIMES[int(np.searchsorted(REGIME_BOUNDS, level, side="right"))]
+
+def relative_strength(close: np.ndarray, market: np.ndarray, lookbacks: Sequence[int]) -> np.ndarray:
+    """
+    (lookbacks × dates × symbols) trailing return of each column minus the market's return over
+    the same window, computed in one broadcast gather. NaN where a window has too little history.
+    """
+    past = np.arange(len(close))[None, :] - np.asarray(lookbacks)[:, None]  # (L, T) start rows
+    valid = past >= 0
+    prices = np.column_stack([close, market])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[None] / prices[np.where(valid, past, 0)] - 1      # (L, T, N + 1)
+    rs = returns[..., :-1] - returns[..., -1:]
+    rs[~valid] = np.nan
+    return rs
+
+class MacroMatrix:
+    """
+    Daily macro history: relative strength of every sector ETF vs SPY at each configured
+    lookback, plus VIX level and regime per date. A calendar-day -> row table makes any
+    (ticker, date) lookup O(1); dates past the end resolve to the latest row, so live runs
+    and backtests use the same lookups.
+    """
+
+    def __init__(self, dates: np.ndarray, symbols: List[str], rs: np.ndarray,
+                 lookbacks: Sequence[int], vix: np.ndarray):
+        self.dates = dates.astype("datetime64[D]")
+        self.symbols = list(symbols)
+        self.columns = {s: i for i, s in enumerate(self.symbols)}
+        self.rs = rs
+        self.lookbacks = list(lookbacks)
+        self.vix = vix
+        self.regimes = np.searchsorted(REGIME_BOUNDS, vix, side="right")  # Index into REGIMES
+        if len(self.dates):
+            # Weekends/holidays map to the last trading day before them
+            days = self.dates[0] + np.arange((self.dates[-1] - self.dates[0]).astype(int) + 1)
+            self.day_rows = np.searchsorted(self.dates, days, side="right") - 1
+        else:
+            self.day_rows = np.empty(0, dtype=np.int64)
+
+    @classmethod
+    def empty(cls) -> "MacroMatrix":
+        return cls(np.empty(0, dtype="datetime64[D]"), [], np.empty((0, 0, 0)), [], np.empty(0))
+
+    @classmethod
+    def from_close(cls, close: pd.DataFrame, lookbacks: Sequence[int] = None) -> "MacroMatrix":
+        """From a daily close frame with one column per symbol (VIX, SPY, sector ETFs)"""
+        lookbacks = lookbacks or config.trading.MACRO_LOOKBACKS
+        close = close.sort_index().ffill()
+        if MARKET not in close:
+            return cls.empty()
+        symbols = [c for c in close.columns if c != VIX]
+        vix = close[VIX].to_numpy(float) if VIX in close else np.full(len(close), DEFAULT_VIX)
+        rs = relative_strength(close[symbols].to_numpy(float), close[MARKET].to_numpy(float), lookbacks)
+        return cls(close.index.values, symbols, rs, lookbacks, np.nan_to_num(vix, nan=DEFAULT_VIX))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def row(self, when: When = None) -> Optional[int]:
+        """Row in effect on `when` (latest when None); None before the history starts"""
+        if not len(self.dates):
+            return None
+        if when is None:
+            return len(self.dates) - 1
+        offset = int((np.datetime64(pd.Timestamp(when).date(), "D") - self.dates[0]).astype(int))
+        if offset < 0:
+            return None
+        return int(self.day_rows[min(offset, len(self.day_rows) - 1)])
+
+    def momentum(self, ticker: str, when: When = None, lookback: int = None) -> float:
+        """Ticker's sector ETF return minus SPY's over `lookback` trading days"""
+        row = self.row(when)
+        col = self.columns.get(config.trading.SECTOR_MAP.get(ticker, MARKET))  # Market if unknown
+        lookback = lookback or config.trading.MACRO_MOMENTUM_LOOKBACK
+        if row is None or col is None or lookback not in self.lookbacks:
+            return 0.0
+        value = self.rs[self.lookbacks.index(lookback), row, col]
+        return 0.0 if np.isnan(value) else float(value)
+
+    def lookup(self, ticker: str, when: When = None) -> dict:
+        """MacroAnalyst's state update for one ticker"""
+        row = self.row(when)
+        vix = DEFAULT_VIX if row is None else float(self.vix[row])
+        return {
+            "vix_level": vix,
+            "vix_regime": vix_regime(vix),
+            "sector_momentum": self.momentum(ticker, when)
+        }
+
+    def history(self, ticker: str, dates: Sequence) -> pd.DataFrame:
+        """Vectorized lookup over many dates (e.g. a backtest index): regime and momentum per lookback"""
+        index = pd.DatetimeIndex(dates)
+        frame = pd.DataFrame(index=index)
+        col = self.columns.get(config.trading.SECTOR_MAP.get(ticker, MARKET))
+        if not len(self.dates) or col is None:
+            frame["vix_level"], frame["vix_regime"] = DEFAULT_VIX, vix_regime(DEFAULT_VIX)
+            return frame
+
+        offsets = (index.values.astype("datetime64[D]") - self.dates[0]).astype(int)
+        rows = self.day_rows[np.clip(offsets, 0, len(self.day_rows) - 1)]
+        before = offsets < 0
+        frame["vix_level"] = np.where(before, DEFAULT_VIX, self.vix[rows])
+        frame["vix_regime"] = np.array(REGIMES)[np.searchsorted(REGIME_BOUNDS, frame["vix_level"], side="right")]
+        for i, lookback in enumerate(self.lookbacks):
+            frame[f"momentum_{lookback}"] = np.where(before, np.nan, self.rs[i, rows, col])
+        return frame
+
+class MacroSnapshotService:
+    """
+    VIX, SPY and every sector ETF in one batched yfinance download, turned into a MacroMatrix
+    and cached for MACRO_TTL. Concurrent per-ticker graph runs share one in-flight refresh;
+    MacroAnalyst then only does a lookup. A failed refresh keeps the previous matrix.
+    """
+
+    def __init__(self):
+        self.matrix = MacroMatrix.empty()
+        self.fetched_at: Optional[float] = None
+        self.inflight: Optional[asyncio.Task] = None
+        self.fetches = 0
+
+    @staticmethod
+    def symbols() -> list:
+        trading = config.trading
+        sectors = set(trading.SECTOR_ETFS) | set(trading.SECTOR_MAP.values())
+        return [VIX, MARKET] + sorted(sectors - {MARKET})
+
+    async def _fetch(self) -> None:
+        self.fetches += 1
+        try:
+            data = await run_blocking(
+                yf.download, self.symbols(), period=config.trading.MACRO_PERIOD, progress=False
+            )
+            if data.empty:
+                raise ValueError("empty download")
+            self.matrix = MacroMatrix.from_close(data["Close"])
+        except Exception as e:
+            print(f"Macro Snapshot Error (keeping previous): {e}")
+        self.fetched_at = time.monotonic()
+
+    async def refresh(self) -> None:
+        if self.fetched_at is not None and time.monotonic() - self.fetched_at < config.trading.MACRO_TTL:
+            return
+        task = self.inflight
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self.inflight = asyncio.ensure_future(self._fetch())
+        await asyncio.shield(task)
+
+    async def get(self) -> MacroMatrix:
+        await self.refresh()
+        return self.matrix
+
+# Singleton Instance
+macro_snapshot = MacroSnapshotService()
@@ -0,0 +1,65 @@
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+class MicroBatcher:
+    """
+    Coalesces concurrent async submissions into one batched call.
+    Callers `await submit(items)` and get back the results for their own items;
+    everything submitted within `window` seconds (or until `max_batch` items queue up)
+    is handed to `process_batch` in a single call.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+        window: float = 0.05,
+        max_batch: int = 256
+    ):
+        self.process_batch = process_batch
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[List[Any], asyncio.Future]] = []
+        self._pending_count = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+    async def submit(self, items: List[Any]) -> List[Any]:
+        if not items:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((list(items), future))
+        self._pending_count += len(items)
+
+        if self._pending_count >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending, self._pending_count = self._pending, [], 0
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[List[Any], asyncio.Future]]) -> None:
+        flat = [item for items, _ in batch for item in items]
+        try:
+            results = await self.process_batch(flat)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        # Hand each caller the slice that matches its own items
+        offset = 0
+        for items, future in batch:
+            if not future.done():
+                future.set_result(results[offset:offset + len(items)])
+            offset += len(items)
@@ -0,0 +1,164 @@
+import asyncio
+import bisect
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from ..config import config
+from ..mcp.news_client import NewsMCPClient
+
+@dataclass
+class Article:
+    title: str
+    url: str
+    source: str
+    snippet: str
+    published: float      # Epoch seconds (fetch time when the feed has no date)
+
+def canonical_url(url: str) -> str:
+    """Scheme/host case, tracking params, fragments and trailing slashes don't make a new article"""
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.lower().startswith("utm_")])
+    return urlunsplit(("https", parts.netloc.lower().removeprefix("www."), parts.path.rstrip("/"), query, ""))
+
+def normalize_title(title: str) -> str:
+    return " ".join("".join(c if c.isalnum() else " " for c in (title or "").lower()).split())
+
+def parse_published(value, default: float) -> float:
+    if not value:
+        return default
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return default
+
+class NewsStore:
+    """
+    Per-ticker articles ordered by publish time (parallel sorted lists, bisect for time-range reads).
+    Articles are deduped on canonical URL and on near-identical titles (syndicated copies).
+    """
+
+    def __init__(self, similarity: float = None, retention_hours: float = None):
+        self.similarity = similarity or config.trading.NEWS_TITLE_SIMILARITY
+        self.retention = (retention_hours or config.trading.NEWS_RETENTION_HOURS) * 3600
+        self.times: Dict[str, List[float]] = {}
+        self.articles: Dict[str, List[Article]] = {}
+        self.urls: Dict[str, set] = {}
+        self.duplicates = 0
+
+    def is_duplicate(self, ticker: str, article: Article) -> bool:
+        url = canonical_url(article.url)
+        if url and url in self.urls.get(ticker, ()):
+            return True
+        title = normalize_title(article.title)
+        return any(
+            SequenceMatcher(None, title, normalize_title(other.title)).ratio() >= self.similarity
+            for other in self.articles.get(ticker, ())
+        )
+
+    def add(self, ticker: str, articles: List[Article]) -> int:
+        """Insert new articles; returns how many were kept"""
+        times = self.times.setdefault(ticker, [])
+        stored = self.articles.setdefault(ticker, [])
+        urls = self.urls.setdefault(ticker, set())
+        added = 0
+        for article in articles:
+            if not article.title or self.is_duplicate(ticker, article):
+                self.duplicates += 1
+                continue
+            i = bisect.bisect_right(times, article.published)
+            times.insert(i, article.published)
+            stored.insert(i, article)
+            urls.add(canonical_url(article.url))
+            added += 1
+        self.prune(ticker)
+        return added
+
+    def prune(self, ticker: str) -> None:
+        cut = bisect.bisect_left(self.times.get(ticker, []), time.time() - self.retention)
+        if cut:
+            dropped = self.articles[ticker][:cut]
+            del self.times[ticker][:cut]
+            del self.articles[ticker][:cut]
+            self.urls[ticker] -= {canonical_url(a.url) for a in dropped}
+
+    def recent(self, ticker: str, hours: float, limit: int = None) -> List[Article]:
+        """Articles published in the last `hours`, newest first"""
+        times = self.times.get(ticker, [])
+        start = bisect.bisect_left(times, time.time() - hours * 3600)
+        articles = self.articles.get(ticker, [])[start:][::-1]
+        return articles[:limit] if limit else articles
+
+# One search per kind and ticker: headlines (SentimentAnalyst) and what is moving the price (NewsResearcher)
+QUERIES = {
+    "news": "{ticker} stock news",
+    "research": "{ticker} stock news reason for price move today"
+}
+
+class NewsIngestion:
+    """
+    One news fetch per ticker per cycle, shared by SentimentAnalyst and NewsResearcherAgent.
+    A fetch runs every query in QUERIES concurrently, each into its own NewsStore, so the
+    researcher keeps its own "why is it moving" search. Concurrent callers for the same
+    ticker wait on the same in-flight fetch.
+    """
+
+    def __init__(self):
+        self.client = NewsMCPClient()
+        self.stores = {kind: NewsStore() for kind in QUERIES}
+        self.fetched_at: Dict[str, float] = {}
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.fetches = 0
+
+    async def _fetch(self, ticker: str) -> None:
+        trading = config.trading
+        self.fetches += 1
+        searches = await asyncio.gather(*(
+            self.client.search_news(
+                query=query.format(ticker=ticker),
+                symbols=[ticker],
+                freshness="24h",
+                count=trading.NEWS_MAX_RESULTS
+            )
+            for query in QUERIES.values()
+        ))
+        now = time.time()
+        for kind, results in zip(QUERIES, searches):
+            self.stores[kind].add(ticker, [
+                Article(
+                    title=r.get("title") or "",
+                    url=r.get("url") or "",
+                    source=r.get("source") or "",
+                    snippet=r.get("snippet") or "",
+                    published=parse_published(r.get("published"), now)
+                )
+                for r in results
+            ])
+        self.fetched_at[ticker] = time.monotonic()
+
+    async def refresh(self, ticker: str) -> None:
+        """Fetch unless this cycle already did (NEWS_INGEST_TTL); joins an in-flight fetch"""
+        fetched = self.fetched_at.get(ticker)
+        if fetched is not None and time.monotonic() - fetched < config.trading.NEWS_INGEST_TTL:
+            return
+        task = self.inflight.get(ticker)
+        if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+            task = self.inflight[ticker] = asyncio.ensure_future(self._fetch(ticker))
+        await asyncio.shield(task)
+
+    async def prefetch(self, tickers: List[str]) -> None:
+        """Ingest a whole cycle's tickers concurrently"""
+        await asyncio.gather(*(self.refresh(t) for t in tickers), return_exceptions=True)
+
+    async def get(self, ticker: str, hours: float = None, limit: int = None, kind: str = "news") -> List[Article]:
+        """Recent deduped articles from one of the QUERIES searches"""
+        await self.refresh(ticker)
+        trading = config.trading
+        return self.stores[kind].recent(ticker, hours or trading.NEWS_LOOKBACK_HOURS, limit or trading.NEWS_MAX_RESULTS)
+
+# Singleton Instance
+news_ingestion = NewsIngestion()
@@ -0,0 +1,108 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+import numpy as np
+from ..config import config
+
+def covariance(closes_by_symbol: Dict[str, np.ndarray], lookback: int = None,
+               shrink: float = None, default_vol: float = None) -> np.ndarray:
+    """
+    Daily log-return covariance (symbols in dict order) over the last `lookback` returns.
+    Histories are aligned on the most recent bar; a symbol with too little history gets
+    `default_vol` on the diagonal and no correlation. Off-diagonals shrink toward zero.
+    """
+    trading = config.trading
+    lookback = lookback or trading.RISK_COV_LOOKBACK
+    shrink = trading.RISK_COV_SHRINK if shrink is None else shrink
+    default_vol = default_vol or trading.RISK_DEFAULT_VOL
+
+    n = len(closes_by_symbol)
+    closes = np.full((lookback + 1, n), np.nan)
+    for j, c in enumerate(closes_by_symbol.values()):
+        c = np.asarray(c, dtype=float)[-(lookback + 1):]
+        if len(c):
+            closes[-len(c):, j] = c
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(closes), axis=0)
+
+    observed = np.isfinite(returns)
+    returns = np.where(observed, returns, 0.0)
+    count = np.maximum(observed.T.astype(float) @ observed, 1.0)  # Pairwise overlap
+    means = returns.sum(0) / np.maximum(observed.sum(0), 1)
+    centered = np.where(observed, returns - means, 0.0)
+    cov = centered.T @ centered / np.maximum(count - 1, 1.0)
+
+    variances = np.diag(cov).copy()
+    cov *= 1 - shrink
+    np.fill_diagonal(cov, variances)
+    thin = observed.sum(0) < 2
+    cov[thin, :] = cov[:, thin] = 0.0
+    cov[thin, thin] = default_vol ** 2
+    return cov
+
+@dataclass
+class Allocation:
+    scale: np.ndarray                                  # Fraction of each requested trade kept
+    binding: List[str] = field(default_factory=list)   # Limits that cut the batch
+    gross: float = 0.0                                 # Post-trade exposures, fractions of equity
+    net: float = 0.0
+    var: float = 0.0
+
+def allocate(requested: np.ndarray, existing: np.ndarray, sectors: Sequence[str],
+             cov: np.ndarray, equity: float, steps: int = None) -> Allocation:
+    """
+    Scale a cycle's requested trades (signed dollar exposure per symbol) so the portfolio,
+    existing positions included, stays within RISK_MAX_SECTOR, RISK_MAX_GROSS, RISK_MAX_NET
+    and RISK_MAX_VAR (fractions of equity).
+
+    Each limit is convex along a scale s in [0, 1], so its feasible scales are an interval
+    starting at 0; the solver evaluates every limit on a grid of s at once and keeps the
+    largest feasible prefix. Sector caps scale each sector's trades first, then one common
+    scale covers the portfolio-wide limits. A limit the current book already breaches only
+    has to not get worse.
+    """
+    trading = config.trading
+    steps = steps or trading.RISK_SOLVER_STEPS
+    requested = np.asarray(requested, dtype=float)
+    existing = np.asarray(existing, dtype=float)
+    grid = np.linspace(0.0, 1.0, steps)
+
+    def largest_feasible(values: np.ndarray, limit: float) -> np.ndarray:
+        # values: (steps, k); row 0 is the current book
+        allowed = np.maximum(limit, values[0]) + 1e-9
+        ok = np.cumprod(values <= allowed, axis=0)
+        return grid[np.maximum(ok.sum(0) - 1, 0)]
+
+    binding = []
+
+    # 1. Per-sector gross caps: one scale per sector
+    names, codes = np.unique(np.asarray(sectors, dtype=str), return_inverse=True)
+    onehot = np.zeros((len(requested), len(names)))
+    onehot[np.arange(len(requested)), codes] = 1.0
+    exposure = existing + grid[:, None] * requested                      # (steps, n)
+    sector_scale = largest_feasible(np.abs(exposure) @ onehot, trading.RISK_MAX_SECTOR * equity)
+    if (sector_scale < 1).any():
+        binding += [f"sector:{name}" for name in names[sector_scale < 1]]
+    requested = requested * sector_scale[codes]
+
+    # 2. Portfolio-wide limits on a common scale
+    exposure = existing + grid[:, None] * requested
+    gross = np.abs(exposure).sum(1)
+    net = np.abs(exposure.sum(1))
+    var = trading.RISK_VAR_Z * np.sqrt(np.maximum(np.einsum("si,ij,sj->s", exposure, cov, exposure), 0.0))
+    limits = {
+        "gross": (gross, trading.RISK_MAX_GROSS),
+        "net": (net, trading.RISK_MAX_NET),
+        "var": (var, trading.RISK_MAX_VAR),
+    }
+    scales = {name: largest_feasible(values[:, None], limit * equity)[0] for name, (values, limit) in limits.items()}
+    common = min(scales.values())
+    binding += [name for name, s in scales.items() if s < 1 and s == common]
+
+    i = int(round(common * (steps - 1)))
+    return Allocation(
+        scale=sector_scale[codes] * common,
+        binding=binding,
+        gross=float(gross[i] / equity),
+        net=float(net[i] / equity),
+        var=float(var[i] / equity)
+    )
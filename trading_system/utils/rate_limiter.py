@@ -0,0 +1,77 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Optional
+
+class TokenBucket:
+    """
+    Async token bucket with a priority wait queue.
+    `rate_per_minute` tokens refill continuously up to `burst`; when tokens run out, waiters are
+    served lowest `priority` value first (FIFO within a priority). `penalize()` empties the bucket
+    and blocks it for a while, e.g. after the provider answered 429.
+    """
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._waiters = []  # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_loop = None
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority: int = 1) -> None:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), future))
+        self._dispatch()
+        await future
+
+    def penalize(self, seconds: float) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = 0.0
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def _dispatch(self) -> None:
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters and now >= self.blocked_until:
+            priority, seq, future = self._waiters[0]
+            if future.done():  # Waiter was cancelled
+                heapq.heappop(self._waiters)
+                continue
+            if self.tokens < 1:
+                break
+            heapq.heappop(self._waiters)
+            self.tokens -= 1
+            future.set_result(None)
+
+        if not self._waiters:
+            return
+        # A timer from a loop that has since closed will never fire; replace it
+        loop = asyncio.get_running_loop()
+        if self._timer is not None and self._timer_loop is loop:
+            return
+        delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.rate > 0 else 1.0, 0.0)
+        self._timer_loop = loop
+        self._timer = loop.call_later(delay, self._on_timer)
+
+    def _on_timer(self) -> None:
+        self._timer = None
+        self._dispatch()
+
+    @property
+    def blocked(self) -> bool:
+        return time.monotonic() < self.blocked_until
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, future in self._waiters if not future.done())
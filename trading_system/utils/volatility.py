@@ -0,0 +1,95 @@
+from dataclasses import asdict, dataclass
+from math import sqrt
+from typing import Dict, Optional, Sequence, Tuple
+import numpy as np
+from ..config import config
+from ..mcp.alpaca_client import AlpacaMCPClient
+
+TRADING_DAYS = 252
+
+@dataclass
+class Volatility:
+    atr: float            # Wilder ATR in price units (same definition as indicators.ATR)
+    atr_pct: float        # ATR / last close
+    realized_vol: float   # Annualized std of daily log returns over VOL_WINDOW
+    ewma_vol: float       # Annualized RiskMetrics EWMA (decay VOL_EWMA_LAMBDA)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+def columns(bars) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """High/low/close arrays from a BarWindow (zero-copy) or a list of bar dicts"""
+    if hasattr(bars, "cols"):
+        return bars.h, bars.l, bars.c
+    return (np.array([b["h"] for b in bars], dtype=float),
+            np.array([b["l"] for b in bars], dtype=float),
+            np.array([b["c"] for b in bars], dtype=float))
+
+def decayed_sum(values: np.ndarray, decay: float) -> float:
+    """sum(decay^(n-1-i) * values[i]): a recursive smoother's contribution, unrolled"""
+    return float(np.dot(decay ** np.arange(len(values) - 1, -1, -1), values))
+
+def compute_volatility(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                       atr_window: int = 14, vol_window: int = 20, lam: float = 0.94) -> Optional[Volatility]:
+    if len(close) < 2:
+        return None
+    # True range; the first bar has no previous close
+    prev = close[:-1]
+    tr = np.r_[high[0] - low[0], np.maximum.reduce([high[1:] - low[1:], np.abs(high[1:] - prev), np.abs(low[1:] - prev)])]
+
+    # ATR: mean of the first `atr_window` true ranges, then Wilder smoothing (closed form)
+    if len(tr) >= atr_window:
+        rest = tr[atr_window:]
+        decay = (atr_window - 1) / atr_window
+        atr = decay ** len(rest) * tr[:atr_window].mean() + decayed_sum(rest, decay) / atr_window
+    else:
+        atr = float(tr.mean())
+
+    returns = np.diff(np.log(close))
+    recent = returns[-vol_window:]
+    realized = float(recent.std(ddof=1)) if len(recent) > 1 else 0.0
+
+    # EWMA variance seeded with the first window's mean square, then sigma2 = lam*sigma2 + (1-lam)*r^2
+    seed, rest = returns[:vol_window], returns[vol_window:]
+    variance = lam ** len(rest) * float(np.mean(seed ** 2)) + (1 - lam) * decayed_sum(rest ** 2, lam)
+
+    return Volatility(
+        atr=float(atr),
+        atr_pct=float(atr / close[-1]) if close[-1] else 0.0,
+        realized_vol=realized * sqrt(TRADING_DAYS),
+        ewma_vol=sqrt(variance * TRADING_DAYS)
+    )
+
+class VolatilityService:
+    """
+    Per-ticker ATR / realized / EWMA volatility shared by TechnicalAnalyst and RiskAgent.
+    TechnicalAnalyst feeds the bars it already loaded (`update`); anyone else `get`s from the
+    shared bar cache. Results are memoized on the newest bar, so repeat reads are O(1).
+    """
+
+    def __init__(self):
+        self.alpaca = AlpacaMCPClient()
+        self.latest: Dict[str, Tuple[tuple, Volatility]] = {}
+
+    def update(self, ticker: str, bars: Sequence) -> Optional[Volatility]:
+        if not len(bars):
+            return None
+        last = bars[len(bars) - 1]
+        key = (last["t"], last["h"], last["l"], last["c"], len(bars))  # The newest bar may still be forming
+        cached = self.latest.get(ticker)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        trading = config.trading
+        high, low, close = (col[-trading.VOL_HISTORY:] for col in columns(bars))
+        vol = compute_volatility(high, low, close, trading.ATR_WINDOW, trading.VOL_WINDOW, trading.VOL_EWMA_LAMBDA)
+        if vol is not None:
+            self.latest[ticker] = (key, vol)
+        return vol
+
+    async def get(self, ticker: str) -> Optional[Volatility]:
+        bars = await self.alpaca.get_bars(ticker, timeframe="1Day", limit=config.trading.VOL_HISTORY)
+        return self.update(ticker, bars)
+
+# Singleton Instance
+volatility_service = VolatilityService()
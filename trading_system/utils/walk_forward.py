@@ -0,0 +1,176 @@
+import warnings
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Dict, List, Tuple
+import numpy as np
+import pandas as pd
+import vectorbt as vbt
+from .cache import TTLCache
+from ..config import config
+
+class IndicatorCache:
+    """
+    Full-history indicator vectors keyed by (symbol, indicator, window).
+    Indicators are causal, so one full-length vector serves every train/test window sliced from it.
+    vbt's RSI and MA (ewm=False) are rolling, so a value only depends on the last `window + 1` closes:
+    when a symbol's series comes back with new bars (and its oldest ones dropped), the overlapping
+    values are reused and only the warm-up head and the new tail are computed.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._cache = TTLCache(maxsize=maxsize)
+        self.computed = 0   # Vectors computed from scratch
+        self.extended = 0   # Vectors reused from an overlapping earlier series
+
+    @staticmethod
+    def compute(close: np.ndarray, indicator: str, window: int) -> np.ndarray:
+        series = pd.Series(close)
+        if indicator == "rsi":
+            return vbt.RSI.run(series, window=window).rsi.values
+        if indicator == "ma":
+            return vbt.MA.run(series, window=window).ma.values
+        raise ValueError(f"Unknown indicator: {indicator}")
+
+    @staticmethod
+    def overlap(cached: np.ndarray, close: np.ndarray) -> Tuple[int, int]:
+        """(offset, length) with close[:length] == cached[offset:offset + length]; length 0 when unrelated"""
+        for offset in np.flatnonzero(cached == close[0]) if len(close) else []:
+            length = min(len(cached) - offset, len(close))
+            if np.array_equal(cached[offset:offset + length], close[:length]):
+                return int(offset), length
+        return 0, 0
+
+    def get(self, symbol: str, close: np.ndarray, indicator: str, window: int) -> np.ndarray:
+        close = np.ascontiguousarray(close, dtype=np.float64)
+        key = (symbol, indicator, window)
+        entry = self._cache.get(key)
+        offset, length = self.overlap(entry[0], close) if entry is not None else (0, 0)
+        memory = 2 * window  # Bars that can still influence a value, with slack
+
+        if entry is not None and offset == 0 and length == len(close) == len(entry[0]):
+            return entry[1]  # Unchanged series
+        if length <= memory:
+            values = self.compute(close, indicator, window)
+            self.computed += 1
+        else:
+            values = np.empty(len(close))
+            values[:length] = entry[1][offset:offset + length]
+            values[:memory] = self.compute(close[:memory], indicator, window)  # Warm-up, as on a fresh series
+            if len(close) > length:
+                values[length:] = self.compute(close[length - memory:], indicator, window)[memory:]
+            self.extended += 1
+        self._cache.set(key, (close, values))
+        return values
+
+    def stats(self) -> Dict:
+        return {**self._cache.stats(), "computed": self.computed, "extended": self.extended}
+
+@dataclass
+class WalkForwardResult:
+    folds: List[Dict] = field(default_factory=list)          # Per fold: ranges, in-sample pick and its OOS score
+    param_metrics: pd.DataFrame = None                       # Per param set: mean/std OOS metrics across folds
+    best_params: Dict = field(default_factory=dict)          # Highest mean OOS Sharpe
+    oos_sharpe: float = float("nan")                         # Mean OOS Sharpe of the walk-forward picks
+
+class WalkForwardOptimizer:
+    """
+    Rolls (train, test) windows over a close series. Every parameter set is backtested on every window
+    in one vectorized Portfolio call per window; params are judged by their out-of-sample results.
+    Indicator vectors are cached under the series name (the ticker), so name the series.
+    """
+
+    def __init__(self, train_bars: int = None, test_bars: int = None, step_bars: int = None, cache: IndicatorCache = None):
+        self.train_bars = train_bars or config.trading.WF_TRAIN_BARS
+        self.test_bars = test_bars or config.trading.WF_TEST_BARS
+        self.step_bars = step_bars or config.trading.WF_STEP_BARS or self.test_bars
+        self.cache = cache or indicator_cache
+
+    def windows(self, n: int) -> List[Tuple[slice, slice]]:
+        """(train, test) slices, laid out so the last test window ends on the most recent bar"""
+        out = []
+        span = self.train_bars + self.test_bars
+        start = (n - span) % self.step_bars if n >= span else 0
+        while start + self.train_bars + self.test_bars <= n:
+            train = slice(start, start + self.train_bars)
+            test = slice(start + self.train_bars, start + self.train_bars + self.test_bars)
+            out.append((train, test))
+            start += self.step_bars
+        return out
+
+    def run_rsi(self, close: pd.Series, windows, buys, sells) -> WalkForwardResult:
+        values = close.values.astype(float)
+        rsi = {w: self.cache.get(close.name, values, "rsi", w) for w in windows}
+        params = [(w, b, s) for w, b, s in product(windows, buys, sells) if b < s]
+
+        entries = np.column_stack([rsi[w] < b for w, b, _ in params])
+        exits = np.column_stack([rsi[w] > s for w, _, s in params])
+        names = ["window", "buy_threshold", "sell_threshold"]
+        return self._evaluate(values, params, names, entries, exits, fees=0.001)
+
+    def run_sma(self, close: pd.Series, fast_windows, slow_windows) -> WalkForwardResult:
+        values = close.values.astype(float)
+        ma = {w: self.cache.get(close.name, values, "ma", w) for w in set(fast_windows) | set(slow_windows)}
+        params = [(f, s) for f, s in product(fast_windows, slow_windows) if f < s]
+
+        above = np.column_stack([ma[f] > ma[s] for f, s in params])
+        below = np.column_stack([ma[f] < ma[s] for f, s in params])
+        prev_above = np.vstack([np.zeros((1, len(params)), dtype=bool), above[:-1]])
+        prev_below = np.vstack([np.zeros((1, len(params)), dtype=bool), below[:-1]])
+        return self._evaluate(values, params, ["fast_window", "slow_window"], above & prev_below, below & prev_above)
+
+    def _score(self, close: np.ndarray, entries: np.ndarray, exits: np.ndarray, **pf_kwargs) -> Tuple[np.ndarray, np.ndarray]:
+        portfolio = vbt.Portfolio.from_signals(
+            pd.DataFrame(np.tile(close[:, None], (1, entries.shape[1]))),
+            pd.DataFrame(entries), pd.DataFrame(exits),
+            init_cash=10000, freq='D', **pf_kwargs
+        )
+        sharpe = portfolio.sharpe_ratio().values
+        total_return = portfolio.total_return().values
+        return np.where(np.isfinite(sharpe), sharpe, np.nan), total_return
+
+    def _evaluate(self, close: np.ndarray, params: List[tuple], names: List[str], entries: np.ndarray, exits: np.ndarray, **pf_kwargs) -> WalkForwardResult:
+        result = WalkForwardResult()
+        splits = self.windows(len(close))
+        if not splits:
+            return result
+
+        oos_sharpe = np.full((len(splits), len(params)), np.nan)
+        oos_return = np.full((len(splits), len(params)), np.nan)
+        picks = []
+
+        for i, (train, test) in enumerate(splits):
+            # Each window starts flat: a fresh portfolio over the sliced signals
+            is_sharpe, _ = self._score(close[train], entries[train], exits[train], **pf_kwargs)
+            oos_sharpe[i], oos_return[i] = self._score(close[test], entries[test], exits[test], **pf_kwargs)
+
+            pick = int(np.nanargmax(is_sharpe)) if np.isfinite(is_sharpe).any() else None
+            fold = {"train": (train.start, train.stop), "test": (test.start, test.stop)}
+            if pick is not None:
+                fold.update({
+                    "params": dict(zip(names, params[pick])),
+                    "in_sample_sharpe": float(is_sharpe[pick]),
+                    "oos_sharpe": float(oos_sharpe[i, pick]),
+                    "oos_return": float(oos_return[i, pick])
+                })
+                picks.append(oos_sharpe[i, pick])
+            result.folds.append(fold)
+
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # All-NaN columns (never traded)
+            result.param_metrics = pd.DataFrame({
+                "oos_sharpe_mean": np.nanmean(oos_sharpe, axis=0),
+                "oos_sharpe_std": np.nanstd(oos_sharpe, axis=0),
+                "oos_return_mean": np.nanmean(oos_return, axis=0),
+                "folds": np.sum(np.isfinite(oos_sharpe), axis=0)
+            }, index=pd.MultiIndex.from_tuples(params, names=names))
+
+        ranked = result.param_metrics["oos_sharpe_mean"].dropna()
+        if not ranked.empty:
+            result.best_params = {name: int(v) for name, v in zip(names, ranked.idxmax())}
+        finite_picks = [p for p in picks if np.isfinite(p)]
+        if finite_picks:
+            result.oos_sharpe = float(np.mean(finite_picks))
+        return result
+
+# Singleton Instance (indicator vectors shared across optimization runs)
+indicator_cache = IndicatorCache()
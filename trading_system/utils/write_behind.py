@@ -0,0 +1,175 @@
+import asyncio
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from ..config import config
+
+WriteFn = Callable[[str, List[Dict[str, Any]]], Awaitable[None]]
+
+RETRYABLE_STATUS = {408, 429}                                     # Plus every 5xx
+RETRYABLE_PGRST = {"PGRST000", "PGRST001", "PGRST002", "PGRST003"}  # PostgREST can't reach / wait on Postgres
+
+def is_unreachable(error: Exception) -> bool:
+    """
+    Connection-level failures, outages and throttling (retry later) as opposed to the database
+    rejecting the rows. PostgREST's APIError carries either a PGRST code or, for a non-JSON
+    gateway response, the HTTP status; 5-character SQLSTATE codes (e.g. 23502) are rejections.
+    """
+    if isinstance(error, (OSError, asyncio.TimeoutError, TimeoutError)):
+        return True
+    code = str(getattr(error, "code", "") or "")
+    if code in RETRYABLE_PGRST:
+        return True
+    if len(code) == 3 and code.isdigit() and (int(code) in RETRYABLE_STATUS or int(code) >= 500):
+        return True
+    try:
+        import httpx
+        return isinstance(error, httpx.TransportError)
+    except ImportError:
+        return False
+
+class WriteBehindBuffer:
+    """
+    Buffers rows per table and writes them in bulk from a background task, when a table
+    reaches `max_rows` or every `interval` seconds. `add()` never waits on the database.
+
+    If the database is unreachable the batch is appended to a JSONL journal (fsynced) and
+    replayed, oldest first, before the next batch goes out. Rows the database rejects
+    outright are retried one by one so a single bad row can't hold back the rest.
+    """
+
+    def __init__(self, write_fn: WriteFn, journal_path: str = None, max_rows: int = None, interval: float = None):
+        trading = config.trading
+        self.write_fn = write_fn
+        self.journal_path = journal_path or trading.DB_JOURNAL_PATH
+        self.max_rows = max_rows or trading.DB_FLUSH_SIZE
+        self.interval = interval or trading.DB_FLUSH_INTERVAL
+        self.pending: Dict[str, List[Dict[str, Any]]] = {}
+        self.written = 0
+        self.spilled = 0
+        self.rejected = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop = None
+
+    def add(self, table: str, row: Dict[str, Any]) -> None:
+        rows = self.pending.setdefault(table, [])
+        rows.append(row)
+        self._ensure_worker()
+        if len(rows) >= self.max_rows:
+            self._wake.set()
+
+    @property
+    def buffered(self) -> int:
+        return sum(len(rows) for rows in self.pending.values())
+
+    def _ensure_worker(self) -> None:
+        # Event, lock and worker belong to one event loop; rebuild them on a new loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._wake = asyncio.Event()
+            self._lock = asyncio.Lock()
+            self._worker = None
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"❌ Write-behind flush failed: {e}")
+
+    async def flush(self) -> None:
+        """Replay the journal, then write everything buffered so far"""
+        self._ensure_worker()
+        async with self._lock:
+            batches, self.pending = self.pending, {}
+            reachable = await self._replay()
+            for table, rows in batches.items():
+                if not reachable:
+                    self._spill(table, rows)
+                    continue
+                reachable = await self._write(table, rows)
+
+    async def aclose(self) -> None:
+        if self._loop is not None and self._loop is asyncio.get_running_loop():
+            await self.flush()
+            self._worker.cancel()
+
+    async def _write(self, table: str, rows: List[Dict[str, Any]]) -> bool:
+        """Bulk write; returns False (rows journaled) when the database is unreachable"""
+        try:
+            await self.write_fn(table, rows)
+            self.written += len(rows)
+            return True
+        except Exception as e:
+            if is_unreachable(e):
+                print(f"⚠️ DB unreachable ({e}); journaling {len(rows)} {table} rows")
+                self._spill(table, rows)
+                return False
+            if len(rows) > 1:
+                for i, row in enumerate(rows):
+                    if not await self._write(table, [row]):
+                        self._spill(table, rows[i + 1:])
+                        return False
+                return True
+            print(f"❌ DB rejected {table} row {rows[0]}: {e}")
+            self.rejected += 1
+            return True
+
+    def _spill(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        os.makedirs(os.path.dirname(self.journal_path) or ".", exist_ok=True)
+        with open(self.journal_path, "a") as f:
+            for row in rows:
+                f.write(json.dumps({"table": table, "row": row}, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.spilled += len(rows)
+
+    def _read_journal(self, path: str) -> Dict[str, List[Dict[str, Any]]]:
+        batches: Dict[str, List[Dict[str, Any]]] = {}
+        with open(path) as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn tail from a crash mid-append
+                batches.setdefault(entry["table"], []).append(entry["row"])
+        return batches
+
+    async def _replay(self) -> bool:
+        """Write journaled rows back; returns False if the database is still unreachable"""
+        # Rows being replayed move aside so failures can be re-journaled; a file left there by
+        # an interrupted replay is picked up again (delivery is at-least-once)
+        replaying = self.journal_path + ".replay"
+        if os.path.exists(self.journal_path):
+            if os.path.exists(replaying):
+                with open(replaying, "a") as out, open(self.journal_path) as f:
+                    out.write("\n" + f.read())
+                os.remove(self.journal_path)
+            else:
+                os.replace(self.journal_path, replaying)
+        if not os.path.exists(replaying):
+            return True
+
+        reachable, replayed = True, 0
+        for table, rows in self._read_journal(replaying).items():
+            if not reachable:
+                self._spill(table, rows)
+                continue
+            reachable = await self._write(table, rows)
+            replayed += len(rows) if reachable else 0
+        os.remove(replaying)
+        if replayed:
+            print(f"✅ DB reconnected: replayed {replayed} journaled rows")
+        return reachable
@@ -33,6 +33,9 @@ async def test_discord():
         triggered_at="Now"
     )
     
+    # Alerts are delivered by a background dispatcher; wait for it before exiting
+    await notification_client.aclose()
+    
     print("✅ Alerts sent. Check your Discord channel!")
 
 if __name__ == "__main__":
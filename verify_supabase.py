@@ -27,7 +27,11 @@ async def verify_supabase():
     print(f"Attempting to log trade: {test_trade}")
     result = await client.log_trade(test_trade)
     
-    if result == "logged":
+    # log_trade only queues the row (write-behind); flush it and see where it went
+    await client.aclose()
+    buffer = client.buffer
+    
+    if result == "queued" and buffer.written:
         print("✅ SUCCESS: Trade logged to Supabase.")
         
         # Optional: Verify read
@@ -38,8 +42,10 @@ async def verify_supabase():
         else:
              print("⚠️ WARNING: Write succeeded but read verification failed (or delayed).")
              
+    elif buffer.spilled:
+        print(f"❌ FAIL: Supabase unreachable, row journaled to {buffer.journal_path} for replay.")
     else:
-        print(f"❌ FAIL: Logging failed. Result: {result}")
+        print(f"❌ FAIL: Logging failed. Result: {result} (rejected rows: {buffer.rejected})")
 
 if __name__ == "__main__":
     asyncio.run(verify_supabase())